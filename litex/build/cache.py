@@ -0,0 +1,203 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+
+from litex.gen import colorer
+
+# Build Cache --------------------------------------------------------------------------------------
+#
+# Content-addressed cache of toolchain builds:
+# - The key is a SHA-256 of the build inputs: the generated files of the build directory (Verilog,
+#   constraints, project files, build script, including subdirectories), the platform sources
+#   (sources, Verilog include paths, IPs, EDIFs) and toolchain extras (name, version).
+# - The entry holds the files created/modified by the toolchain run (bitstreams, reports, logs);
+#   on a hit they are restored to the build directory and the toolchain is not run.
+# - Entries are evicted in LRU order (hits refresh the entry) when the cache exceeds max_size.
+#
+# Generated files are the files written during the generation: files created/modified since a
+# snapshot of the build directory taken before the generation and files written with
+# write_to_file (recorded with a WriteRecorder, since files with unchanged contents are left
+# untouched). Other files of the build directory are leftovers of previous builds and are not part
+# of the key. Without this information, all the files of the build directory are used except the
+# outputs of the last build, recorded in the build directory (build_cache.json).
+
+build_cache_manifest = "build_cache.json"
+
+# Files ignored by the cache: manifest and build reports (written after each run/restore).
+build_cache_ignored = (build_cache_manifest, "_report.json")
+
+# Generation date of the Verilog header/trailer comments, ignored in the key.
+_date_re = re.compile(rb"^//[^\n]*\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}[^\n]*$", re.MULTILINE)
+
+def get_file_hash_data(filename):
+    """Return contents of filename to hash (without the generation date of Verilog files)."""
+    with open(filename, "rb") as f:
+        data = f.read()
+    if filename.endswith(".v"):
+        data = _date_re.sub(b"", data)
+    return data
+
+def _get_default_directory():
+    return os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "litex", "build")
+
+def snapshot(directory):
+    """Return {relative path: (mtime, size)} of the files of directory (and subdirectories)."""
+    r = {}
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if name.endswith(build_cache_ignored):
+                continue
+            path = os.path.join(root, name)
+            s    = os.stat(path)
+            r[os.path.relpath(path, directory).replace(os.sep, "/")] = (s.st_mtime_ns, s.st_size)
+    return r
+
+def get_changed(before, after):
+    """Return files of snapshot after created/modified since snapshot before."""
+    return sorted(name for name in after if before.get(name) != after[name])
+
+def get_generated(directory, before, after, written=[]):
+    """Return generated files of directory: files created/modified between snapshots before/after
+    and written files (absolute paths, even when left untouched)."""
+    generated = set(get_changed(before, after))
+    for path in written:
+        name = os.path.relpath(path, os.path.abspath(directory)).replace(os.sep, "/")
+        if name in after:
+            generated.add(name)
+    return sorted(generated)
+
+def get_platform_sources(platform):
+    """Return the source files of a platform: sources, Verilog includes, IPs and EDIFs."""
+    sources = [f for f, *_ in platform.sources]
+    for path in getattr(platform, "verilog_include_paths", []):
+        sources += [os.path.join(path, name) for name in snapshot(path)]
+    sources += sorted(getattr(platform, "ips",   []))
+    sources += sorted(getattr(platform, "edifs", []))
+    return sources
+
+def get_platform_extras(platform):
+    """Return the platform options affecting the build (Xilinx IPs constraints)."""
+    ips = getattr(platform, "ips", {})
+    return [sorted(ips.items())] if isinstance(ips, dict) else []
+
+def _get_size(directory):
+    return sum(s for _, s in snapshot(directory).values())
+
+# Orphaned temporary entries (interrupted stores) are removed after this delay (seconds).
+_tmp_max_age = 3600
+
+class BuildCache:
+    def __init__(self, directory=None, max_size=10e9):
+        self.directory = os.path.abspath(directory or _get_default_directory())
+        self.max_size  = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_inputs(self, build_dir, sources=[], generated=None):
+        # Generated files of the build directory (or files except outputs of the last build), then
+        # sources (deduplicated). Returned as (name, path) with name relative to build_dir for the
+        # files of the build directory.
+        if generated is None:
+            manifest = os.path.join(build_dir, build_cache_manifest)
+            outputs  = []
+            if os.path.exists(manifest):
+                with open(manifest) as f:
+                    outputs = json.load(f)
+            generated = [name for name in sorted(snapshot(build_dir)) if name not in outputs]
+        inputs = [(name, os.path.join(build_dir, name)) for name in generated]
+        paths  = {os.path.realpath(path) for name, path in inputs}
+        for source in sources:
+            if os.path.realpath(source) not in paths:
+                paths.add(os.path.realpath(source))
+                inputs.append((os.path.basename(source), source))
+        return inputs
+
+    def get_key(self, inputs, extras=[]):
+        h = hashlib.sha256()
+        for extra in extras:
+            h.update(str(extra).encode() + b"\0")
+        for name, path in inputs:
+            h.update(name.encode() + b"\0")
+            h.update(get_file_hash_data(path) + b"\0")
+        return h.hexdigest()
+
+    def restore(self, key, build_dir):
+        """Restore entry to build_dir. Return the list of restored files or None on a miss."""
+        entry = os.path.join(self.directory, key)
+        if not os.path.isdir(entry):
+            return None
+        outputs = sorted(snapshot(entry))
+        for name in outputs:
+            os.makedirs(os.path.dirname(os.path.join(build_dir, name)), exist_ok=True)
+            shutil.copy(os.path.join(entry, name), os.path.join(build_dir, name))
+        os.utime(entry) # Refresh LRU.
+        return outputs
+
+    def store(self, key, build_dir, outputs):
+        entry = os.path.join(self.directory, key)
+        tmp   = entry + f".tmp{os.getpid()}"
+        try:
+            for name in outputs:
+                os.makedirs(os.path.dirname(os.path.join(tmp, name)), exist_ok=True)
+                shutil.copy2(os.path.join(build_dir, name), os.path.join(tmp, name))
+            os.makedirs(tmp, exist_ok=True)
+            os.rename(tmp, entry)
+        except OSError:
+            # Already stored (ex by a concurrent build) or copy error.
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+
+    def clean(self, max_age=_tmp_max_age):
+        """Remove orphaned temporary entries (from interrupted stores)."""
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and ".tmp" in entry.name and (now - entry.stat().st_mtime) > max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def get_entries(self):
+        """Return entries as (mtime, size, key), from least to most recently used."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and ".tmp" not in entry.name:
+                entries.append((entry.stat().st_mtime, _get_size(entry.path), entry.name))
+        return sorted(entries)
+
+    def evict(self, keep=None):
+        self.clean()
+        entries = self.get_entries()
+        size    = sum(s for _, s, _ in entries)
+        for mtime, s, key in entries:
+            if size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            size -= s
+
+    def build(self, build_dir, run, sources=[], extras=[], generated=None):
+        """Restore build from cache or run it (and store it). Return True on a cache hit.
+
+        generated: Generated files of build_dir (relative paths, see get_generated), all files
+        except the outputs of the last build when None.
+        """
+        key     = self.get_key(self.get_inputs(build_dir, sources, generated), extras)
+        outputs = self.restore(key, build_dir)
+        hit     = outputs is not None
+        if hit:
+            print(colorer(f"Build cache hit ({key[:16]}), restored {len(outputs)} file(s).", color="green"))
+        else:
+            before  = snapshot(build_dir)
+            run()
+            outputs = get_changed(before, snapshot(build_dir))
+            self.store(key, build_dir, outputs)
+            print(colorer(f"Build cache miss ({key[:16]}), stored {len(outputs)} file(s).", color="yellow"))
+        with open(os.path.join(build_dir, build_cache_manifest), "w") as f:
+            json.dump(outputs, f, indent=4)
+        return hit
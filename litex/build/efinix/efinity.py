@@ -24,6 +24,7 @@ from litex.build import tools
 from litex.build.generic_platform import *
 from litex.build.generic_platform import Pins, IOStandard, Misc
 from litex.build.generic_toolchain import GenericToolchain
+from litex.build.report import parse_efinity_timing, parse_efinity_place
 
 from litex.build.efinix import common
 from litex.build.efinix import InterfaceWriter
@@ -269,6 +270,12 @@ class EfinityToolchain(GenericToolchain):
     def build_script(self):
         return "" # not used
 
+    def get_report(self):
+        report = GenericToolchain.get_report(self)
+        parse_efinity_timing(report, os.path.join("outflow", f"{self._build_name}.timing.rpt"))
+        parse_efinity_place(report,  os.path.join("outflow", f"{self._build_name}.place.rpt"))
+        return report
+
     def run_script(self, script):
         # Synthesis/Mapping.
         r = tools.subprocess_call_filtered([self.efinity_path + "/bin/efx_map",
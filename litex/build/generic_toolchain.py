@@ -7,9 +7,15 @@
 
 import os
 import math
+import time
+import logging
 
 from migen.fhdl.structure import _Fragment
 
+from litex.build.tools import WriteRecorder
+from litex.build.cache import snapshot, get_generated, get_platform_sources, get_platform_extras
+from litex.build.report import new_report, write_report, report_suffix
+
 # Generic Toolchain --------------------------------------------------------------------------------
 
 class GenericToolchain:
@@ -27,6 +33,7 @@ class GenericToolchain:
         self.named_sc    = []
         self._vns        = None
         self._synth_opts = ""
+        self.report      = None
 
     @property
     def support_mixed_language(self):
@@ -53,12 +60,20 @@ class GenericToolchain:
     def get_tool_options(self):
         return ("",{}) # empty since optional.
 
+    def get_version(self):
+        return "" # Empty since optional (used to invalidate cached builds on toolchain updates).
+
+    def get_report(self):
+        # Overloaded by toolchains to collect timing/utilization/runtimes from their reports.
+        return new_report(toolchain=type(self).__name__, build_name=self._build_name)
+
     def build(self, platform, fragment,
         build_dir      = "build",
         build_name     = "top",
         synth_opts     = "",
         run            = True,
         build_backend  = "litex",
+        build_cache    = None,
         **kwargs):
 
         self._build_name = build_name
@@ -72,6 +87,12 @@ class GenericToolchain:
         cwd = os.getcwd()
         os.chdir(self._build_dir)
 
+        # Snapshot Build Directory and record written files (to identify generated files for the
+        # Build Cache).
+        if build_cache is not None:
+            build_snapshot = snapshot(".")
+            build_recorder = WriteRecorder().start()
+
         # Finalize Design.
         if not isinstance(self.fragment, _Fragment):
             self.fragment = self.fragment.get_fragment()
@@ -113,14 +134,40 @@ class GenericToolchain:
             # Generate build script.
             script = self.build_script()
 
-            # Run.
+            if build_cache is not None:
+                build_generated = get_generated(".", build_snapshot, snapshot("."), build_recorder.stop())
+
+            # Run (or restore from Build Cache).
             if run:
-                self.run_script(script)
+                start  = time.perf_counter()
+                cached = False
+                if build_cache is not None:
+                    cached = build_cache.build(".",
+                        run       = lambda: self.run_script(script),
+                        sources   = get_platform_sources(self.platform),
+                        extras    = [type(self).__name__, self.get_version()] + get_platform_extras(self.platform),
+                        generated = build_generated,
+                    )
+                else:
+                    self.run_script(script)
+
+                # Collect Build Report (keep an empty report when it can't be collected).
+                try:
+                    self.report = self.get_report()
+                except Exception as e:
+                    logging.getLogger("GenericToolchain").warning(f"Unable to collect build report: {e!r}.")
+                    self.report = new_report(toolchain=type(self).__name__, build_name=self._build_name)
+                self.report["cached"] = cached
+                self.report["runtime"]["total"] = round(time.perf_counter() - start, 3)
+                write_report(self.report, build_name + report_suffix)
 
         # Edalize backend.
         else:
             from edalize import get_edatool
 
+            if build_cache is not None:
+                build_recorder.stop()
+
             # Get tool name and options
             (tool, tool_options) = self.get_tool_options()
 
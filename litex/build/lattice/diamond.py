@@ -20,6 +20,7 @@ from litex.gen.fhdl.verilog import DummyAttrTranslate
 
 from litex.build.generic_platform import *
 from litex.build.generic_toolchain import GenericToolchain
+from litex.build.report import parse_lattice_mrp, parse_diamond_twr
 from litex.build import tools
 from litex.build.lattice import common
 
@@ -186,6 +187,12 @@ class LatticeDiamondToolchain(GenericToolchain):
         if self._timingstrict:
             self._check_timing()
 
+    def get_report(self):
+        report = GenericToolchain.get_report(self)
+        parse_lattice_mrp(report, os.path.join("impl", f"{self._build_name}_impl.mrp"))
+        parse_diamond_twr(report, os.path.join("impl", f"{self._build_name}_impl.twr"))
+        return report
+
     def _check_timing(self):
         lines = open("impl/{}_impl.par".format(self._build_name), "r").readlines()
         runs = [None, None]
@@ -23,6 +23,7 @@ from litex.build.generic_platform import *
 from litex.build import tools
 from litex.build.lattice import common
 from litex.build.generic_toolchain import GenericToolchain
+from litex.build.report import parse_lattice_mrp, parse_radiant_twr
 from litex.build.yosys_wrapper import YosysWrapper
 
 # Required by oxide too (FIXME)
@@ -243,6 +244,12 @@ class LatticeRadiantToolchain(GenericToolchain):
         if self._timingstrict:
             self._check_timing()
 
+    def get_report(self):
+        report = GenericToolchain.get_report(self)
+        parse_lattice_mrp(report, os.path.join("impl", f"{self._build_name}_impl.mrp"))
+        parse_radiant_twr(report, os.path.join("impl", f"{self._build_name}_impl.twr"))
+        return report
+
     def _check_timing(self):
         lines = open("impl/{}_impl.par".format(self._build_name), "r").readlines()
         runs = [None, None]
@@ -4,8 +4,26 @@
 # Copyright (c) 2022 Gwenhael Goavec-Merou <gwenhael.goavec-merou@trabucayre.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import subprocess
+from shutil import which
+from functools import lru_cache
+
 from litex.build import tools
 
+# NextPNR Report Support ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def nextpnr_supports_report(name):
+    """Probe if nextpnr-xxx supports --report (not the case of older releases and some flavors,
+    ex nextpnr-xilinx)."""
+    if which(name) is None:
+        return False
+    try:
+        r = subprocess.run([name, "--help"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return b"--report" in r.stdout
+
 # NextPNR Wrapper ----------------------------------------------------------------------------------
 
 class NextPNRWrapper():
@@ -22,6 +40,7 @@ class NextPNRWrapper():
         out_format    = "",
         constr_format = "",
         pnr_opts      = "",
+        report        = None,
         **kwargs)     :
         """
         Parameters
@@ -42,6 +61,8 @@ class NextPNRWrapper():
             gateware constraints format.
         pnr_opts: str
             options to pass to nextpnr-xxx
+        report: bool
+            generate JSON report (utilization/Fmax), probed from nextpnr-xxx when None.
         kwargs: dict
             alternate options key/value
         """
@@ -51,6 +72,7 @@ class NextPNRWrapper():
         self._in_format     = in_format
         self._out_format    = out_format
         self._constr_format = constr_format
+        self._report        = nextpnr_supports_report(self.name) if report is None else report
         self._pnr_opts      = pnr_opts + " "
         self._pnr_opts     += f"--{architecture} " if architecture != "" else ""
         self._pnr_opts     += f"--package {package} " if package != "" else ""
@@ -62,6 +84,12 @@ class NextPNRWrapper():
                 if value != "":
                     self._pnr_opts += f"--{key} {value} "
 
+    @property
+    def report_file(self):
+        """return name of the JSON report (utilization/Fmax) generated by nextpnr-xxx
+        """
+        return f"{self._build_name}_nextpnr.json"
+
     @property
     def pnr_opts(self):
         """return PNR configuration options
@@ -85,7 +113,9 @@ class NextPNRWrapper():
         """
         cmd = "{pnr_name} --{in_fmt} {build_name}.{in_fmt} --{constr_fmt}" + \
             " {build_name}.{constr_fmt}" + \
-            " --{out_fmt} {build_name}.{out_ext} {pnr_opts}"
+            " --{out_fmt} {build_name}.{out_ext}" + \
+            (" --report {report}" if self._report else "") + \
+            " {pnr_opts}"
         base_cmd = cmd.format(
             pnr_name   = self.name,
             build_name = self._build_name,
@@ -93,6 +123,7 @@ class NextPNRWrapper():
             out_fmt    = "textcfg" if self._out_format == "config" else self._out_format,
             out_ext    = self._out_format,
             constr_fmt = self._constr_format,
+            report     = self.report_file,
             pnr_opts   = self._pnr_opts
         )
         if target == "makefile":
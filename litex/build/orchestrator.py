@@ -0,0 +1,221 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import math
+import time
+import inspect
+import importlib
+import itertools
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Build Orchestrator -------------------------------------------------------------------------------
+#
+# Build several variants of a target (CPU types, sys_clk_freq, with/without Ethernet, ...):
+# - Variants are elaborated in a process pool (SoC creation, software, Verilog generation).
+# - Toolchain runs are scheduled with a global CPU/memory budget: each variant reserves its threads
+#   (also passed to the toolchain's threads option, ex vivado_max_threads) and memory for the
+#   duration of its toolchain run.
+# - Results are collected in a summary table.
+
+# Toolchain options limiting the number of threads used by the toolchain.
+toolchain_threads_options = ["vivado_max_threads"]
+
+class BuildVariant:
+    def __init__(self, name, target, soc_kwargs={}, builder_kwargs={}, toolchain_kwargs={}, threads=1, memory=0):
+        self.name             = name
+        self.target           = target # Callable (or "module:callable") returning the SoC from soc_kwargs.
+        self.soc_kwargs       = dict(soc_kwargs)
+        self.builder_kwargs   = dict(builder_kwargs)
+        self.toolchain_kwargs = dict(toolchain_kwargs)
+        self.threads          = threads
+        self.memory           = memory # In GB, 0 when not constrained.
+
+    def __repr__(self):
+        return f"BuildVariant({self.name})"
+
+def _get_variant_name(params):
+    name = "_".join(f"{k.split('.')[-1]}-{v}" for k, v in params.items())
+    return re.sub(r"[^\w\-.]", "_", name)
+
+def get_variants(spec):
+    """Get variants from a spec (dict, ex loaded from a JSON file).
+
+    The spec defines the target ("module:callable"), common "soc"/"builder"/"toolchain" kwargs, the
+    "threads"/"memory" requirements of the toolchain runs and a "matrix" of parameters (soc kwargs,
+    or builder/toolchain kwargs when prefixed with "builder."/"toolchain.") whose combinations
+    are built. Explicit "variants" (with name and kwargs overrides) can also be provided.
+    """
+    def create(name, overrides):
+        kwargs = {k: dict(spec.get(k, {})) for k in ["soc", "builder", "toolchain"]}
+        for k, v in overrides.items():
+            group, _, key = k.rpartition(".")
+            if group in ["soc", "builder", "toolchain"]:
+                kwargs[group][key] = v
+            elif k in ["soc", "builder", "toolchain"]:
+                kwargs[k].update(v)
+            elif k not in ["name", "threads", "memory"]:
+                kwargs["soc"][k] = v
+        return BuildVariant(
+            name             = name,
+            target           = overrides.get("target", spec["target"]),
+            soc_kwargs       = kwargs["soc"],
+            builder_kwargs   = kwargs["builder"],
+            toolchain_kwargs = kwargs["toolchain"],
+            threads          = overrides.get("threads", spec.get("threads", 1)),
+            memory           = overrides.get("memory",  spec.get("memory",  0)),
+        )
+
+    variants = []
+    matrix   = spec.get("matrix", {})
+    if matrix:
+        for values in itertools.product(*matrix.values()):
+            params = dict(zip(matrix.keys(), values))
+            variants.append(create(_get_variant_name(params), params))
+    for i, overrides in enumerate(spec.get("variants", [])):
+        variants.append(create(overrides.get("name", f"variant{i}"), overrides))
+    if not variants:
+        variants.append(create("default", {}))
+    names = [variant.name for variant in variants]
+    if len(set(names)) != len(names):
+        raise ValueError("Variants names must be unique.")
+    return variants
+
+# Resources Budget ---------------------------------------------------------------------------------
+
+class BuildBudget:
+    """CPU/memory budget shared between processes (tokens of 1 CPU/1GB)."""
+    def __init__(self, cpus=None, memory=None):
+        self.cpus   = cpus or os.cpu_count()
+        self.memory = memory
+        self.lock   = multiprocessing.Lock()
+        self.cpus_sem   = multiprocessing.Semaphore(self.cpus)
+        self.memory_sem = multiprocessing.Semaphore(int(memory)) if memory else None
+
+    def _get_tokens(self, threads, memory):
+        cpus = min(max(threads, 1), self.cpus)
+        mem  = min(math.ceil(memory), int(self.memory)) if self.memory_sem is not None else 0
+        return cpus, mem
+
+    def acquire(self, threads=1, memory=0):
+        cpus, mem = self._get_tokens(threads, memory)
+        # Reservations are serialized: a reservation waiting for tokens can't be starved or
+        # deadlocked by partial reservations of others.
+        with self.lock:
+            for i in range(cpus):
+                self.cpus_sem.acquire()
+            for i in range(mem):
+                self.memory_sem.acquire()
+
+    def release(self, threads=1, memory=0):
+        cpus, mem = self._get_tokens(threads, memory)
+        for i in range(cpus):
+            self.cpus_sem.release()
+        for i in range(mem):
+            self.memory_sem.release()
+
+# Variant Build (in worker process) ----------------------------------------------------------------
+
+_budget = None
+
+def _init_worker(budget):
+    global _budget
+    _budget = budget
+
+def _get_target(target):
+    if isinstance(target, str):
+        module, _, name = target.partition(":")
+        target = getattr(importlib.import_module(module), name or "main")
+    return target
+
+def _create_dir(directory):
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def build_variant(variant, output_dir="build", budget=None):
+    from litex.soc.integration.builder import Builder
+    budget = budget or _budget
+    result = {
+        "name"       : variant.name,
+        "status"     : "ok",
+        "output_dir" : os.path.abspath(os.path.join(output_dir, variant.name)),
+        "elaborate"  : 0.0,
+        "wait"       : 0.0,
+        "toolchain"  : 0.0,
+        "error"      : None,
+    }
+    start = time.perf_counter()
+    try:
+        # Elaborate SoC.
+        soc = _get_target(variant.target)(**variant.soc_kwargs)
+        builder_kwargs = dict(variant.builder_kwargs)
+        builder_kwargs.setdefault("output_dir", result["output_dir"])
+        builder = Builder(soc, **builder_kwargs)
+
+        # Reserve budget for the toolchain run (and limit toolchain's threads to it).
+        toolchain = soc.platform.toolchain
+        toolchain_kwargs = dict(variant.toolchain_kwargs)
+        parameters = inspect.signature(toolchain.build).parameters
+        for option in toolchain_threads_options:
+            if option in parameters and toolchain_kwargs.get(option) is None:
+                toolchain_kwargs[option] = variant.threads
+        if budget is not None and hasattr(toolchain, "run_script"):
+            run_script = toolchain.run_script
+            def budgeted_run_script(*args, **kwargs):
+                wait = time.perf_counter()
+                budget.acquire(variant.threads, variant.memory)
+                run = time.perf_counter()
+                result["wait"] = run - wait
+                try:
+                    return run_script(*args, **kwargs)
+                finally:
+                    budget.release(variant.threads, variant.memory)
+                    result["toolchain"] = time.perf_counter() - run
+            toolchain.run_script = budgeted_run_script
+
+        # Build.
+        builder.build(**toolchain_kwargs)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"]  = "".join(traceback.format_exception_only(type(e), e)).strip()
+        with open(os.path.join(_create_dir(result["output_dir"]), "error.log"), "w") as f:
+            f.write(traceback.format_exc())
+    result["elaborate"] = time.perf_counter() - start - result["wait"] - result["toolchain"]
+    return result
+
+# Orchestrator -------------------------------------------------------------------------------------
+
+def build_variants(variants, output_dir="build", jobs=None, cpus=None, memory=None):
+    """Build variants in parallel, return their results (in variants order)."""
+    budget = BuildBudget(cpus=cpus, memory=memory)
+    jobs   = jobs or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=min(jobs, len(variants)), initializer=_init_worker, initargs=(budget,)) as executor:
+        futures = [executor.submit(build_variant, variant, output_dir) for variant in variants]
+        results = []
+        for variant, future in zip(variants, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # Worker crash (ex killed by OOM killer).
+                results.append({"name": variant.name, "status": "failed", "error": repr(e),
+                    "elaborate": 0.0, "wait": 0.0, "toolchain": 0.0,
+                    "output_dir": os.path.abspath(os.path.join(output_dir, variant.name))})
+    return results
+
+def get_summary(results):
+    header = ["Variant", "Status", "Elaborate (s)", "Wait (s)", "Toolchain (s)", "Output/Error"]
+    rows   = []
+    for r in results:
+        rows.append([r["name"], r["status"],
+            f"{r['elaborate']:.1f}", f"{r['wait']:.1f}", f"{r['toolchain']:.1f}",
+            r["output_dir"] if r["status"] == "ok" else r["error"].splitlines()[-1]])
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    lines  = [" | ".join(c.ljust(w) for c, w in zip(header, widths))]
+    lines += ["-+-".join("-"*w for w in widths)]
+    lines += [" | ".join(c.ljust(w) for c, w in zip(row, widths)) for row in rows]
+    return "\n".join(lines)
@@ -0,0 +1,273 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import re
+import json
+
+# Build Report -------------------------------------------------------------------------------------
+#
+# Common (JSON) report of the toolchain runs, collected from the reports of the toolchains:
+# {
+#     "toolchain"   : "XilinxVivadoToolchain",
+#     "build_name"  : "digilent_arty",
+#     "cached"      : False,                                         # Restored from Build Cache.
+#     "timing"      : {
+#         "wns"    : 1.234,                                          # Worst Negative Slack (ns).
+#         "tns"    : 0.0,                                            # Total Negative Slack (ns).
+#         "clocks" : {"sys_clk": {"constraint": 100.0, "fmax": 114.0}}, # In MHz.
+#     },
+#     "utilization" : {"lut": {"used": 4123, "available": 63400}, "ff": ..., "bram": ..., "dsp": ...},
+#     "runtime"     : {"total": 123.4, "synth_design": 45.0, ...},  # In s.
+# }
+# Values that are not provided by the toolchain's reports are None/missing.
+
+report_suffix = "_report.json"
+
+def new_report(toolchain="", build_name=""):
+    return {
+        "toolchain"   : toolchain,
+        "build_name"  : build_name,
+        "cached"      : False,
+        "timing"      : {"wns": None, "tns": None, "clocks": {}},
+        "utilization" : {},
+        "runtime"     : {},
+    }
+
+def write_report(report, filename):
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=4)
+
+def _read(filename):
+    try:
+        with open(filename, "r", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _to_number(s):
+    v = float(s)
+    return int(v) if v.is_integer() else v
+
+def _set_utilization(report, resources, names):
+    # resources: {name: (used, available)}, names: {kind: [names]} (first found is used).
+    for kind, candidates in names.items():
+        for name in candidates:
+            if name in resources:
+                used, available = resources[name]
+                report["utilization"][kind] = {"used": used, "available": available}
+                break
+
+def _set_clock(report, name, constraint=None, fmax=None):
+    clock = report["timing"]["clocks"].setdefault(name, {"constraint": None, "fmax": None})
+    if constraint is not None:
+        clock["constraint"] = round(constraint, 3)
+    if fmax is not None:
+        clock["fmax"] = round(fmax, 3)
+
+def _set_wns_from_clocks(report):
+    # Estimate WNS from constraint/fmax when not directly reported.
+    slacks = []
+    for clock in report["timing"]["clocks"].values():
+        if clock["constraint"] and clock["fmax"]:
+            slacks.append(1e3/clock["constraint"] - 1e3/clock["fmax"])
+    if slacks and report["timing"]["wns"] is None:
+        report["timing"]["wns"] = round(min(slacks), 3)
+
+# Vivado -------------------------------------------------------------------------------------------
+
+def _get_vivado_section(contents, name):
+    # Return lines of a "| Name" section of a Vivado report.
+    m = re.search(r"^\| " + re.escape(name) + r"\s*$", contents, re.MULTILINE)
+    if m is None:
+        return []
+    lines = contents[m.end():].splitlines()
+    for i, line in enumerate(lines[2:]):
+        if line.startswith("| "):
+            return lines[:i + 2]
+    return lines
+
+def _get_vivado_table(lines):
+    # Parse a space separated table (header, dashes, rows until a blank line) as a list of dicts,
+    # using the dashes to locate the (right-aligned) columns.
+    for i in range(len(lines) - 1):
+        if re.match(r"^\s*-+(\s+-+)+\s*$", lines[i + 1]):
+            spans  = [m.span() for m in re.finditer(r"-+", lines[i + 1])]
+            header = [lines[i][s:e].strip() for s, e in spans]
+            rows   = []
+            for line in lines[i + 2:]:
+                if not line.strip():
+                    if rows:
+                        break
+                    continue
+                row   = {header[0]: line[:spans[1][0]].strip()}
+                start = spans[1][0]
+                for (s, e), name in zip(spans[1:], header[1:]):
+                    row[name] = line[start:e].strip()
+                    start = e
+                rows.append(row)
+            return rows
+    return []
+
+def parse_vivado_timing(report, filename):
+    """Parse WNS/TNS and per clock Fmax from a report_timing_summary report."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    for row in _get_vivado_table(_get_vivado_section(contents, "Design Timing Summary")):
+        if row.get("WNS(ns)") and row.get("TNS(ns)"):
+            report["timing"]["wns"] = float(row["WNS(ns)"])
+            report["timing"]["tns"] = float(row["TNS(ns)"])
+    periods = {}
+    for line in _get_vivado_section(contents, "Clock Summary"):
+        m = re.match(r"^\s*(\S+)\s+\{[\d. ]+\}\s+([\d.]+)", line)
+        if m is not None:
+            periods[m.group(1)] = float(m.group(2))
+    for row in _get_vivado_table(_get_vivado_section(contents, "Intra Clock Table")):
+        name = row["Clock"]
+        if name in periods and row.get("WNS(ns)"):
+            wns = float(row["WNS(ns)"])
+            _set_clock(report, name,
+                constraint = 1e3/periods[name],
+                fmax       = 1e3/(periods[name] - wns),
+            )
+
+def parse_vivado_utilization(report, filename):
+    """Parse LUT/FF/BRAM/DSP utilization from a report_utilization report."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    resources = {}
+    columns   = None
+    for line in contents.splitlines():
+        if not line.startswith("|"):
+            continue
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if "Site Type" in cells:
+            columns = cells
+        elif columns is not None and len(cells) == len(columns):
+            row  = dict(zip(columns, cells))
+            name = row["Site Type"].rstrip("*").strip()
+            try:
+                resources.setdefault(name, (_to_number(row["Used"]), _to_number(row["Available"])))
+            except (KeyError, ValueError):
+                pass
+    _set_utilization(report, resources, {
+        "lut"  : ["Slice LUTs", "CLB LUTs"],
+        "ff"   : ["Slice Registers", "CLB Registers"],
+        "bram" : ["Block RAM Tile"],
+        "dsp"  : ["DSPs"],
+    })
+
+def parse_vivado_log(report, filename):
+    """Parse runtimes of the Vivado commands (synth_design, place_design, ...) from vivado.log."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    pattern = r"^(\w+): Time \(s\): cpu = [\d:]+ ; elapsed = (\d+):(\d+):(\d+)"
+    for m in re.finditer(pattern, contents, re.MULTILINE):
+        h, mn, s = map(int, m.groups()[1:])
+        report["runtime"][m.group(1)] = report["runtime"].get(m.group(1), 0) + 3600*h + 60*mn + s
+
+# NextPNR ------------------------------------------------------------------------------------------
+
+def parse_nextpnr_report(report, filename):
+    """Parse utilization and per clock Fmax from a nextpnr JSON report (--report)."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    r = json.loads(contents)
+    resources = {k: (v["used"], v["available"]) for k, v in r.get("utilization", {}).items()}
+    _set_utilization(report, resources, {
+        "lut"  : ["TRELLIS_COMB", "ICESTORM_LC", "OXIDE_COMB", "SLICE_LUTX", "LUT4"],
+        "ff"   : ["TRELLIS_FF", "OXIDE_FF", "SLICE_FFX", "DFF"],
+        "bram" : ["DP16KD", "ICESTORM_RAM", "OXIDE_EBR", "RAMB36E1", "BSRAM"],
+        "dsp"  : ["MULT18X18D", "ICESTORM_DSP", "MULT18_CORE", "DSP48E1"],
+    })
+    for name, clock in r.get("fmax", {}).items():
+        _set_clock(report, name.replace("$glbnet$", ""),
+            constraint = clock.get("constraint"),
+            fmax       = clock.get("achieved"),
+        )
+    _set_wns_from_clocks(report)
+
+# Lattice Diamond/Radiant --------------------------------------------------------------------------
+
+def parse_lattice_mrp(report, filename):
+    """Parse utilization from a Diamond/Radiant map report (.mrp)."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    resources = {}
+    for m in re.finditer(r"^\s*Number of ([\w ]+?):\s+(\d+) out of\s+(\d+)", contents, re.MULTILINE):
+        resources.setdefault(m.group(1), (int(m.group(2)), int(m.group(3))))
+    _set_utilization(report, resources, {
+        "lut"  : ["LUT4s"],
+        "ff"   : ["registers", "slice registers"],
+        "bram" : ["block RAMs", "EBRs"],
+        "dsp"  : ["DSPs", "Used DSP MULT Sites"],
+    })
+
+def parse_diamond_twr(report, filename):
+    """Parse per clock Fmax from the Report Summary of a Diamond timing report (.twr)."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    pattern = r"FREQUENCY (?:NET|PORT) \"?([^\"\s]+)\"?[^|]*\|\s*([\d.]+) MHz\s*\|\s*([\d.]+) MHz"
+    for m in re.finditer(pattern, contents):
+        _set_clock(report, m.group(1), constraint=float(m.group(2)), fmax=float(m.group(3)))
+    _set_wns_from_clocks(report)
+
+def parse_radiant_twr(report, filename):
+    """Parse per clock Fmax from the Clock Summary of a Radiant timing report (.twr)."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    pattern = r"^From (\S+)\s*\|\s*Target\s*\|\s*([\d.]+) MHz\s*\n\s*\|\s*Actual \(all paths\)\s*\|\s*([\d.]+) MHz"
+    for m in re.finditer(pattern, contents, re.MULTILINE):
+        _set_clock(report, m.group(1), constraint=float(m.group(2)), fmax=float(m.group(3)))
+    _set_wns_from_clocks(report)
+
+# Efinity ------------------------------------------------------------------------------------------
+
+def parse_efinity_timing(report, filename):
+    """Parse per clock Fmax and WNS from an Efinity timing report (.timing.rpt)."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    lines = contents.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("Clock Name") and "Frequency (MHz)" in line:
+            for row in lines[i + 1:]:
+                m = re.match(r"^(\S+)\s+([\d.]+)\s+([\d.]+)", row)
+                if m is None:
+                    break
+                _set_clock(report, m.group(1), fmax=float(m.group(3)))
+        if line.startswith("Launch Clock") and "Slack (ns)" in line and "Setup" in lines[i - 1]:
+            slacks = []
+            for row in lines[i + 1:]:
+                m = re.match(r"^(\S+)\s+(\S+)\s+([\d.]+)\s+(-?[\d.]+)", row)
+                if m is None:
+                    break
+                slacks.append(float(m.group(4)))
+                if m.group(1) == m.group(2):
+                    _set_clock(report, m.group(1), constraint=1e3/float(m.group(3)))
+            if slacks:
+                report["timing"]["wns"] = min(slacks)
+                report["timing"]["tns"] = sum(s for s in slacks if s < 0)
+
+def parse_efinity_place(report, filename):
+    """Parse utilization from the Resource Summary of an Efinity place report (.place.rpt)."""
+    contents = _read(filename)
+    if contents is None:
+        return
+    resources = {}
+    for m in re.finditer(r"^\s*(.+?):\s+(\d+)\s*/\s*(\d+)", contents, re.MULTILINE):
+        resources.setdefault(m.group(1), (int(m.group(2)), int(m.group(3))))
+    _set_utilization(report, resources, {
+        "lut"  : ["LE: LUTs/Adders", "Logic Elements"],
+        "ff"   : ["LE: Registers"],
+        "bram" : ["Memory Blocks"],
+        "dsp"  : ["Multipliers"],
+    })
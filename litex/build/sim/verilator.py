@@ -7,6 +7,9 @@
 
 import os
 import sys
+import json
+import shutil
+import hashlib
 import subprocess
 from pathlib import Path
 from shutil import which
@@ -14,6 +17,7 @@ from shutil import which
 from migen.fhdl.structure import _Fragment
 from litex import get_data_mod
 from litex.build import tools
+from litex.build.cache import get_file_hash_data
 from litex.build.generic_platform import *
 
 
@@ -133,7 +137,45 @@ def _generate_sim_config(config):
     tools.write_to_file("sim_config.js", content)
 
 
-def _build_sim(build_name, sources, jobs, threads, coverage, opt_level="O3", trace_fst=False, video=False):
+def _get_directory_files(directory, exclude=[]):
+    files = []
+    for root, dirs, filenames in os.walk(directory):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) not in exclude]
+        files += [os.path.join(root, filename) for filename in filenames]
+    return sorted(files)
+
+def _get_sim_hashes(build_script_contents, sources, extra_mods_path=""):
+    # Options: Build script (make options), variables, Verilator version; a change requires a full
+    # rebuild of obj_dir.
+    options = hashlib.sha256(build_script_contents.encode())
+    for filename in ["variables.mak"]:
+        with open(filename, "rb") as f:
+            options.update(f.read())
+    if which("verilator") is not None:
+        options.update(subprocess.check_output(["verilator", "--version"]))
+
+    # Sources: Verilog sources (memory init files excluded since loaded at runtime by $readmemh),
+    # generated C++ files and simulator core; a change requires re-verilating (incrementally).
+    modules_directory = os.path.join(core_directory, "modules")
+    files = [filename for filename, language, library, *copy in sources
+        if Path(filename).suffix not in [".hex", ".init"]]
+    files += ["sim_init.cpp", "sim_header.h"]
+    files += _get_directory_files(core_directory, exclude=[modules_directory])
+    sources = hashlib.sha256(options.digest())
+    for filename in files:
+        sources.update(get_file_hash_data(filename))
+
+    # Modules: Simulator and extra modules (variables.mak of extra modules excluded since generated
+    # from variables); a change only requires rebuilding the modules.
+    files = _get_directory_files(modules_directory)
+    if extra_mods_path:
+        files += [f for f in _get_directory_files(extra_mods_path) if os.path.basename(f) != "variables.mak"]
+    modules = hashlib.sha256(options.digest())
+    for filename in files:
+        modules.update(get_file_hash_data(filename))
+    return {"options": options.hexdigest(), "sources": sources.hexdigest(), "modules": modules.hexdigest()}
+
+def _build_sim(build_name, sources, jobs, threads, coverage, opt_level="O3", trace_fst=False, video=False, ccache=True, extra_mods_path=""):
     makefile = os.path.join(core_directory, 'Makefile')
 
     cc_srcs = []
@@ -142,8 +184,7 @@ def _build_sim(build_name, sources, jobs, threads, coverage, opt_level="O3", tra
             cc_srcs.append("--cc " + filename + " ")
 
     build_script_contents = """\
-rm -rf obj_dir/
-make -C . -f {} {} {} {} {} {} {}
+make -C . -f {} {} {} {} {} {} {} {} "$@"
 """.format(makefile,
     "CC_SRCS=\"{}\"".format("".join(cc_srcs)),
     "JOBS={}".format(jobs) if jobs else "",
@@ -152,13 +193,44 @@ make -C . -f {} {} {} {} {} {} {}
     "OPT_LEVEL={}".format(opt_level),
     "TRACE_FST=1" if trace_fst else "",
     "VIDEO=1" if video else "",
+    "OBJCACHE=ccache" if (ccache and which("ccache") is not None) else "",
     )
     build_script_file = "build_" + build_name + ".sh"
     tools.write_to_file(build_script_file, build_script_contents, force_unix=True)
 
+    # Hashes of the build, used to only rebuild what is required.
+    hashes = _get_sim_hashes(build_script_contents, sources, extra_mods_path)
+    tools.write_to_file("build_" + build_name + ".json", json.dumps(hashes, indent=4))
+
 def _compile_sim(build_name, verbose):
+    # Compare build hashes with the ones of the obj_dir's build.
+    hashes_file = "build_" + build_name + ".json"
+    built_file  = os.path.join("obj_dir", "litex_sim.json")
+    hashes = built = {}
+    if os.path.exists(hashes_file):
+        with open(hashes_file) as f:
+            hashes = json.load(f)
+    if os.path.exists(built_file):
+        with open(built_file) as f:
+            built = json.load(f)
+    built_model = os.path.exists(os.path.join("obj_dir", "Vsim"))
+    targets     = []
+    if hashes and hashes == built and built_model:
+        print("Verilated model up to date, skipping compilation.")
+        return
+    if hashes.get("options") != built.get("options"):
+        # Full rebuild.
+        shutil.rmtree("obj_dir", ignore_errors=True)
+    else:
+        # Incremental rebuild (only of the modules when the Verilated model is up to date).
+        if hashes and hashes.get("sources") == built.get("sources") and built_model:
+            print("Verilated model up to date, only compiling modules.")
+            targets = ["modules"]
+        if os.path.exists(built_file):
+            os.remove(built_file)
+
     build_script_file = "build_" + build_name + ".sh"
-    p = subprocess.Popen(["bash", build_script_file], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    p = subprocess.Popen(["bash", build_script_file] + targets, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
     output, _ = p.communicate()
     output = output.decode('utf-8')
     if p.returncode != 0:
@@ -169,6 +241,9 @@ def _compile_sim(build_name, verbose):
         raise OSError("Subprocess failed with {}\n{}".format(p.returncode, "\n".join(error_messages)))
     if verbose:
         print(output)
+    if hashes:
+        with open(built_file, "w") as f:
+            json.dump(hashes, f, indent=4)
 
 def _run_sim(build_name, as_root=False, interactive=True):
     run_script_contents = "sudo " if as_root else ""
@@ -190,6 +265,11 @@ def _run_sim(build_name, as_root=False, interactive=True):
 
 class SimVerilatorToolchain:
     support_mixed_language = False
+
+    # Keep ROM size when initialized: memory contents are loaded at runtime ($readmemh), so a ROM
+    # update (ex BIOS/firmware) does not change the Verilog and reuses the Verilated model.
+    rom_auto_size = False
+
     def build(self, platform, fragment,
             build_dir        = "build",
             build_name       = "sim",
@@ -212,7 +292,8 @@ class SimVerilatorToolchain:
             interactive      = True,
             pre_run_callback = None,
             extra_mods       = None,
-            extra_mods_path  = ""):
+            extra_mods_path  = "",
+            ccache           = True):
 
         # Create build directory
         os.makedirs(build_dir, exist_ok=True)
@@ -250,14 +331,16 @@ class SimVerilatorToolchain:
 
             # Build
             _build_sim(
-                build_name = build_name,
-                sources    = platform.sources,
-                jobs       = jobs,
-                threads    = threads,
-                coverage   = coverage,
-                opt_level  = opt_level,
-                trace_fst  = trace_fst,
-                video      = video,
+                build_name      = build_name,
+                sources         = platform.sources,
+                jobs            = jobs,
+                threads         = threads,
+                coverage        = coverage,
+                opt_level       = opt_level,
+                trace_fst       = trace_fst,
+                video           = video,
+                ccache          = ccache,
+                extra_mods_path = extra_mods_path if extra_mods else "",
             )
 
         # Run
@@ -291,6 +374,7 @@ def verilator_build_args(parser):
     toolchain_group.add_argument("--trace-start",  default="0",         help="Time to start tracing (ps).")
     toolchain_group.add_argument("--trace-end",    default="-1",        help="Time to end tracing (ps).")
     toolchain_group.add_argument("--opt-level",    default="O3",        help="Compilation optimization level.")
+    toolchain_group.add_argument("--no-ccache",    action="store_true", help="Disable ccache (used when available).")
 
 def verilator_build_argdict(args):
     return {
@@ -300,5 +384,6 @@ def verilator_build_argdict(args):
         "trace_fst"   : args.trace_fst,
         "trace_start" : int(float(args.trace_start)),
         "trace_end"   : int(float(args.trace_end)),
-        "opt_level"   : args.opt_level
+        "opt_level"   : args.opt_level,
+        "ccache"      : not args.no_ccache,
     }
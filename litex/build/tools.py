@@ -28,7 +28,35 @@ def language_by_filename(name):
     return None
 
 
+# Generation date (as in generated banners/headers).
+_date_re = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+
+# Write Recorders: Record the files written with write_to_file, including the ones left untouched
+# since their contents are unchanged (ex to identify the generated files of a build).
+_write_recorders = []
+
+class WriteRecorder:
+    def __init__(self):
+        self.files = set() # Absolute paths.
+
+    def start(self):
+        _write_recorders.append(self)
+        return self
+
+    def stop(self):
+        if self in _write_recorders:
+            _write_recorders.remove(self)
+        return sorted(self.files)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
 def write_to_file(filename, contents, force_unix=False):
+    for recorder in _write_recorders:
+        recorder.files.add(os.path.abspath(filename))
     newline = None
     if force_unix:
         newline = "\n"
@@ -36,7 +64,9 @@ def write_to_file(filename, contents, force_unix=False):
     if os.path.exists(filename):
         with open(filename, "r", newline=newline) as f:
             old_contents = f.read()
-    if old_contents != contents:
+    # Only write file when contents changed (ignoring generation dates of banners), to preserve
+    # timestamps and avoid rebuilds of dependencies (ex software with generated headers).
+    if (old_contents is None) or (_date_re.sub("", old_contents) != _date_re.sub("", contents)):
         with open(filename, "w", newline=newline) as f:
             f.write(contents)
 
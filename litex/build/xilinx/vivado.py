@@ -16,6 +16,7 @@ from litex.build.generic_platform import *
 from litex.build import tools
 from litex.build.xilinx import common
 from litex.build.generic_toolchain import GenericToolchain
+from litex.build.report import parse_vivado_timing, parse_vivado_utilization, parse_vivado_log
 
 # Constraints (.xdc) -------------------------------------------------------------------------------
 
@@ -370,6 +371,18 @@ class XilinxVivadoToolchain(GenericToolchain):
         tools.write_to_file(script_file, script_contents)
         return script_file
 
+    def get_version(self):
+        if which("vivado") is None:
+            return ""
+        return subprocess.check_output(["vivado", "-version"]).decode("utf-8").splitlines()[0]
+
+    def get_report(self):
+        report = GenericToolchain.get_report(self)
+        parse_vivado_timing(report,      f"{self._build_name}_timing.rpt")
+        parse_vivado_utilization(report, f"{self._build_name}_utilization_place.rpt")
+        parse_vivado_log(report,         "vivado.log")
+        return report
+
     def run_script(self, script):
         if sys.platform in ["win32", "cygwin"]:
             shell = ["cmd", "/c"]
@@ -12,6 +12,7 @@ from shutil import which
 
 from litex.build import tools
 from litex.build.generic_toolchain import GenericToolchain
+from litex.build.report import parse_nextpnr_report
 from litex.build.nextpnr_wrapper import NextPNRWrapper, nextpnr_args, nextpnr_argdict
 from litex.build.yosys_wrapper import YosysWrapper, yosys_args, yosys_argdict
 
@@ -57,6 +58,8 @@ class YosysNextPNRToolchain(GenericToolchain):
         target package  (optional/target dependant)
     _speed_grade: str
         target speed grade (optional/target dependant)
+    nextpnr_report: bool
+        generate nextpnr JSON report (probed from nextpnr-xxx when None)
     _support_mixed_language: bool
         informs if toolchain is able to use only verilog or verilog + vhdl
     """
@@ -85,6 +88,7 @@ class YosysNextPNRToolchain(GenericToolchain):
         self._architecture    = ""
         self._package         = ""
         self._speed_grade     = ""
+        self.nextpnr_report   = None
 
     def build(self, platform, fragment,
         nowidelut    = False,
@@ -154,7 +158,8 @@ class YosysNextPNRToolchain(GenericToolchain):
             pnr_opts          = self._pnr_opts,
             timing_allow_fail = not self.timingstrict,
             ignore_loops      = self.ignoreloops,
-            seed              = self.seed
+            seed              = self.seed,
+            report            = self.nextpnr_report,
         )
 
     @property
@@ -211,6 +216,18 @@ class YosysNextPNRToolchain(GenericToolchain):
 
         return script_file
 
+    def get_version(self):
+        versions = []
+        for cmd in [["yosys", "-V"], [self._nextpnr.name, "--version"]]:
+            if which(cmd[0]) is not None:
+                versions.append(subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode("utf-8").strip())
+        return "\n".join(versions)
+
+    def get_report(self):
+        report = GenericToolchain.get_report(self)
+        parse_nextpnr_report(report, self._nextpnr.report_file)
+        return report
+
     def run_script(self, script):
         """ run build_xxx.yy script
         Parameters
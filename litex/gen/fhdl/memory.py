@@ -23,6 +23,15 @@ def memory_emit_verilog(name, memory, namespace, add_data_file):
         else:
             return verilog_printexpr(namespace, e)[0]
 
+    # Deferred Initialization.
+    # ------------------------
+
+    # Resolve deferred init (ex ROM contents compiled concurrently with Verilog generation).
+    deferred_init = getattr(memory, "deferred_init", None)
+    if deferred_init is not None:
+        memory.deferred_init = None
+        deferred_init()
+
     # Parameters.
     # -----------
     r         = ""
@@ -73,10 +82,8 @@ def memory_emit_verilog(name, memory, namespace, add_data_file):
     # ----------------------------------------
     r += f"reg [{memory.width-1}:0] {_get_name(memory)}[0:{memory.depth-1}];\n"
     if memory.init is not None:
-        content = ""
         formatter = f"{{:0{int(memory.width/4)}x}}\n"
-        for d in memory.init:
-            content += formatter.format(d)
+        content   = "".join(map(formatter.format, memory.init))
         memory_filename = add_data_file(f"{name}_{_get_name(memory)}.init", content)
 
         r += "initial begin\n"
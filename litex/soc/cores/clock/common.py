@@ -54,3 +54,45 @@ def clkdiv_range(start, stop, step=1):
     while current < stop:
         yield int(current) if math.floor(current) == current else current
         current += step
+
+def _clkdiv_get(start, stop, step, k):
+    d = start + k*step
+    if (k < 0) or (d >= stop):
+        return None
+    return int(d) if math.floor(d) == d else d
+
+def clkdiv_search(vco_freq, freq, margin, start, stop, step=1):
+    """Return the first divider of clkdiv_range(start, stop, step) generating freq (+-margin).
+
+    Equivalent to iterating on clkdiv_range until abs(vco_freq/d - freq) <= freq*margin, but the
+    lowest divider within margin is directly computed (neighbours are also checked, for rounding).
+    """
+    k = max(math.ceil((vco_freq/(freq*(1 + margin)) - start)/step), 0)
+    for k in range(max(k - 1, 0), k + 2):
+        d = _clkdiv_get(start, stop, step, k)
+        if d is None:
+            break
+        if abs(vco_freq/d - freq) <= freq*margin:
+            return d
+    return None
+
+def clkdiv_search_nearest(vco_freq, freq, margin, start, stop, step=1):
+    """Return the divider of clkdiv_range(start, stop, step) generating the nearest frequency to freq
+    (within margin, lowest divider on ties).
+
+    abs(vco_freq/d - freq) decreases until d = vco_freq/freq and then increases: Only the dividers
+    around vco_freq/freq (or the nearest bound of the range) have to be checked.
+    """
+    best_d    = None
+    best_diff = float("inf")
+    kmax = math.ceil((stop - start)/step) - 1
+    k    = min(max(math.floor((vco_freq/freq - start)/step), 0), kmax)
+    for k in range(max(k - 1, 0), min(k + 2, kmax) + 1):
+        d = _clkdiv_get(start, stop, step, k)
+        if d is None:
+            continue
+        diff = abs(vco_freq/d - freq)
+        if diff <= freq*margin and diff < best_diff:
+            best_d    = d
+            best_diff = diff
+    return best_d
@@ -59,7 +59,6 @@ class IntelClocking(Module, AutoCSR):
 
     def compute_config(self):
         valid_configs = {}
-        clkdiv_range_list = list(clkdiv_range(*self.c_div_range)) # for speed
         # Only test values of N (input clock divisor) which result in a PFD
         # input frequency within the allowable range.
         min_n = math.ceil(self.clkin_freq/self.clkin_pfd_freq_range[1])
@@ -79,19 +78,16 @@ class IntelClocking(Module, AutoCSR):
                     vco_freq <= vco_freq_max*(1 - self.vco_margin)):
                     clk_valid = [False] * len(self.clkouts)
                     for _n, (clk, f, p, _m) in sorted(self.clkouts.items()):
-                        # For each C, see if the output frequency is within margin
-                        # and the difference is better than the previous valid, best C.
-                        best_diff = float("inf")
-                        for c in clkdiv_range_list:
+                        # Find the C with the output frequency nearest to the requested
+                        # one (within margin).
+                        c = clkdiv_search_nearest(vco_freq, f, _m, *self.c_div_range)
+                        if c is not None:
                             clk_freq = vco_freq/c
-                            diff = abs(clk_freq - f)
-                            if diff <= f*_m and diff < best_diff:
-                                config[f"clk{_n}_freq"]   = clk_freq
-                                config[f"clk{_n}_divide"] = c * n
-                                config[f"clk{_n}_phase"]  = p
-                                clk_valid[_n] = True
-                                diff_ratios[_n] = diff / f
-                                best_diff = diff
+                            config[f"clk{_n}_freq"]   = clk_freq
+                            config[f"clk{_n}_divide"] = c * n
+                            config[f"clk{_n}_phase"]  = p
+                            clk_valid[_n] = True
+                            diff_ratios[_n] = abs(clk_freq - f) / f
                     all_valid = all(clk_valid)
                 else:
                     all_valid = False
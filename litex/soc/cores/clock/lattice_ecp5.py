@@ -5,6 +5,8 @@
 # Copyright (c) 2021 George Hilliard <thirtythreeforty@gmail.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import math
+
 from migen import *
 from migen.genlib.resetsync import AsyncResetSynchronizer
 
@@ -73,30 +75,29 @@ class ECP5PLL(Module):
             config["clki_div"] = clki_div
             # Iterate on CLKO dividers... (to get us in VCO range)
             for clkofb_div in range(*self.clko_div_range):
-                # Iterate on CLKFB dividers...
-                for clkfb_div in range(*self.clkfb_div_range):
+                # Iterate on CLKFB dividers... (only the ones around VCO range)
+                (vco_freq_min, vco_freq_max) = self.vco_freq_range
+                clkfb_freq    = self.clkin_freq/clki_div*clkofb_div
+                clkfb_div_min = max(math.floor(vco_freq_min/clkfb_freq), self.clkfb_div_range[0])
+                clkfb_div_max = min(math.ceil(vco_freq_max/clkfb_freq) + 1, self.clkfb_div_range[1])
+                for clkfb_div in range(clkfb_div_min, clkfb_div_max):
                     vco_freq = (self.clkin_freq/clki_div)*clkfb_div*clkofb_div
-                    (vco_freq_min, vco_freq_max) = self.vco_freq_range
                     all_valid = True
                     # If in VCO range, find dividers for all outputs.
                     if vco_freq_min <= vco_freq <= vco_freq_max:
                         config["clkfb"] = None
                         for n, (clk, f, p, m, dpa) in sorted(self.clkouts.items()):
-                            valid = False
-                            for d in range(*self.clko_div_range):
-                                clk_freq = vco_freq/d
-                                # If output is valid, save config.
-                                if abs(clk_freq - f) <= f*m:
-                                    config["clko{}_freq".format(n)]  = clk_freq
-                                    config["clko{}_div".format(n)]   = d
-                                    config["clko{}_phase".format(n)] = p
-                                    valid = True
-                                    # Check if ouptut can be used as feedback, if so use it.
-                                    # (We cannot use clocks with dynamic phase adjustment enabled)
-                                    if (d == clkofb_div) and (not (dpa and self.dpa_en)):
-                                        config["clkfb"] = n
-                                    break
-                            if not valid:
+                            d = clkdiv_search(vco_freq, f, m, *self.clko_div_range)
+                            # If output is valid, save config.
+                            if d is not None:
+                                config["clko{}_freq".format(n)]  = vco_freq/d
+                                config["clko{}_div".format(n)]   = d
+                                config["clko{}_phase".format(n)] = p
+                                # Check if ouptut can be used as feedback, if so use it.
+                                # (We cannot use clocks with dynamic phase adjustment enabled)
+                                if (d == clkofb_div) and (not (dpa and self.dpa_en)):
+                                    config["clkfb"] = n
+                            else:
                                 all_valid = False
                         if self.nclkouts == self.nclkouts_max and not config["clkfb"]:
                             # If there is no output suitable for feedback and no spare, not valid
@@ -166,16 +166,12 @@ class NXPLL(Module):
                 (vco_freq_min, vco_freq_max) = self.vco_out_freq_range
                 if vco_freq >= vco_freq_min and vco_freq <= vco_freq_max:
                     for n, (clk, f, p, m) in sorted(self.clkouts.items()):
-                        valid = False
-                        for d in range(*self.clko_div_range):
-                            clk_freq = vco_freq/d
-                            if abs(clk_freq - f) <= f*m:
-                                config["clko{}_freq".format(n)]  = clk_freq
-                                config["clko{}_div".format(n)]   = d
-                                config["clko{}_phase".format(n)] = p
-                                valid = True
-                                break
-                        if not valid:
+                        d = clkdiv_search(vco_freq, f, m, *self.clko_div_range)
+                        if d is not None:
+                            config["clko{}_freq".format(n)]  = vco_freq/d
+                            config["clko{}_div".format(n)]   = d
+                            config["clko{}_phase".format(n)] = p
+                        else:
                             all_valid = False
                 else:
                     all_valid = False
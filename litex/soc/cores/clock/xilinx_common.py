@@ -83,19 +83,19 @@ class XilinxClocking(Module, AutoCSR):
                         d_ranges = [self.clkout_divide_range]
                         if getattr(self, "clkout{}_divide_range".format(n), None) is not None:
                             d_ranges += [getattr(self, "clkout{}_divide_range".format(n))]
+                        # First range with a valid divider is used (ex Fractional Divide of CLKOUT0
+                        # only used when no Integer Divide is valid).
                         for d_range in d_ranges:
-                            for d in clkdiv_range(*d_range):
-                                clk_freq = vco_freq/d
-                                if abs(clk_freq - f) <= f*m:
-                                    config["clkout{}_freq".format(n)]   = clk_freq
-                                    config["clkout{}_divide".format(n)] = d
-                                    config["clkout{}_phase".format(n)]  = p
-                                    valid = True
-                                    break
-                                if valid:
-                                    break
+                            d = clkdiv_search(vco_freq, f, m, *d_range)
+                            if d is not None:
+                                config["clkout{}_freq".format(n)]   = vco_freq/d
+                                config["clkout{}_divide".format(n)] = d
+                                config["clkout{}_phase".format(n)]  = p
+                                valid = True
+                                break
                         if not valid:
                             all_valid = False
+                            break
                 else:
                     all_valid = False
                 if all_valid:
@@ -100,12 +100,12 @@ class NXLRAM(Module):
 
         self.sync += self.bus.ack.eq(self.bus.stb & self.bus.cyc & ~self.bus.ack)
 
-        if init != []:
+        if len(init) > 0:
             self.add_init(init)
 
     def add_init(self, data):
         # Pad it out to make slicing easier below.
-        data += [0] * (self.size // self.width * 8 - len(data))
+        data = list(data) + [0] * (self.size // self.width * 8 - len(data))
         for d in range(self.depth_cascading):
             for w in range(self.width_cascading):
                 offset = d * self.width_cascading * 64*kB + w * 64*kB
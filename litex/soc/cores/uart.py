@@ -475,12 +475,30 @@ class UARTCrossover(UART):
 
     Creates a fully compatible UART that can be used by the CPU as a regular UART and adds a second
     UART, cross-connected to the main one to allow terminal emulation over a Wishbone bridge.
+
+    FIFO levels are also exposed to allow the Host to read/write the exact number of available
+    characters/free entries in single fixed-address bursts.
     """
-    def __init__(self, **kwargs):
+    def __init__(self, xover_rx_fifo_depth=16, **kwargs):
         assert kwargs.get("phy", None) == None
         UART.__init__(self, **kwargs)
-        self.submodules.xover = UART(tx_fifo_depth=1, rx_fifo_depth=16, rx_fifo_rx_we=True)
+        self.submodules.xover = UART(tx_fifo_depth=1, rx_fifo_depth=xover_rx_fifo_depth, rx_fifo_rx_we=True)
         self.comb += [
             self.source.connect(self.xover.sink),
             self.xover.source.connect(self.sink)
         ]
+
+        # FIFO levels.
+        def fifo_level(fifo):
+            return fifo.level if fifo.depth >= 2 else fifo.source.valid
+        xover_tx_depth = self.xover.tx_fifo.depth + self.rx_fifo.depth
+        self._xover_rxlevel = CSRStatus(bits_for(self.xover.rx_fifo.depth),
+            description="Number of characters available in Crossover RX FIFO.")
+        self._xover_txfree  = CSRStatus(bits_for(xover_tx_depth),
+            description="Number of free entries in Crossover TX path (Crossover TX FIFO + RX FIFO).")
+        self.comb += [
+            self._xover_rxlevel.status.eq(fifo_level(self.xover.rx_fifo)),
+            self._xover_txfree.status.eq(xover_tx_depth -
+                fifo_level(self.xover.tx_fifo) -
+                fifo_level(self.rx_fifo)),
+        ]
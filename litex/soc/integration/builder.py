@@ -18,12 +18,16 @@ import subprocess
 import struct
 import shutil
 
+from concurrent.futures import ThreadPoolExecutor
+
 from packaging.version import Version
 
 from litex import get_data_mod
 from litex.gen import colorer
 
 from litex.build.tools import write_to_file
+from litex.build.cache import BuildCache
+from litex.build.generic_toolchain import GenericToolchain
 
 from litex.soc.cores import cpu
 from litex.soc.integration import export, soc_core
@@ -78,6 +82,10 @@ class Builder:
         compile_gateware = True,
         build_backend    = "litex",
 
+        # Build Cache.
+        build_cache      = None,
+        build_cache_size = 10e9,
+
         # Exports.
         csr_json         = None,
         csr_csv          = None,
@@ -105,6 +113,13 @@ class Builder:
         self.compile_gateware = compile_gateware
         self.build_backend    = build_backend
 
+        # Build Cache.
+        self.build_cache      = build_cache
+        self.build_cache_size = build_cache_size
+
+        # Build Report (filled by build).
+        self.report = None
+
         # Exports.
         self.csr_csv  = csr_csv
         self.csr_json = csr_json
@@ -215,7 +230,8 @@ class Builder:
         csr_contents = export.get_csr_header(
             regions   = self.soc.csr_regions,
             constants = self.soc.constants,
-            csr_base  = self.soc.mem_regions["csr"].origin)
+            csr_base  = self.soc.mem_regions["csr"].origin,
+            csr_map   = self.csr_map)
         write_to_file(os.path.join(self.generated_dir, "csr.h"), csr_contents)
 
         # Generate Git SHA1 of tools to git.h
@@ -234,18 +250,12 @@ class Builder:
     def _generate_csr_map(self):
         # JSON Export.
         if self.csr_json is not None:
-            csr_json_contents = export.get_csr_json(
-                csr_regions = self.soc.csr_regions,
-                constants   = self.soc.constants,
-                mem_regions = self.soc.mem_regions)
+            csr_json_contents = export.get_csr_json(csr_map=self.csr_map)
             write_to_file(os.path.realpath(self.csr_json), csr_json_contents)
 
         # CSV Export.
         if self.csr_csv is not None:
-            csr_csv_contents = export.get_csr_csv(
-                csr_regions = self.soc.csr_regions,
-                constants   = self.soc.constants,
-                mem_regions = self.soc.mem_regions)
+            csr_csv_contents = export.get_csr_csv(csr_map=self.csr_map)
             write_to_file(os.path.realpath(self.csr_csv), csr_csv_contents)
 
         # SVD Export.
@@ -274,18 +284,48 @@ class Builder:
         for name, src_dir in self.software_packages:
             _create_dir(os.path.join(self.software_dir, name))
 
-    def _generate_rom_software(self, compile_bios=True):
-        # Compile all software packages.
-         for name, src_dir in self.software_packages:
+    def _get_software_packages_dependencies(self):
+        # libc first, then Compiler-RT/libbase, then LiteX Ecosystem libraries and finally others
+        # packages (BIOS, user's packages) that can depend on all the previous ones.
+        dependencies = {}
+        names        = []
+        for name, src_dir in self.software_packages:
+            if name == "libc":
+                dependencies[name] = []
+            elif name in ["libcompiler_rt", "libbase"]:
+                dependencies[name] = [n for n in names if n in ["libc"]]
+            elif name in soc_software_packages:
+                dependencies[name] = [n for n in names if n in ["libc", "libbase"]]
+            else:
+                dependencies[name] = list(names)
+            names.append(name)
+        return dependencies
 
-            # Skip BIOS compilation when disabled.
-            if name == "bios" and not compile_bios:
-                continue
-            # Compile software package.
+    def _generate_rom_software(self, compile_bios=True):
+        # Compile all software packages (in parallel when dependencies allow it).
+        if not self.compile_software:
+            return
+        dependencies = self._get_software_packages_dependencies()
+        futures      = {}
+
+        def compile(name, src_dir):
+            for dependency in dependencies[name]:
+                if dependency in futures:
+                    futures[dependency].result()
             dst_dir  = os.path.join(self.software_dir, name)
             makefile = os.path.join(src_dir, "Makefile")
-            if self.compile_software:
-                subprocess.check_call(["make", "-C", dst_dir, "-f", makefile])
+            subprocess.check_call(["make", "-C", dst_dir, "-f", makefile])
+
+        # Note: Packages are submitted in dependency order, so waiting on a dependency never blocks
+        # on a package that has not been started.
+        with ThreadPoolExecutor(max_workers=len(self.software_packages)) as executor:
+            for name, src_dir in self.software_packages:
+                # Skip BIOS compilation when disabled.
+                if name == "bios" and not compile_bios:
+                    continue
+                futures[name] = executor.submit(compile, name, src_dir)
+        for future in futures.values():
+            future.result()
 
     def _initialize_rom_software(self):
         # Get BIOS data from compiled BIOS binary.
@@ -295,8 +335,10 @@ class Builder:
             endianness = self.soc.cpu.endianness,
         )
 
-        # Initialize SoC with with BIOS data.
-        self.soc.initialize_rom(bios_data)
+        # Initialize SoC with with BIOS data (ROM is only resized when supported by the toolchain).
+        self.soc.initialize_rom(bios_data,
+            auto_size = getattr(self.soc.platform.toolchain, "rom_auto_size", True),
+        )
 
     def build(self, **kwargs):
         # Pass Output Directory to Platform.
@@ -331,6 +373,12 @@ class Builder:
         # Finalize the SoC.
         self.soc.finalize()
 
+        # Get CSR Map (shared by the csr.h/csr.json/csr.csv exports).
+        self.csr_map = export.get_csr_map(
+            csr_regions = self.soc.csr_regions,
+            constants   = self.soc.constants,
+            mem_regions = self.soc.mem_regions)
+
         # Generate Software Includes/Files.
         self._generate_includes(with_bios=with_bios)
 
@@ -338,6 +386,7 @@ class Builder:
         self._generate_csr_map()
 
         # Compile the BIOS when the SoC uses it.
+        software_future = None
         if self.soc.cpu_type is not None:
             if self.soc.cpu.use_rom:
                 # Prepare/Generate ROM software.
@@ -351,11 +400,23 @@ class Builder:
                     self.soc.check_bios_requirements()
                     self._check_meson()
                 self._prepare_rom_software()
-                self._generate_rom_software(compile_bios=use_bios)
 
-                # Initialize ROM.
+                # Compile ROM software in the background, concurrently with gateware generation.
+                software = ThreadPoolExecutor(max_workers=1)
+                software_future = software.submit(self._generate_rom_software, compile_bios=use_bios)
+                software.shutdown(wait=False)
+
+                # Initialize ROM: Deferred to the emission of the ROM's Memory in the Verilog when
+                # possible (waiting for the BIOS only at this point), else done now.
                 if use_bios and self.soc.integrated_rom_size:
-                    self._initialize_rom_software()
+                    def initialize_rom():
+                        software_future.result()
+                        self._initialize_rom_software()
+                    rom = getattr(self.soc, "rom", None)
+                    if hasattr(rom, "mem"):
+                        rom.mem.deferred_init = initialize_rom
+                    else:
+                        initialize_rom()
 
         # Translate compile_gateware to run.
         if "run" not in kwargs:
@@ -363,10 +424,24 @@ class Builder:
 
         kwargs["build_backend"] = self.build_backend
 
+        # Pass Build Cache to Toolchain (when enabled and supported).
+        if self.build_cache is not None and isinstance(self.soc.platform.toolchain, GenericToolchain):
+            kwargs["build_cache"] = BuildCache(
+                directory = self.build_cache if isinstance(self.build_cache, str) else None,
+                max_size  = self.build_cache_size,
+            )
+
         # Build SoC and pass Verilog Name Space to do_exit.
         vns = self.soc.build(build_dir=self.gateware_dir, **kwargs)
         self.soc.do_exit(vns=vns)
 
+        # Get Build Report (timing/utilization/runtimes, when collected by the toolchain).
+        self.report = getattr(self.soc.platform.toolchain, "report", None)
+
+        # Wait for ROM software compilation.
+        if software_future is not None:
+            software_future.result()
+
         # Generate SoC Documentation.
         if self.generate_doc:
             from litex.soc.doc import generate_docs
@@ -396,6 +471,8 @@ def builder_args(parser):
     builder_group.add_argument("--include-dir",           default=None,        help="Output directory for Header files.")
     builder_group.add_argument("--generated-dir",         default=None,        help="Output directory for Generated files.")
     builder_group.add_argument("--build-backend",         default="litex",     help="Select build backend: litex or edalize.")
+    builder_group.add_argument("--build-cache",           default=None,        help="Enable Build Cache in the specified directory (or default one: ~/.cache/litex/build).", nargs="?", const=True)
+    builder_group.add_argument("--build-cache-size",      default=10,          help="Build Cache maximum size (in GB).", type=float)
     builder_group.add_argument("--no-compile",            action="store_true", help="Disable Software and Gateware compilation.")
     builder_group.add_argument("--no-compile-software",   action="store_true", help="Disable Software compilation only.")
     builder_group.add_argument("--no-compile-gateware",   action="store_true", help="Disable Gateware compilation only.")
@@ -416,6 +493,8 @@ def builder_argdict(args):
         "include_dir"      : args.include_dir,
         "generated_dir"    : args.generated_dir,
         "build_backend"    : args.build_backend,
+        "build_cache"      : args.build_cache,
+        "build_cache_size" : args.build_cache_size*1e9,
         "compile_software" : (not args.no_compile) and (not args.no_compile_software),
         "compile_gateware" : (not args.no_compile) and (not args.no_compile_gateware),
         "csr_csv"          : args.soc_csv,
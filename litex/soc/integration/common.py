@@ -5,11 +5,12 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import os
+import sys
 import math
 import json
 import time
-import struct
 import datetime
+from array import array
 
 from migen import *
 
@@ -62,30 +63,35 @@ def get_mem_data(filename_or_regions, data_width=32, endianness="big", mem_size=
             "file is too big: {}/{} bytes".format(
              data_size, mem_size))
 
-    # Fill data.
+    # Fill data: Load regions in a memory image...
     bytes_per_data = data_width//8
-    data           = [0]*math.ceil(data_size/bytes_per_data)
+    image = bytearray(math.ceil(data_size/bytes_per_data)*bytes_per_data)
     for filename, base in regions.items():
-        base = int(base, 16)
+        start  = (int(base, 16) - offset)//bytes_per_data*bytes_per_data
+        size   = os.path.getsize(filename)
+        length = math.ceil(size/bytes_per_data)*bytes_per_data
+        image[start:start + length] = bytes(length) # Also clears padding of last data word.
         with open(filename, "rb") as f:
-            i = 0
-            while True:
-                w = f.read(bytes_per_data)
-                if not w:
-                    break
-                if len(w) != bytes_per_data:
-                    for _ in range(len(w), bytes_per_data):
-                        w += b'\x00'
-                unpack_order = {
-                    "little": "<I",
-                    "big":    ">I"
-                }[endianness]
-                data[(base - offset)//bytes_per_data + i] = 0
-                for filled_data_width in range(0, data_width, 32):
-                    cur_byte = filled_data_width//8
-                    data[(base - offset)//bytes_per_data + i] |= (struct.unpack(unpack_order, w[cur_byte:cur_byte+4])[0] << filled_data_width)
-                i += 1
-    return data
+            f.readinto(memoryview(image)[start:start + size])
+
+    # ... and convert it to data words (of 32-bit words with endianness, LSB first): Returned as a
+    # compact array for 32/64-bit data widths and as a list for larger data widths.
+    words = array("I")
+    words.frombytes(image)
+    if endianness != sys.byteorder:
+        words.byteswap()
+    if data_width == 32:
+        return words
+    if sys.byteorder == "big":
+        words.byteswap()
+    if data_width == 64:
+        data = array("Q")
+        data.frombytes(words.tobytes())
+        if sys.byteorder == "big":
+            data.byteswap()
+        return data
+    image = words.tobytes()
+    return [int.from_bytes(image[i:i + bytes_per_data], "little") for i in range(0, len(image), bytes_per_data)]
 
 def get_boot_address(filename_or_regions, offset=0):
     # Create memory regions.
@@ -133,6 +133,53 @@ def get_linker_regions(regions):
     return r
 
 
+# CSR Map ------------------------------------------------------------------------------------------
+
+def get_csr_map(csr_regions={}, constants={}, mem_regions={}):
+    """Get the CSR map of a SoC: intermediate model from which csr.h/csr.json/csr.csv are exported.
+
+    The SoC's CSR regions are only walked once (when the model is shared between exports).
+    """
+    alignment = constants.get("CONFIG_CSR_ALIGNMENT", 32)
+    csr_map   = {
+        "alignment"   : alignment,
+        "csr_regions" : {},
+        "constants"   : dict(constants),
+        "memories"    : {},
+    }
+
+    for name, region in csr_regions.items():
+        registers = []
+        origin    = region.origin
+        if not isinstance(region.obj, Memory):
+            for csr in region.obj:
+                nwords = (csr.size + region.busword - 1)//region.busword
+                fields = getattr(getattr(csr, "fields", None), "fields", [])
+                registers.append({
+                    "name"      : csr.name,
+                    "addr"      : origin,
+                    "size"      : nwords,
+                    "width"     : csr.size,
+                    "type"      : "ro" if isinstance(csr, CSRStatus) and not hasattr(csr, "r") else "rw",
+                    "read_only" : getattr(csr, "read_only", False),
+                    "fields"    : {field.name: {"offset": field.offset, "size": field.size} for field in fields},
+                })
+                origin += alignment//8*nwords
+        csr_map["csr_regions"][name] = {
+            "origin"    : region.origin,
+            "busword"   : region.busword,
+            "registers" : registers,
+        }
+
+    for name, region in mem_regions.items():
+        csr_map["memories"][name] = {
+            "base": region.origin,
+            "size": region.length,
+            "type": region.type,
+        }
+
+    return csr_map
+
 # C Export -----------------------------------------------------------------------------------------
 
 def get_git_header():
@@ -245,8 +292,10 @@ def _get_rw_functions_c(reg_name, reg_base, nwords, busword, alignment, read_onl
     return r
 
 
-def get_csr_header(regions, constants, csr_base=None, with_csr_base_define=True, with_access_functions=True):
-    alignment = constants.get("CONFIG_CSR_ALIGNMENT", 32)
+def get_csr_header(regions, constants, csr_base=None, with_csr_base_define=True, with_access_functions=True, csr_map=None):
+    csr_map   = csr_map or get_csr_map(regions, constants)
+    regions   = csr_map["csr_regions"]
+    alignment = csr_map["alignment"]
     r = generated_banner("//")
     if with_access_functions: # FIXME
         r += "#include <generated/soc.h>\n"
@@ -257,55 +306,50 @@ def get_csr_header(regions, constants, csr_base=None, with_csr_base_define=True,
         r += "#ifndef CSR_ACCESSORS_DEFINED\n"
         r += "#include <hw/common.h>\n"
         r += "#endif /* ! CSR_ACCESSORS_DEFINED */\n"
-    csr_base = csr_base if csr_base is not None else regions[next(iter(regions))].origin
+    csr_base = csr_base if csr_base is not None else regions[next(iter(regions))]["origin"]
     if with_csr_base_define:
         r += "#ifndef CSR_BASE\n"
         r += f"#define CSR_BASE {hex(csr_base)}L\n"
         r += "#endif\n"
     for name, region in regions.items():
-        origin = region.origin - csr_base
         r += "\n/* "+name+" */\n"
-        r += f"#define CSR_{name.upper()}_BASE {_get_csr_addr(csr_base, origin, with_csr_base_define)}\n"
-        if not isinstance(region.obj, Memory):
-            for csr in region.obj:
-                nr = (csr.size + region.busword - 1)//region.busword
-                r += _get_rw_functions_c(
-                    reg_name              = name + "_" + csr.name,
-                    reg_base              = origin,
-                    nwords                = nr,
-                    busword               = region.busword,
-                    alignment             = alignment,
-                    read_only             = getattr(csr, "read_only", False),
-                    csr_base              = csr_base,
-                    with_csr_base_define  = with_csr_base_define,
-                    with_access_functions = with_access_functions,
-                )
-                origin += alignment//8*nr
-                if hasattr(csr, "fields"):
-                    for field in csr.fields.fields:
-                        offset = str(field.offset)
-                        size = str(field.size)
-                        r += f"#define CSR_{name.upper()}_{csr.name.upper()}_{field.name.upper()}_OFFSET {offset}\n"
-                        r += f"#define CSR_{name.upper()}_{csr.name.upper()}_{field.name.upper()}_SIZE {size}\n"
-                        if with_access_functions and csr.size <= 32: # FIXME: Implement extract/read functions for csr.size > 32-bit.
-                            reg_name   = name + "_" + csr.name.lower()
-                            field_name = reg_name + "_" + field.name.lower()
-                            r += "static inline uint32_t " + field_name + "_extract(uint32_t oldword) {\n"
-                            r += f"\tuint32_t mask = 0x{(1<<int(size))-1:x};\n"
-                            r += "\treturn ( (oldword >> " + offset + ") & mask );\n}\n"
-                            r += "static inline uint32_t " + field_name + "_read(void) {\n"
-                            r += "\tuint32_t word = " + reg_name + "_read();\n"
-                            r += "\treturn " + field_name + "_extract(word);\n"
-                            r += "}\n"
-                            if not getattr(csr, "read_only", False):
-                                r += "static inline uint32_t " + field_name + "_replace(uint32_t oldword, uint32_t plain_value) {\n"
-                                r += f"\tuint32_t mask = 0x{(1<<int(size))-1:x};\n"
-                                r += "\treturn (oldword & (~(mask << " + offset + "))) | (mask & plain_value)<< " + offset + " ;\n}\n"
-                                r += "static inline void " + field_name + "_write(uint32_t plain_value) {\n"
-                                r += "\tuint32_t oldword = " + reg_name + "_read();\n"
-                                r += "\tuint32_t newword = " + field_name + "_replace(oldword, plain_value);\n"
-                                r += "\t" + reg_name + "_write(newword);\n"
-                                r += "}\n"
+        r += f"#define CSR_{name.upper()}_BASE {_get_csr_addr(csr_base, region['origin'] - csr_base, with_csr_base_define)}\n"
+        for csr in region["registers"]:
+            r += _get_rw_functions_c(
+                reg_name              = name + "_" + csr["name"],
+                reg_base              = csr["addr"] - csr_base,
+                nwords                = csr["size"],
+                busword               = region["busword"],
+                alignment             = alignment,
+                read_only             = csr["read_only"],
+                csr_base              = csr_base,
+                with_csr_base_define  = with_csr_base_define,
+                with_access_functions = with_access_functions,
+            )
+            for field_name, field in csr["fields"].items():
+                offset = str(field["offset"])
+                size   = str(field["size"])
+                r += f"#define CSR_{name.upper()}_{csr['name'].upper()}_{field_name.upper()}_OFFSET {offset}\n"
+                r += f"#define CSR_{name.upper()}_{csr['name'].upper()}_{field_name.upper()}_SIZE {size}\n"
+                if with_access_functions and csr["width"] <= 32: # FIXME: Implement extract/read functions for csr.size > 32-bit.
+                    reg_name   = name + "_" + csr["name"].lower()
+                    field_name = reg_name + "_" + field_name.lower()
+                    r += "static inline uint32_t " + field_name + "_extract(uint32_t oldword) {\n"
+                    r += f"\tuint32_t mask = 0x{(1<<int(size))-1:x};\n"
+                    r += "\treturn ( (oldword >> " + offset + ") & mask );\n}\n"
+                    r += "static inline uint32_t " + field_name + "_read(void) {\n"
+                    r += "\tuint32_t word = " + reg_name + "_read();\n"
+                    r += "\treturn " + field_name + "_extract(word);\n"
+                    r += "}\n"
+                    if not csr["read_only"]:
+                        r += "static inline uint32_t " + field_name + "_replace(uint32_t oldword, uint32_t plain_value) {\n"
+                        r += f"\tuint32_t mask = 0x{(1<<int(size))-1:x};\n"
+                        r += "\treturn (oldword & (~(mask << " + offset + "))) | (mask & plain_value)<< " + offset + " ;\n}\n"
+                        r += "static inline void " + field_name + "_write(uint32_t plain_value) {\n"
+                        r += "\tuint32_t oldword = " + reg_name + "_read();\n"
+                        r += "\tuint32_t newword = " + field_name + "_replace(oldword, plain_value);\n"
+                        r += "\t" + reg_name + "_write(newword);\n"
+                        r += "}\n"
 
     r += "\n#endif\n"
     return r
@@ -371,9 +415,7 @@ def get_i2c_header(i2c_init_values):
 
 # JSON Export --------------------------------------------------------------------------------------
 
-def get_csr_json(csr_regions={}, constants={}, mem_regions={}):
-    alignment = constants.get("CONFIG_CSR_ALIGNMENT", 32)
-
+def _get_csr_json_dict(csr_map):
     d = {
         "csr_bases":     {},
         "csr_registers": {},
@@ -381,39 +423,35 @@ def get_csr_json(csr_regions={}, constants={}, mem_regions={}):
         "memories":      {},
     }
 
-    for name, region in csr_regions.items():
-        d["csr_bases"][name] = region.origin
-        region_origin = region.origin
-        if not isinstance(region.obj, Memory):
-            for csr in region.obj:
-                _size = (csr.size + region.busword - 1)//region.busword
-                _type = "rw"
-                if isinstance(csr, CSRStatus) and not hasattr(csr, "r"):
-                    _type = "ro"
-                d["csr_registers"][name + "_" + csr.name] = {
-                    "addr": region_origin,
-                    "size": _size,
-                    "type": _type
-                }
-                region_origin += alignment//8*_size
-
-    for name, value in constants.items():
+    for name, region in csr_map["csr_regions"].items():
+        d["csr_bases"][name] = region["origin"]
+        for csr in region["registers"]:
+            d["csr_registers"][name + "_" + csr["name"]] = {
+                "addr": csr["addr"],
+                "size": csr["size"],
+                "type": csr["type"]
+            }
+            if len(csr["fields"]) > 0:
+                d["csr_registers"][name + "_" + csr["name"]]["fields"] = csr["fields"]
+
+    for name, value in csr_map["constants"].items():
         d["constants"][name.lower()] = value.lower() if isinstance(value, str) else value
 
-    for name, region in mem_regions.items():
-        d["memories"][name.lower()] = {
-            "base": region.origin,
-            "size": region.length,
-            "type": region.type,
-        }
+    for name, region in csr_map["memories"].items():
+        d["memories"][name.lower()] = region
+
+    return d
 
-    return json.dumps(d, indent=4)
+def get_csr_json(csr_regions={}, constants={}, mem_regions={}, csr_map=None):
+    csr_map = csr_map or get_csr_map(csr_regions, constants, mem_regions)
+    return json.dumps(_get_csr_json_dict(csr_map), indent=4)
 
 
 # CSV Export --------------------------------------------------------------------------------------
 
-def get_csr_csv(csr_regions={}, constants={}, mem_regions={}):
-    d = json.loads(get_csr_json(csr_regions, constants, mem_regions))
+def get_csr_csv(csr_regions={}, constants={}, mem_regions={}, csr_map=None):
+    csr_map = csr_map or get_csr_map(csr_regions, constants, mem_regions)
+    d = _get_csr_json_dict(csr_map)
     r = generated_banner("#")
     for name, value in d["csr_bases"].items():
         r += "csr_base,{},0x{:08x},,\n".format(name, value)
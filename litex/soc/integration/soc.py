@@ -961,7 +961,7 @@ class SoC(LiteXModule, SoCCoreCompat):
             colorer("added", color="green"),
             self.bus.regions[name]))
         setattr(self, name, ram)
-        if contents != []:
+        if len(contents) > 0:
             self.add_config(f"{name}_INIT", 1)
 
     def add_rom(self, name, origin, size, contents=[], mode="rx"):
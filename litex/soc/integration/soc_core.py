@@ -160,7 +160,7 @@ class SoCCore(LiteXSoC):
             integrated_rom_init = []
             integrated_rom_size = 0
         self.integrated_rom_size        = integrated_rom_size
-        self.integrated_rom_initialized = integrated_rom_init != []
+        self.integrated_rom_initialized = len(integrated_rom_init) > 0
 
         # SRAM.
         self.integrated_sram_size = integrated_sram_size
@@ -235,8 +235,8 @@ class SoCCore(LiteXSoC):
     def add_csr(self, csr_name, csr_id=None, use_loc_if_exists=False):
         self.csr.add(csr_name, csr_id, use_loc_if_exists=use_loc_if_exists)
 
-    def initialize_rom(self, data):
-        self.init_rom(name="rom", contents=data)
+    def initialize_rom(self, data, auto_size=True):
+        self.init_rom(name="rom", contents=data, auto_size=auto_size)
 
     def add_memory_region(self, name, origin, length, type="cached"):
         self.bus.add_region(name, SoCRegion(origin=origin, size=length,
@@ -157,6 +157,69 @@ static uint32_t get_uint32(unsigned char* data)
 			  (uint32_t) data[3];
 }
 
+/* Decompress an LZ4 block (sequences of literals/matches, matches only referencing data of the
+   block). Returns the decompressed length or -1 on malformed block. */
+static int sfl_lz4_decompress(unsigned char *dst, unsigned int dst_len, const unsigned char *src, unsigned int src_len)
+{
+	const unsigned char *src_end = src + src_len;
+	unsigned char *d       = dst;
+	unsigned char *dst_end = dst + dst_len;
+	unsigned char *m;
+	unsigned int token;
+	unsigned int length;
+	unsigned int offset;
+	unsigned int b;
+
+	while(src < src_end) {
+		token = *src++;
+
+		/* Literals */
+		length = token >> 4;
+		if(length == 15) {
+			do {
+				if(src >= src_end)
+					return -1;
+				b = *src++;
+				length += b;
+			} while(b == 255);
+		}
+		if((length > (unsigned int)(src_end - src)) || (length > (unsigned int)(dst_end - d)))
+			return -1;
+		memcpy(d, src, length);
+		d   += length;
+		src += length;
+
+		/* Last sequence only has literals */
+		if(src >= src_end)
+			break;
+
+		/* Match */
+		if((src_end - src) < 2)
+			return -1;
+		offset = src[0] | ((unsigned int)src[1] << 8);
+		src += 2;
+		if((offset == 0) || (offset > (unsigned int)(d - dst)))
+			return -1;
+		length = token & 0xf;
+		if(length == 15) {
+			do {
+				if(src >= src_end)
+					return -1;
+				b = *src++;
+				length += b;
+			} while(b == 255);
+		}
+		length += 4;
+		if(length > (unsigned int)(dst_end - d))
+			return -1;
+		/* Byte copy: match can overlap the output */
+		m = d - offset;
+		while(length--)
+			*d++ = *m++;
+	}
+	return d - dst;
+}
+
 #define MAX_FAILURES 256
 
 /* Returns 1 if other boot methods should be tried */
@@ -267,6 +330,80 @@ int serialboot(void)
 				uart_write(SFL_ACK_SUCCESS);
 				break;
 			}
+			/* On SFL_CMD_LOAD_LZ4... */
+			case SFL_CMD_LOAD_LZ4: {
+				char *load_addr;
+				unsigned int length;
+
+				/* Check header (address + decompressed length) */
+				load_addr = NULL;
+				length    = 0;
+				if(frame.payload_length >= 6) {
+					load_addr = (char *)(uintptr_t) get_uint32(&frame.payload[0]);
+					length    = ((unsigned int)frame.payload[4] << 8) | frame.payload[5];
+				}
+
+				/* Decompress payload */
+				if((frame.payload_length < 6) ||
+				   (sfl_lz4_decompress((unsigned char *)load_addr, length, &frame.payload[6], frame.payload_length - 6) != length)) {
+					/* Acknowledge the error */
+					uart_write(SFL_ACK_ERROR);
+
+					/* Increment failures and exit when max is reached */
+					failures++;
+					if(failures == MAX_FAILURES) {
+						printf("Too many consecutive errors, aborting");
+						return 1;
+					}
+					break;
+				}
+
+				/* Reset failures */
+				failures = 0;
+
+				/* Acknowledge and continue */
+				uart_write(SFL_ACK_SUCCESS);
+				break;
+			}
+			/* On SFL_CMD_CRC32... */
+			case SFL_CMD_CRC32: {
+				uint32_t addr;
+				uint32_t block_size;
+				unsigned int count;
+				unsigned int crc;
+				unsigned int j;
+
+				/* Check payload (address + block size + count) */
+				if(frame.payload_length < 10) {
+					/* Acknowledge the error */
+					uart_write(SFL_ACK_ERROR);
+
+					/* Increment failures and exit when max is reached */
+					failures++;
+					if(failures == MAX_FAILURES) {
+						printf("Too many consecutive errors, aborting");
+						return 1;
+					}
+					break;
+				}
+
+				/* Reset failures */
+				failures = 0;
+
+				/* Acknowledge and send the CRC32 of each block */
+				addr       = get_uint32(&frame.payload[0]);
+				block_size = get_uint32(&frame.payload[4]);
+				count      = ((unsigned int)frame.payload[8] << 8) | frame.payload[9];
+				uart_write(SFL_ACK_SUCCESS);
+				for(j=0; j<count; j++) {
+					crc = crc32((unsigned char *)(uintptr_t)(addr + j*block_size), block_size);
+					uart_write((crc >> 24) & 0xff);
+					uart_write((crc >> 16) & 0xff);
+					uart_write((crc >>  8) & 0xff);
+					uart_write((crc >>  0) & 0xff);
+				}
+				break;
+			}
 			/* On SFL_CMD_ABORT ... */
 			case SFL_CMD_JUMP: {
 				uint32_t jump_addr;
@@ -20,6 +20,10 @@ struct sfl_frame {
 #define SFL_CMD_LOAD		0x01
 #define SFL_CMD_JUMP		0x02
 
+/* Extended commands */
+#define SFL_CMD_LOAD_LZ4	0x06 /* Payload: address (4), length (2), LZ4 compressed data.  */
+#define SFL_CMD_CRC32		0x07 /* Payload: address (4), block size (4), number of blocks (2). */
+
 /* Replies */
 #define SFL_ACK_SUCCESS		'K'
 #define SFL_ACK_CRCERROR	'C'
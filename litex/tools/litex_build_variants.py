@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import sys
+import json
+import argparse
+
+from litex.build.orchestrator import get_variants, build_variants, get_summary
+
+# Run ----------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="LiteX multi-variant build orchestrator.")
+    parser.add_argument("spec",                              help="Variants spec (JSON file).")
+    parser.add_argument("--target",     default=None,        help="Target (module:callable returning the SoC), overrides spec's one.")
+    parser.add_argument("--output-dir", default="build",     help="Base output directory (one sub-directory per variant).")
+    parser.add_argument("--jobs",       default=None,        help="Number of variants elaborated in parallel (default: number of CPUs).", type=int)
+    parser.add_argument("--cpus",       default=None,        help="CPUs budget for toolchain runs (default: number of CPUs).",             type=int)
+    parser.add_argument("--memory",     default=None,        help="Memory budget for toolchain runs (in GB, default: unconstrained).",     type=float)
+    parser.add_argument("--only",       default=None,        help="Only build variants whose name contains the specified string.")
+    parser.add_argument("--list",       action="store_true", help="List variants and exit.")
+    parser.add_argument("--json",       default=None,        help="Write results to the specified JSON file.")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    if args.target is not None:
+        spec["target"] = args.target
+    variants = get_variants(spec)
+    if args.only is not None:
+        variants = [variant for variant in variants if args.only in variant.name]
+
+    # List.
+    if args.list:
+        for variant in variants:
+            print(f"{variant.name}: soc={variant.soc_kwargs} builder={variant.builder_kwargs} toolchain={variant.toolchain_kwargs}")
+        return
+
+    # Build.
+    results = build_variants(variants,
+        output_dir = args.output_dir,
+        jobs       = args.jobs,
+        cpus       = args.cpus,
+        memory     = args.memory,
+    )
+    print(get_summary(results))
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    if any(r["status"] != "ok" for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -8,20 +8,29 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import os
+import sys
 import time
+import mmap
+import zlib
 import threading
 import argparse
 import socket
+from array import array
+from collections import deque
 
 from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
 from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
 from litex.tools.remote.etherbone import EtherboneIPC
-from litex.tools.remote.csr_builder import CSRBuilder
+from litex.tools.remote.etherbone import etherbone_packet_header_length
+from litex.tools.remote.etherbone import encode_packet, encode_record, decode_record
+from litex.tools.remote.csr_builder import CSRBuilder, CSRMap
+from litex.tools.remote.trace import TraceRecorder, TRACE_READ, TRACE_WRITE, TRACE_READ_ADDRS
 
 # Remote Client ------------------------------------------------------------------------------------
 
 class RemoteClient(EtherboneIPC, CSRBuilder):
-    def __init__(self, host="localhost", port=1234, base_address=0, csr_csv=None, csr_data_width=None, debug=False):
+    def __init__(self, host="localhost", port=1234, base_address=0, csr_csv=None, csr_data_width=None, debug=False, trace=None):
+        EtherboneIPC.__init__(self)
         # If csr_csv set to None and local csr.csv file exists, use it.
         if csr_csv is None and os.path.exists("csr.csv"):
             csr_csv = "csr.csv"
@@ -35,6 +44,8 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
         self.port         = port
         self.debug        = debug
         self.base_address = base_address if base_address is not None else 0
+        self.trace        = trace
+        self.tracer       = None
 
     def _receive_server_info(self):
         info = str(self.socket.recv(128))
@@ -47,14 +58,20 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
         if hasattr(self, "socket"):
             return
         self.socket = socket.create_connection((self.host, self.port), 5.0)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.socket.settimeout(5.0)
         self._receive_server_info()
+        if self.trace is not None:
+            self.tracer = TraceRecorder(self.trace)
 
     def close(self):
         if not hasattr(self, "socket"):
             return
         self.socket.close()
         del self.socket
+        if self.tracer is not None:
+            self.tracer.close()
+            self.tracer = None
 
     def read(self, addr, length=None, burst="incr"):
         length_int = 1 if length is None else length
@@ -77,13 +94,93 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
         if self.debug:
             for i, data in enumerate(datas):
                 print("read 0x{:08x} @ 0x{:08x}".format(data, self.base_address + addr + 4*i))
+        if self.tracer is not None:
+            self.tracer.log(TRACE_READ, addr, datas, burst=burst)
         return datas[0] if length is None else datas
 
-    def write(self, addr, datas):
+    def read_addrs(self, addrs):
+        # Send all the read records (up to 255 reads each) before collecting the responses.
+        chunks = [addrs[i:i+255] for i in range(0, len(addrs), 255)]
+        for chunk in chunks:
+            record = EtherboneRecord()
+            record.reads  = EtherboneReads(addrs=[self.base_address + addr for addr in chunk])
+            record.rcount = len(record.reads)
+
+            packet = EtherbonePacket()
+            packet.records = [record]
+            packet.encode()
+            self.send_packet(self.socket, packet)
+
+        datas = []
+        for chunk in chunks:
+            packet = EtherbonePacket(self.receive_packet(self.socket))
+            packet.decode()
+            datas += packet.records.pop().writes.get_datas()
+        if self.debug:
+            for addr, data in zip(addrs, datas):
+                print("read 0x{:08x} @ 0x{:08x}".format(data, self.base_address + addr))
+        if self.tracer is not None:
+            self.tracer.log(TRACE_READ_ADDRS, addrs[0] if addrs else 0, datas, addrs=addrs)
+        return datas
+
+    def read_stream(self, addr, length, window=16, burst_length=255):
+        """Streamed reads.
+
+        Read length words from addr with maximal bursts and up to window requests in flight, yield
+        the datas as array("I") chunks.
+        """
+        inflight = deque()
+        offset   = 0
+        while (offset < length) or inflight:
+            # Send requests while window is not full.
+            while (offset < length) and (len(inflight) < window):
+                n = min(burst_length, length - offset)
+                base = self.base_address + addr + 4*offset
+                record = encode_record(reads=range(base, base + 4*n, 4))
+                self.socket.sendall(encode_packet([record]))
+                inflight.append((offset, n))
+                offset += n
+            # Receive oldest response.
+            packet = self.receive_packet(self.socket)
+            if packet == 0:
+                raise ConnectionError("Connection closed by server.")
+            datas = decode_record(packet, etherbone_packet_header_length)[3]
+            chunk_offset, n = inflight.popleft()
+            if (datas is None) or (len(datas) != n):
+                raise IOError("Unexpected read response: {} words received, {} expected.".format(
+                    0 if datas is None else len(datas), n))
+            if self.tracer is not None:
+                self.tracer.log(TRACE_READ, addr + 4*chunk_offset, datas)
+            yield datas
+
+    def write_stream(self, addr, data, burst_length=255):
+        """Streamed writes of a little-endian bytes-like object with maximal bursts.
+
+        A partial last word is completed with a Read-Modify-Write, preserving the bytes following
+        the data.
+        """
+        data = memoryview(data).cast("B")
+        for offset in range(0, len(data), 4*burst_length):
+            chunk = data[offset:offset + 4*burst_length]
+            words = array("I")
+            words.frombytes(chunk[:len(chunk) & ~0x3])
+            if len(chunk) % 4:
+                tail    = bytes(chunk[len(chunk) & ~0x3:])
+                current = self.read(addr + offset + (len(chunk) & ~0x3)).to_bytes(4, "little")
+                words.append(int.from_bytes(tail + current[len(tail):], "little"))
+            if sys.byteorder == "big":
+                words.byteswap()
+            record = encode_record(base_addr=self.base_address + addr + offset, writes=words)
+            self.socket.sendall(encode_packet([record]))
+            if self.tracer is not None:
+                self.tracer.log(TRACE_WRITE, addr + offset, words)
+
+    def write(self, addr, datas, burst="incr"):
         datas = datas if isinstance(datas, list) else [datas]
         record = EtherboneRecord()
         record.writes = EtherboneWrites(base_addr=self.base_address + addr, datas=[d for d in datas])
         record.wcount = len(record.writes)
+        record.wff    = (burst == "fixed")
 
         packet = EtherbonePacket()
         packet.records = [record]
@@ -93,6 +190,8 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
         if self.debug:
             for i, data in enumerate(datas):
                 print("write 0x{:08x} @ 0x{:08x}".format(data, self.base_address + addr + 4*i))
+        if self.tracer is not None:
+            self.tracer.log(TRACE_WRITE, addr, datas, burst=burst)
 
 # Utils --------------------------------------------------------------------------------------------
 
@@ -150,6 +249,102 @@ def write_memory(host, csr_csv, port, addr, data):
 
     bus.close()
 
+def _words_to_le_bytes(words):
+    if sys.byteorder == "big":
+        words = array("I", words)
+        words.byteswap()
+    return words.tobytes()
+
+def dump_memory(host, csr_csv, port, addr, length, filename, window=16):
+    bus = RemoteClient(host=host, csr_csv=csr_csv, port=port)
+    bus.open()
+
+    crc       = 0
+    remaining = length
+    start     = time.time()
+    with open(filename, "wb") as f:
+        for datas in bus.read_stream(addr, (length + 3)//4, window=window):
+            data = _words_to_le_bytes(datas)[:remaining]
+            crc  = zlib.crc32(data, crc)
+            f.write(data)
+            remaining -= len(data)
+    duration = time.time() - start
+    print("Dumped {} bytes from 0x{:08x} to {} in {:.2f}s ({:.2f}KB/s), CRC32: 0x{:08x}.".format(
+        length, addr, filename, duration, length/max(duration, 1e-9)/1e3, crc))
+
+    bus.close()
+
+def load_memory(host, csr_csv, port, filename, addr, window=16, verify=True):
+    bus = RemoteClient(host=host, csr_csv=csr_csv, port=port)
+    bus.open()
+
+    with open(filename, "rb") as f:
+        length = os.fstat(f.fileno()).st_size
+        if length == 0:
+            print(f"{filename} is empty, nothing to load.")
+            bus.close()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            crc   = zlib.crc32(data)
+            start = time.time()
+            bus.write_stream(addr, data)
+            # Read back (also ensures the writes have been done).
+            readback_crc = 0
+            readback_len = length
+            for datas in bus.read_stream(addr, (length + 3)//4, window=window):
+                data_rb = _words_to_le_bytes(datas)[:readback_len]
+                readback_crc  = zlib.crc32(data_rb, readback_crc)
+                readback_len -= len(data_rb)
+            duration = time.time() - start
+    print("Loaded {} bytes from {} to 0x{:08x} in {:.2f}s ({:.2f}KB/s), CRC32: 0x{:08x}.".format(
+        length, filename, addr, duration, length/max(duration, 1e-9)/1e3, crc))
+    if verify and (readback_crc != crc):
+        bus.close()
+        raise ValueError(f"CRC32 mismatch on readback: 0x{readback_crc:08x} != 0x{crc:08x}.")
+
+    bus.close()
+
+def sample_registers(host, csr_csv, port, regs, rate, duration, depth, filename=None):
+    from litex.tools.remote.sampler import CSRSampler
+
+    bus = RemoteClient(host=host, csr_csv=csr_csv, port=port)
+    bus.open()
+
+    sampler = CSRSampler(bus, regs, rate=rate, depth=depth)
+    try:
+        sampler.start(duration=duration)
+        sampler.join()
+    except KeyboardInterrupt:
+        sampler.stop()
+    print(sampler)
+    if filename is not None:
+        sampler.export(filename)
+    else:
+        timestamps, values = sampler.get()
+        for name, v in zip(sampler.names, values.T):
+            if len(v):
+                print(f"{name}: min 0x{int(v.min()):x} / max 0x{int(v.max()):x} / last 0x{int(v[-1]):x}")
+
+    bus.close()
+
+def replay(host, csr_csv, port, filename, reads=False, delays=False):
+    from litex.tools.remote.trace import replay_trace
+
+    bus = RemoteClient(host=host, csr_csv=csr_csv, port=port)
+    bus.open()
+
+    start = time.time()
+    nwrites, nbursts = replay_trace(bus, filename, reads=reads, delays=delays)
+    print("Replayed {} writes from {} in {} bursts in {:.3f}s.".format(nwrites, filename, nbursts, time.time() - start))
+
+    bus.close()
+
+def trace_view(csr_csv, filename):
+    from litex.tools.remote.trace import summarize_trace
+
+    csr_map = CSRMap.load(csr_csv) if os.path.exists(csr_csv) else None
+    print(summarize_trace(filename, csr_map))
+
 # Gui ----------------------------------------------------------------------------------------------
 
 def run_gui(host, csr_csv, port):
@@ -311,10 +506,10 @@ def run_gui(host, csr_csv, port):
             vccbram = gen_xadc_data(get_xadc_vccbram, n=xadc_points)
 
         while dpg.is_dearpygui_running():
-            # CSR Update.
-            for name, reg in bus.regs.__dict__.items():
-                value = reg.read()
-                dpg.set_value(item=name, value=f"0x{reg.read():x}")
+            # CSR Update (merged reads).
+            regs = [reg for reg in bus.regs.__dict__.values() if reg.mode in ["rw", "ro"]]
+            for reg, value in zip(regs, bus.read_many(regs)):
+                dpg.set_value(item=reg.name, value=f"0x{value:x}")
 
             # XADC Update.
             if with_xadc:
@@ -360,6 +555,7 @@ def run_gui(host, csr_csv, port):
 def main():
     parser = argparse.ArgumentParser(description="LiteX Client utility.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument("--csr-csv", default="csr.csv",     help="CSR configuration file")
+    parser.add_argument("--csr-cache", action="store_true",  help="Cache the parsed CSR configuration file (in ~/.cache/litex/csr).")
     parser.add_argument("--host",    default="localhost",   help="Host ip address")
     parser.add_argument("--port",    default="1234",        help="Host bind port.")
     parser.add_argument("--ident",   action="store_true",   help="Dump SoC identifier.")
@@ -370,12 +566,42 @@ def main():
     parser.add_argument("--write",   default=None, nargs=2, help="Do a MMAP Write to SoC bus (--write addr/reg data).")
     parser.add_argument("--length",  default="4",           help="MMAP access length.")
     parser.add_argument("--gui",     action="store_true",   help="Run Gui.")
+
+    # Sampling arguments.
+    parser.add_argument("--sample",          default=None,    help="Sample registers (--sample reg0,reg1,...).")
+    parser.add_argument("--sample-rate",     default="1e3",   help="Sampling rate (in Hz).")
+    parser.add_argument("--sample-duration", default="1.0",   help="Sampling duration (in s).")
+    parser.add_argument("--sample-depth",    default="65536", help="Number of samples kept in the ring buffer.")
+    parser.add_argument("--sample-output",   default=None,    help="Export samples to the specified file (.csv or .npz).")
+
+    # Trace arguments.
+    parser.add_argument("--replay",          default=None,         help="Replay the writes of a recorded trace (RemoteClient(trace=file)).")
+    parser.add_argument("--replay-reads",    action="store_true",  help="Also replay the reads of the trace.")
+    parser.add_argument("--replay-delays",   action="store_true",  help="Preserve the delays (>1ms) between recorded accesses.")
+    parser.add_argument("--trace-view",      default=None,         help="Summarize a recorded trace (accesses hot spots).")
+
+    # Memory dump/load arguments.
+    parser.add_argument("--dump-memory", default=None,          help="Dump SoC memory to a binary file (--dump-memory addr:length:file).")
+    parser.add_argument("--load-memory", default=None,          help="Load a binary file to SoC memory (--load-memory file:addr).")
+    parser.add_argument("--window",      default="16",          help="Number of burst requests in flight for memory dump/load.")
+    parser.add_argument("--no-verify",   action="store_true",   help="Disable CRC32 verification of loaded memory.")
+
+    # Benchmark arguments.
+    parser.add_argument("--bench",          action="store_true", help="Benchmark remote accesses through the server.")
+    parser.add_argument("--bench-local",    default=None,        help="Benchmark local stand-ins of the Comms (ex: uart,udp,pcie,sim).")
+    parser.add_argument("--bench-codec",    action="store_true", help="Benchmark Etherbone encode/decode.")
+    parser.add_argument("--bench-addr",     default=None,        help="Benchmark base address (default: main_ram/sram base).")
+    parser.add_argument("--bench-duration", default="1.0",       help="Duration of each benchmark (in s).")
+    parser.add_argument("--bench-json",     default=None,        help="Write benchmark results to the specified JSON file.")
     args = parser.parse_args()
 
     host    = args.host
     csr_csv = args.csr_csv
     port    = int(args.port, 0)
 
+    if args.csr_cache:
+        CSRMap.cache = True
+
     if args.ident:
         dump_identifier(
             host    = host,
@@ -418,6 +644,55 @@ def main():
             data    = int(args.write[1], 0),
         )
 
+    if args.trace_view:
+        trace_view(csr_csv, args.trace_view)
+
+    if args.replay:
+        replay(
+            host     = args.host,
+            csr_csv  = csr_csv,
+            port     = port,
+            filename = args.replay,
+            reads    = args.replay_reads,
+            delays   = args.replay_delays,
+        )
+
+    if args.sample:
+        sample_registers(
+            host     = args.host,
+            csr_csv  = csr_csv,
+            port     = port,
+            regs     = args.sample.split(","),
+            rate     = float(args.sample_rate),
+            duration = float(args.sample_duration),
+            depth    = int(args.sample_depth, 0),
+            filename = args.sample_output,
+        )
+
+    if args.dump_memory:
+        addr, length, filename = args.dump_memory.split(":", 2)
+        dump_memory(
+            host     = args.host,
+            csr_csv  = csr_csv,
+            port     = port,
+            addr     = int(addr, 0),
+            length   = int(length, 0),
+            filename = filename,
+            window   = int(args.window, 0),
+        )
+
+    if args.load_memory:
+        filename, addr = args.load_memory.rsplit(":", 1)
+        load_memory(
+            host     = args.host,
+            csr_csv  = csr_csv,
+            port     = port,
+            filename = filename,
+            addr     = int(addr, 0),
+            window   = int(args.window, 0),
+            verify   = not args.no_verify,
+        )
+
     if args.gui:
         run_gui(
             host    = args.host,
@@ -425,5 +700,23 @@ def main():
             port    = port,
         )
 
+    if args.bench or args.bench_local or args.bench_codec:
+        from litex.tools.remote import benchmark
+        duration = float(args.bench_duration)
+        if args.bench_codec:
+            results = {"EtherboneCodec": benchmark.bench_etherbone_codec(duration=duration)}
+        elif args.bench_local:
+            results = benchmark.run_local_benchmarks(args.bench_local.split(","), duration=duration)
+        else:
+            bus_factory = lambda: RemoteClient(host=host, csr_csv=csr_csv, port=port)
+            if args.bench_addr is not None:
+                addr = int(args.bench_addr, 0)
+            else:
+                mems = bus_factory().mems
+                addr = getattr(mems, "main_ram", None) or getattr(mems, "sram")
+                addr = addr.base
+            results = {"RemoteClient": benchmark.run_benchmarks(bus_factory, addr, duration=duration)}
+        benchmark.dump_results(results, args.bench_json)
+
 if __name__ == "__main__":
     main()
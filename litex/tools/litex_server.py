@@ -13,6 +13,7 @@ import argparse
 import os
 import sys
 import socket
+import select
 import time
 import threading
 
@@ -67,14 +68,81 @@ def _read_merger(addrs, max_length=256, bursts=["incr", "fixed"]):
             burst_type   = "incr"
     yield (burst_base, burst_length, burst_type)
 
+# Read Optimizer -----------------------------------------------------------------------------------
+
+def _read_optimizer(addrs, max_length=256, bursts=["incr", "fixed"], reorder=False, max_gap=0):
+    """Reads optimizer
+
+    Take a list of read addresses and return a list of (base, length, burst) tuples to issue and,
+    for each input address, the index of its data in the concatenated burst results.
+
+    By default, the order is preserved and _read_merger is used. With reorder (opt-in, only safe
+    when reads have no side effects: no FIFOs, clear-on-read registers, ...) and all addresses
+    distinct, reads are sorted to maximize bursts length; holes of up to max_gap words between reads
+    are also read to join bursts (strided accesses).
+    """
+    if reorder and (len(set(addrs)) == len(addrs)):
+        merged = []
+        for addr in sorted(addrs):
+            if merged:
+                base, length, burst = merged[-1]
+                gap = addr - (base + 4*length)
+                if (gap >= 0) and (gap % 4 == 0) and (gap <= 4*max_gap) and ((addr - base)//4 < max_length):
+                    merged[-1] = (base, (addr - base)//4 + 1, "incr")
+                    continue
+            merged.append((addr, 1, "incr"))
+        positions = {}
+        offset    = 0
+        for base, length, burst in merged:
+            for i in range(length):
+                positions[base + 4*i] = offset + i
+            offset += length
+        return merged, [positions[addr] for addr in addrs]
+    merged = list(_read_merger(addrs, max_length=max_length, bursts=bursts))
+    return merged, list(range(len(addrs)))
+
+# Write Merger -------------------------------------------------------------------------------------
+
+def _write_merger(writes, max_length=255):
+    """Sequential writes merger
+
+    Take a list of (base, datas) writes as input and coalesce the adjacent ones:
+    Example: [(0x0, [a]), (0x4, [b, c]), (0x10, [d])] input will return [(0x0, [a, b, c]), (0x10, [d])].
+    """
+    merged = []
+    for base, datas in writes:
+        if merged:
+            last_base, last_datas = merged[-1]
+            if (base == last_base + 4*len(last_datas)) and (len(last_datas) + len(datas) <= max_length):
+                last_datas += datas
+                continue
+        merged.append((base, list(datas)))
+    return merged
+
 # Remote Server ------------------------------------------------------------------------------------
 
 class RemoteServer(EtherboneIPC):
-    def __init__(self, comm, bind_ip, bind_port=1234):
-        self.comm      = comm
-        self.bind_ip   = bind_ip
-        self.bind_port = bind_port
-        self.lock      = False
+    def __init__(self, comm, bind_ip, bind_port=1234, read_reorder=False, read_max_gap=0, stats=False):
+        EtherboneIPC.__init__(self)
+        self.comm         = comm
+        self.bind_ip      = bind_ip
+        self.bind_port    = bind_port
+        self.lock         = threading.Lock()
+        self.read_reorder = read_reorder
+        self.read_max_gap = read_max_gap
+        self.stats        = {} if stats else None
+        self.reset_stats()
+
+        # Transport capabilities.
+        name = self.comm.__class__.__name__
+        self.max_length = getattr(self.comm, "max_burst", {
+            "CommUART": 255,
+            "CommUDP":    1,
+        }.get(name, 1))
+        self.bursts = {
+            "CommUART": ["incr", "fixed"],
+            "CommSim":  ["incr", "fixed"],
+        }.get(name, ["incr"])
 
     def open(self):
         if hasattr(self, "socket"):
@@ -93,6 +161,11 @@ class RemoteServer(EtherboneIPC):
         self.comm.close()
         if not hasattr(self, "socket"):
             return
+        # Shutdown socket first to wake up the threads waiting for connections.
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         self.socket.close()
         del self.socket
 
@@ -105,74 +178,178 @@ class RemoteServer(EtherboneIPC):
         info = ":".join(info)
         client_socket.sendall(bytes(info, "UTF-8"))
 
+    def reset_stats(self):
+        if self.stats is not None:
+            self.stats.update({
+                "packets"            : 0,
+                "reads"              : 0,
+                "read_transactions"  : 0,
+                "writes"             : 0,
+                "write_transactions" : 0,
+            })
+
+    def print_stats(self):
+        if self.stats is None:
+            return
+        s = self.stats
+        print("[stats] packets: {} / reads: {} in {} transactions ({:.2f}/transaction) / "
+              "writes: {} in {} transactions ({:.2f}/transaction)".format(
+            s["packets"],
+            s["reads"],  s["read_transactions"],  s["reads"]/max(s["read_transactions"], 1),
+            s["writes"], s["write_transactions"], s["writes"]/max(s["write_transactions"], 1)))
+
+    def _receive_packets(self, client_socket, max_packets=64):
+        # Receive a packet and the ones already pending on the socket (to be optimized together).
+        packets = []
+        while len(packets) < max_packets:
+            if len(packets) and not self.packet_pending(client_socket):
+                if not select.select([client_socket], [], [], 0)[0]:
+                    break
+            packet = self.receive_packet(client_socket)
+            if packet == 0:
+                break
+            packet = EtherbonePacket(packet)
+            packet.decode()
+            packets.append(packet)
+        return packets
+
+    def _do_writes(self, writes):
+        # Coalesce incrementing writes, keep fixed (FIFO) writes as bursts when supported by the
+        # Comm (or split them in single writes).
+        bursts = []
+        incr   = []
+        def flush_incr():
+            bursts.extend((base, datas, "incr") for base, datas in _write_merger(incr))
+            incr.clear()
+        for base, datas, burst in writes:
+            if burst == "incr":
+                incr.append((base, datas))
+                continue
+            flush_incr()
+            if "fixed" in self.bursts:
+                for n in range(0, len(datas), self.max_length):
+                    bursts.append((base, datas[n:n + self.max_length], "fixed"))
+            else:
+                bursts.extend((base, [data], "incr") for data in datas)
+        flush_incr()
+        if hasattr(self.comm, "write_bursts"):
+            self.comm.write_bursts(bursts)
+        else:
+            for base, datas, burst in bursts:
+                if burst == "incr":
+                    self.comm.write(base, datas)
+                else:
+                    self.comm.write(base, datas, burst)
+        if self.stats is not None:
+            self.stats["writes"]             += sum(len(datas) for base, datas, burst in writes)
+            self.stats["write_transactions"] += len(bursts)
+
+    def _do_reads(self, reads):
+        # Optimize the reads of all the records together, then dispatch datas to each record.
+        addrs = []
+        for record_addrs in reads:
+            addrs += record_addrs
+        merged, index = _read_optimizer(addrs,
+            max_length = self.max_length,
+            bursts     = self.bursts,
+            reorder    = self.read_reorder,
+            max_gap    = self.read_max_gap)
+        datas = []
+        if hasattr(self.comm, "read_bursts"):
+            for burst_datas in self.comm.read_bursts(merged):
+                datas += burst_datas
+        else:
+            for addr, length, burst in merged:
+                datas += self.comm.read(addr, length, burst)
+        if self.stats is not None:
+            self.stats["reads"]             += len(addrs)
+            self.stats["read_transactions"] += len(merged)
+        r      = []
+        offset = 0
+        for record_addrs in reads:
+            r.append([datas[i] for i in index[offset:offset + len(record_addrs)]])
+            offset += len(record_addrs)
+        return r
+
+    def _handle_records(self, client_socket, records):
+        # Split records in ordered Write/Read operations.
+        ops = []
+        for record in records:
+            if record.writes != None:
+                burst = "fixed" if record.wff else "incr"
+                ops.append(("w", (record.writes.base_addr, record.writes.get_datas(), burst)))
+            if record.reads != None:
+                ops.append(("r", record.reads.get_addrs()))
+
+        # Execute consecutive writes/reads together.
+        while ops:
+            kind = ops[0][0]
+            n    = 1
+            while (n < len(ops)) and (ops[n][0] == kind):
+                n += 1
+            group, ops = [op[1] for op in ops[:n]], ops[n:]
+            if kind == "w":
+                self._do_writes(group)
+            else:
+                for reads in self._do_reads(group):
+                    record = EtherboneRecord()
+                    record.writes = EtherboneWrites(datas=reads)
+                    record.wcount = len(record.writes)
+
+                    packet = EtherbonePacket()
+                    packet.records = [record]
+                    packet.encode()
+                    self.send_packet(client_socket, packet)
+
     def _serve_thread(self):
         while True:
-            client_socket, addr = self.socket.accept()
+            try:
+                client_socket, addr = self.socket.accept()
+            except (OSError, AttributeError):
+                # Server closed.
+                return
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self._send_server_info(client_socket)
             print("Connected with " + addr[0] + ":" + str(addr[1]))
             try:
                 # Serve Etherbone reads/writes.
                 while True:
-                    # Receive packet.
+                    # Receive packets.
                     try:
-                        packet = self.receive_packet(client_socket)
-                        if packet == 0:
+                        packets = self._receive_packets(client_socket)
+                        if len(packets) == 0:
                             break
                     except:
                         break
 
-                    # Decode Packet.
-                    packet = EtherbonePacket(packet)
-                    packet.decode()
-
-                    # Get Packet's Record.
-                    record = packet.records.pop()
+                    # Get Packets' Records.
+                    records = []
+                    for packet in packets:
+                        records += packet.records
 
                     # Hardware lock/reservation.
-                    while self.lock:
-                        time.sleep(0.01)
-                    self.lock = True
-
-                    # Handle Etherbone writes.
-                    if record.writes != None:
-                        self.comm.write(record.writes.base_addr, record.writes.get_datas())
-
-                    # Handle Etherbone reads.
-                    if record.reads != None:
-                        max_length = {
-                            "CommUART": 256,
-                            "CommUDP":    1,
-                        }.get(self.comm.__class__.__name__, 1)
-                        bursts = {
-                            "CommUART": ["incr", "fixed"]
-                        }.get(self.comm.__class__.__name__, ["incr"])
-                        reads = []
-                        for addr, length, burst in _read_merger(record.reads.get_addrs(),
-                            max_length  = max_length,
-                            bursts      = bursts):
-                            reads += self.comm.read(addr, length, burst)
-
-                        record = EtherboneRecord()
-                        record.writes = EtherboneWrites(datas=reads)
-                        record.wcount = len(record.writes)
-
-                        packet = EtherbonePacket()
-                        packet.records = [record]
-                        packet.encode()
-                        self.send_packet(client_socket, packet)
-
-                    # Release hardware lock.
-                    self.lock = False
+                    with self.lock:
+                        # Handle Etherbone writes/reads.
+                        if self.stats is not None:
+                            self.stats["packets"] += len(packets)
+                        self._handle_records(client_socket, records)
 
             finally:
                 print("Disconnect")
+                self.print_stats()
                 client_socket.close()
 
     def start(self, nthreads):
+        self.serve_threads = []
         for i in range(nthreads):
             self.serve_thread = threading.Thread(target=self._serve_thread)
             self.serve_thread.setDaemon(True)
             self.serve_thread.start()
+            self.serve_threads.append(self.serve_thread)
+
+    def join(self, timeout=None):
+        for thread in getattr(self, "serve_threads", []):
+            thread.join(timeout)
 
 # Run ----------------------------------------------------------------------------------------------
 
@@ -182,11 +359,15 @@ def main():
     parser.add_argument("--bind-ip",         default="localhost",    help="Host bind address.")
     parser.add_argument("--bind-port",       default=1234,           help="Host bind port.")
     parser.add_argument("--debug",           action="store_true",    help="Enable debug.")
+    parser.add_argument("--stats",           action="store_true",    help="Report requests merging statistics on client disconnection.")
+    parser.add_argument("--read-reorder",    action="store_true",    help="Sort reads to maximize bursts (only for reads without side effects).")
+    parser.add_argument("--read-max-gap",    default=0,              help="Max number of unrequested words read to join sorted reads in a burst.")
 
     # UART arguments
     parser.add_argument("--uart",            action="store_true",    help="Select UART interface.")
     parser.add_argument("--uart-port",       default=None,           help="Set UART port.")
     parser.add_argument("--uart-baudrate",   default=115200,         help="Set UART baudrate.")
+    parser.add_argument("--uart-write-burst", default=8,             help="Set UART max write burst length (up to 255, requires enough UARTBone RX buffering).")
 
     # JTAG arguments
     parser.add_argument("--jtag",            action="store_true",             help="Select JTAG interface.")
@@ -203,6 +384,12 @@ def main():
     parser.add_argument("--pcie",            action="store_true",    help="Select PCIe interface.")
     parser.add_argument("--pcie-bar",        default=None,           help="Set PCIe BAR.")
 
+    # Sim arguments
+    parser.add_argument("--sim",             action="store_true",    help="Select simulated SoC interface (in-process memory model).")
+    parser.add_argument("--sim-csr-csv",     default=None,           help="CSR configuration file describing the simulated SoC.")
+    parser.add_argument("--sim-latency",     default=0,              help="Simulated link latency per transaction (in s).")
+    parser.add_argument("--sim-bandwidth",   default=None,           help="Simulated link bandwidth (in bytes/s).")
+
     # USB arguments
     parser.add_argument("--usb",             action="store_true",    help="Select USB interface.")
     parser.add_argument("--usb-vid",         default=None,           help="Set USB vendor ID.")
@@ -220,7 +407,7 @@ def main():
         uart_port = args.uart_port
         uart_baudrate = int(float(args.uart_baudrate))
         print("[CommUART] port: {} / baudrate: {} / ".format(uart_port, uart_baudrate), end="")
-        comm = CommUART(uart_port, uart_baudrate, debug=args.debug)
+        comm = CommUART(uart_port, uart_baudrate, debug=args.debug, max_write_burst=int(args.uart_write_burst))
 
     # JTAG mode
     elif args.jtag:
@@ -275,11 +462,27 @@ def main():
             vid = int(vid, base=0)
         comm = CommUSB(vid=vid, pid=pid, max_retries=args.usb_max_retries, debug=args.debug)
 
+    # Sim mode
+    elif args.sim:
+        from litex.tools.remote.comm_sim import CommSim
+        sim_bandwidth = None if args.sim_bandwidth is None else float(args.sim_bandwidth)
+        print("[CommSim] latency: {}s / bandwidth: {} / ".format(args.sim_latency, sim_bandwidth), end="")
+        comm = CommSim(
+            csr_csv   = args.sim_csr_csv,
+            latency   = float(args.sim_latency),
+            bandwidth = sim_bandwidth,
+            debug     = args.debug,
+        )
+
     else:
         parser.print_help()
         exit()
 
-    server = RemoteServer(comm, args.bind_ip, int(args.bind_port))
+    server = RemoteServer(comm, args.bind_ip, int(args.bind_port),
+        read_reorder = args.read_reorder,
+        read_max_gap = int(args.read_max_gap),
+        stats        = args.stats,
+    )
     server.open()
     server.start(4)
     try:
@@ -243,7 +243,7 @@ class SimSoC(SoCCore):
                 l2_cache_reverse        = False,
                 with_bist               = with_sdram_bist
             )
-            if sdram_init != []:
+            if len(sdram_init) > 0:
                 # Skip SDRAM test to avoid corrupting pre-initialized contents.
                 self.add_constant("SDRAM_TEST_DISABLE")
             else:
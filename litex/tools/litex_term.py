@@ -8,15 +8,23 @@
 # Copyright (c) 2016 whitequark <whitequark@whitequark.org>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import io
 import sys
 import signal
 import os
 import time
 import serial
 import threading
+import selectors
 import argparse
 import json
 import socket
+import zlib
+import mmap
+import struct
+import binascii
+import hashlib
+from collections import deque
 
 # Console ------------------------------------------------------------------------------------------
 
@@ -59,10 +67,11 @@ else:
     import pty
     class Console:
         def __init__(self):
-            self.fd = sys.stdin.fileno()
-            self.default_settings = termios.tcgetattr(self.fd)
+            self.default_settings = None
 
         def configure(self):
+            self.fd = sys.stdin.fileno()
+            self.default_settings = termios.tcgetattr(self.fd)
             settings = termios.tcgetattr(self.fd)
             settings[3] = settings[3] & ~termios.ICANON & ~termios.ECHO
             settings[6][termios.VMIN] = 1
@@ -70,7 +79,8 @@ else:
             termios.tcsetattr(self.fd, termios.TCSANOW, settings)
 
         def unconfigure(self):
-            termios.tcsetattr(self.fd, termios.TCSAFLUSH, self.default_settings)
+            if self.default_settings is not None:
+                termios.tcsetattr(self.fd, termios.TCSAFLUSH, self.default_settings)
 
         def getkey(self):
             return os.read(self.fd, 1)
@@ -95,6 +105,7 @@ class CrossoverUART:
                 present = True
         if not present:
             raise ValueError(f"CrossoverUART {name} not present in design.")
+        self.lock = threading.Lock()
 
     def open(self):
         self.bus.open()
@@ -111,66 +122,129 @@ class CrossoverUART:
         self.pty2crossover_thread.join(timeout=0.1)
         self.crossover2pty_thread.join(timeout=0.1)
 
+    # Polling backoff: Poll continuously while data is flowing, then exponentially slower (up to
+    # max_delay) when idle.
+    min_delay = 100e-6
+    max_delay = 10e-3
+
+    def get_rx_count(self):
+        # Number of characters available (from the FIFO level when present in the design).
+        with self.lock:
+            if hasattr(self, "rxlevel"):
+                return self.rxlevel.read()
+            if self.rxfull.read():
+                return 16
+            return 0 if self.rxempty.read() else 1
+
+    def get_tx_count(self):
+        # Number of characters that can be written (from the FIFO level when present in the design).
+        with self.lock:
+            if hasattr(self, "txfree"):
+                return self.txfree.read()
+            return 0 if self.txfull.read() else 1
+
     def pty2crossover(self):
         while self.alive:
-            r = os.read(self.file, 1)
-            self.rxtx.write(ord(r))
+            data  = os.read(self.file, 4096)
+            delay = 0
+            while data:
+                n = self.get_tx_count()
+                if n == 0:
+                    delay = min(max(2*delay, self.min_delay), self.max_delay)
+                    time.sleep(delay)
+                    continue
+                delay = 0
+                with self.lock:
+                    self.bus.write(self.rxtx.addr, list(data[:n]), burst="fixed")
+                data = data[n:]
 
     def crossover2pty(self):
+        delay = 0
         while self.alive:
-            if self.rxfull.read():
-                length = 16
-            elif not self.rxempty.read():
-                length = 1
-            else:
-                time.sleep(1e-3)
+            n = self.get_rx_count()
+            if n == 0:
+                delay = min(max(2*delay, self.min_delay), self.max_delay)
+                time.sleep(delay)
                 continue
-            r = self.bus.read(self.rxtx.addr, length=length, burst="fixed")
-            for v in r:
-                os.write(self.file, bytes(chr(v).encode("utf-8")))
+            delay = 0
+            with self.lock:
+                r = self.bus.read(self.rxtx.addr, length=n, burst="fixed")
+            os.write(self.file, bytes(v & 0xff for v in r))
 
 # JTAG UART ----------------------------------------------------------------------------------------
 
 from litex.build.openocd import OpenOCD
 
 class JTAGUART:
-    def __init__(self, config="openocd_xc7_ft2232.cfg", port=20000, chain=1):
-        self.config = config
-        self.port   = port
-        self.chain  = chain
+    def __init__(self, config="openocd_xc7_ft2232.cfg", port=20000, chain=1, timeout=10.0):
+        self.config  = config
+        self.port    = port
+        self.chain   = chain
+        self.timeout = timeout
 
     def open(self):
         self.file, self.name = pty.openpty()
         self.alive = True
         self.jtag2tcp_thread = threading.Thread(target=self.jtag2tcp, daemon=True)
         self.jtag2tcp_thread.start()
-        time.sleep(0.5)
-        self.pty2tcp_thread  = threading.Thread(target=self.pty2tcp, daemon=True)
-        self.tcp2pty_thread  = threading.Thread(target=self.tcp2pty, daemon=True)
-        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.tcp.connect(("localhost", self.port))
-        self.pty2tcp_thread.start()
-        self.tcp2pty_thread.start()
+        self.tcp = self.connect()
+        self.tcp.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.bridge_thread = threading.Thread(target=self.bridge, daemon=True)
+        self.bridge_thread.start()
+
+    def connect(self):
+        # Wait for OpenOCD's stream server to accept connections (instead of a fixed delay).
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                return socket.create_connection(("localhost", self.port), timeout=1.0)
+            except OSError:
+                if not self.jtag2tcp_thread.is_alive():
+                    raise RuntimeError("OpenOCD JTAG stream exited before accepting connections.")
+                if time.time() > deadline:
+                    raise TimeoutError(f"OpenOCD JTAG stream not ready on port {self.port}.")
+                time.sleep(10e-3)
 
     def close(self):
         self.alive = False
+        self.bridge_thread.join(timeout=0.5)
         self.jtag2tcp_thread.join(timeout=0.1)
-        self.pty2tcp_thread.join(timeout=0.1)
-        self.tcp2pty_thread.join(timeout=0.1)
+        self.tcp.close()
 
     def jtag2tcp(self):
         prog = OpenOCD(self.config)
         prog.stream(self.port, self.chain)
 
-    def pty2tcp(self):
+    def bridge(self):
+        # Forward data in chunks between the pty and the TCP stream, in both directions.
+        self.tcp.setblocking(True)
+        self.tcp.settimeout(None)
+        sel = selectors.DefaultSelector()
+        sel.register(self.file, selectors.EVENT_READ, self.pty2tcp)
+        sel.register(self.tcp,  selectors.EVENT_READ, self.tcp2pty)
         while self.alive:
-            r = os.read(self.file, 1)
-            self.tcp.send(r)
+            for key, events in sel.select(timeout=0.1):
+                if not key.data():
+                    self.alive = False
+        sel.close()
+
+    def pty2tcp(self):
+        try:
+            r = os.read(self.file, 4096)
+        except OSError:
+            return False
+        self.tcp.sendall(r)
+        return len(r) > 0
 
     def tcp2pty(self):
-        while self.alive:
-            r = self.tcp.recv(1)
-            os.write(self.file, bytes(r))
+        r = self.tcp.recv(4096)
+        if not r:
+            return False
+        r = memoryview(r)
+        while len(r):
+            n = os.write(self.file, r)
+            r = r[n:]
+        return True
 
 # Intel/Altera JTAG UART via nios2-terminal
 class Nios2Terminal():
@@ -208,12 +282,20 @@ sfl_magic_req = b"sL5DdSMmkekro\n"
 sfl_magic_ack = b"z6IHG7cYDID6o\n"
 
 sfl_payload_length  = 255
+sfl_resync_time     = 0.1 # Must be > device's frame timeout (62.5ms).
 
 # General commands
 sfl_cmd_abort       = b"\x00"
 sfl_cmd_load        = b"\x01"
 sfl_cmd_jump        = b"\x02"
 
+# Extended commands
+sfl_cmd_load_lz4    = b"\x06"
+sfl_cmd_crc32       = b"\x07"
+
+sfl_delta_block_size = 4096
+sfl_crc32_max_blocks = 64
+
 # Replies
 sfl_ack_success  = b"K"
 sfl_ack_crcerror = b"C"
@@ -230,60 +312,487 @@ class SFLFrame:
         return crc16(self.cmd + self.payload)
 
     def encode(self):
-        packet = bytes([len(self.payload)])
-        packet += self.compute_crc().to_bytes(2, "big")
-        packet += self.cmd
-        packet += self.payload
+        packet = bytearray(4 + len(self.payload))
+        packet[0]  = len(self.payload)
+        packet[1:3] = self.compute_crc().to_bytes(2, "big")
+        packet[3:4] = self.cmd
+        packet[4:]  = self.payload
         return packet
 
 # CRC16 --------------------------------------------------------------------------------------------
 
-crc16_table = [
-    0x0000, 0x1021, 0x2042, 0x3063, 0x4084, 0x50A5, 0x60C6, 0x70E7,
-    0x8108, 0x9129, 0xA14A, 0xB16B, 0xC18C, 0xD1AD, 0xE1CE, 0xF1EF,
-    0x1231, 0x0210, 0x3273, 0x2252, 0x52B5, 0x4294, 0x72F7, 0x62D6,
-    0x9339, 0x8318, 0xB37B, 0xA35A, 0xD3BD, 0xC39C, 0xF3FF, 0xE3DE,
-    0x2462, 0x3443, 0x0420, 0x1401, 0x64E6, 0x74C7, 0x44A4, 0x5485,
-    0xA56A, 0xB54B, 0x8528, 0x9509, 0xE5EE, 0xF5CF, 0xC5AC, 0xD58D,
-    0x3653, 0x2672, 0x1611, 0x0630, 0x76D7, 0x66F6, 0x5695, 0x46B4,
-    0xB75B, 0xA77A, 0x9719, 0x8738, 0xF7DF, 0xE7FE, 0xD79D, 0xC7BC,
-    0x48C4, 0x58E5, 0x6886, 0x78A7, 0x0840, 0x1861, 0x2802, 0x3823,
-    0xC9CC, 0xD9ED, 0xE98E, 0xF9AF, 0x8948, 0x9969, 0xA90A, 0xB92B,
-    0x5AF5, 0x4AD4, 0x7AB7, 0x6A96, 0x1A71, 0x0A50, 0x3A33, 0x2A12,
-    0xDBFD, 0xCBDC, 0xFBBF, 0xEB9E, 0x9B79, 0x8B58, 0xBB3B, 0xAB1A,
-    0x6CA6, 0x7C87, 0x4CE4, 0x5CC5, 0x2C22, 0x3C03, 0x0C60, 0x1C41,
-    0xEDAE, 0xFD8F, 0xCDEC, 0xDDCD, 0xAD2A, 0xBD0B, 0x8D68, 0x9D49,
-    0x7E97, 0x6EB6, 0x5ED5, 0x4EF4, 0x3E13, 0x2E32, 0x1E51, 0x0E70,
-    0xFF9F, 0xEFBE, 0xDFDD, 0xCFFC, 0xBF1B, 0xAF3A, 0x9F59, 0x8F78,
-    0x9188, 0x81A9, 0xB1CA, 0xA1EB, 0xD10C, 0xC12D, 0xF14E, 0xE16F,
-    0x1080, 0x00A1, 0x30C2, 0x20E3, 0x5004, 0x4025, 0x7046, 0x6067,
-    0x83B9, 0x9398, 0xA3FB, 0xB3DA, 0xC33D, 0xD31C, 0xE37F, 0xF35E,
-    0x02B1, 0x1290, 0x22F3, 0x32D2, 0x4235, 0x5214, 0x6277, 0x7256,
-    0xB5EA, 0xA5CB, 0x95A8, 0x8589, 0xF56E, 0xE54F, 0xD52C, 0xC50D,
-    0x34E2, 0x24C3, 0x14A0, 0x0481, 0x7466, 0x6447, 0x5424, 0x4405,
-    0xA7DB, 0xB7FA, 0x8799, 0x97B8, 0xE75F, 0xF77E, 0xC71D, 0xD73C,
-    0x26D3, 0x36F2, 0x0691, 0x16B0, 0x6657, 0x7676, 0x4615, 0x5634,
-    0xD94C, 0xC96D, 0xF90E, 0xE92F, 0x99C8, 0x89E9, 0xB98A, 0xA9AB,
-    0x5844, 0x4865, 0x7806, 0x6827, 0x18C0, 0x08E1, 0x3882, 0x28A3,
-    0xCB7D, 0xDB5C, 0xEB3F, 0xFB1E, 0x8BF9, 0x9BD8, 0xABBB, 0xBB9A,
-    0x4A75, 0x5A54, 0x6A37, 0x7A16, 0x0AF1, 0x1AD0, 0x2AB3, 0x3A92,
-    0xFD2E, 0xED0F, 0xDD6C, 0xCD4D, 0xBDAA, 0xAD8B, 0x9DE8, 0x8DC9,
-    0x7C26, 0x6C07, 0x5C64, 0x4C45, 0x3CA2, 0x2C83, 0x1CE0, 0x0CC1,
-    0xEF1F, 0xFF3E, 0xCF5D, 0xDF7C, 0xAF9B, 0xBFBA, 0x8FD9, 0x9FF8,
-    0x6E17, 0x7E36, 0x4E55, 0x5E74, 0x2E93, 0x3EB2, 0x0ED1, 0x1EF0
-]
+def crc16(l):
+    # CRC-16/XMODEM (CCITT polynomial 0x1021, initial value 0), same as the BIOS's crc16.
+    return binascii.crc_hqx(l, 0)
+
+# LZ4 ----------------------------------------------------------------------------------------------
+
+def _lz4_ext_length(n):
+    # Number of extension bytes of a literals/match length (beyond the 4-bit token field).
+    return 0 if n < 15 else (n - 15)//255 + 1
+
+def _lz4_write_length(out, n):
+    if n >= 15:
+        n -= 15
+        while n >= 255:
+            out.append(255)
+            n -= 255
+        out.append(n)
+
+def lz4_compress_frame(data, start, end, max_length, max_output=0xffff):
+    """Compress data[start:end] in an LZ4 block of at most max_length bytes.
+
+    Compress as much data as fits in the block (and at most max_output bytes) and return
+    (block, consumed). Matches only reference data of the block so that each frame can be
+    decompressed independently on the device.
+    """
+    out    = bytearray()
+    table  = {}
+    limit  = min(end, start + max_output)
+    anchor = start
+    i      = start
+    while True:
+        # Find a match (skipping faster in incompressible data).
+        match = None
+        while i + 4 <= limit:
+            key  = data[i:i+4]
+            cand = table.get(key)
+            table[key] = i
+            if cand is not None:
+                match = cand
+                break
+            i += 1 + ((i - anchor) >> 6)
+        if match is None:
+            break
+
+        # Extend match.
+        length = 4
+        while (i + length + 64 <= limit) and (data[match+length:match+length+64] == data[i+length:i+length+64]):
+            length += 64
+        while (i + length < limit) and (data[match+length] == data[i+length]):
+            length += 1
+
+        # Check remaining space (keeping 1 byte for the last sequence's token).
+        literals = i - anchor
+        space    = max_length - len(out) - (1 + _lz4_ext_length(literals) + literals + 2) - 1
+        if space < 0:
+            break
+        length = min(length, 4 + 14 + 255*space)
+
+        # Emit sequence.
+        out.append((min(literals, 15) << 4) | min(length - 4, 15))
+        _lz4_write_length(out, literals)
+        out += data[anchor:i]
+        out += (i - match).to_bytes(2, "little")
+        _lz4_write_length(out, length - 4)
+        i     += length
+        anchor = i
+
+    # Last sequence: literals only.
+    literals = min(limit - anchor, max_length - len(out) - 1)
+    while (literals > 0) and (1 + _lz4_ext_length(literals) + literals > max_length - len(out)):
+        literals -= 1
+    out.append(min(literals, 15) << 4)
+    _lz4_write_length(out, literals)
+    out += data[anchor:anchor + literals]
+    return bytes(out), anchor + literals - start
+
+# SFL Frames ---------------------------------------------------------------------------------------
+
+sfl_load_header = struct.Struct(">BHBI") # Payload length, CRC, Cmd, Address.
+
+def sfl_load_frames(data, address, ranges, frame_length, compress, nbuffers):
+    """Generate the (frame, length) LOAD/LOAD_LZ4 frames of the ranges of data.
+
+    Frames are encoded in place in nbuffers preallocated buffers (used as a ring, raw payloads
+    being copied from a memoryview of data) and returned as memoryviews: a frame remains valid
+    until nbuffers more frames are generated. Since frames are acknowledged in order, nbuffers
+    must be larger than the maximum number of frames in flight.
+    """
+    buffers = [memoryview(bytearray(4 + sfl_payload_length)) for i in range(nbuffers)]
+    view    = memoryview(data)
+    nframes = 0
+    skip    = 0
+    for start, end in ranges:
+        offset = start
+        while offset < end:
+            frame    = buffers[nframes % nbuffers]
+            nframes += 1
+            # Compressed frame (when compression is worth it).
+            payload = None
+            if compress and skip == 0:
+                block, n = lz4_compress_frame(data, offset, end, sfl_payload_length - 6)
+                if n > frame_length:
+                    cmd     = sfl_cmd_load_lz4[0]
+                    payload = n.to_bytes(2, "big") + block
+                else:
+                    # Incompressible data, retry compression later.
+                    skip = 16
+            # Raw frame.
+            if payload is None:
+                skip    = max(skip - 1, 0)
+                n       = min(frame_length, end - offset)
+                cmd     = sfl_cmd_load[0]
+                payload = view[offset:offset + n]
+            length = 4 + len(payload)
+            frame[8:4 + length] = payload
+            sfl_load_header.pack_into(frame, 0, length, 0, cmd, address + offset)
+            frame[1:3] = crc16(frame[3:4 + length]).to_bytes(2, "big")
+            yield frame[:4 + length], n
+            offset += n
+
+def sfl_bench_frames(length=4*1024*1024, compress=False, nbuffers=129):
+    """Benchmark frames generation (host CPU cost of the upload).
+
+    Return the frames/s and the equivalent baudrate (10 bits per byte) that could be sustained."""
+    data    = bytes(range(256))*(length//512) + os.urandom(length//2)
+    start   = time.perf_counter()
+    nframes = 0
+    nbytes  = 0
+    for frame, n in sfl_load_frames(data, 0x40000000, [(0, len(data))], sfl_payload_length - 4, compress, nbuffers):
+        nframes += 1
+        nbytes  += len(frame)
+    elapsed = time.perf_counter() - start
+    return {
+        "frames"   : nframes,
+        "frames/s" : nframes/elapsed,
+        "MB/s"     : length/elapsed/1e6,
+        "baudrate" : 10*nbytes/elapsed,
+    }
+
+# SFL Uploader -------------------------------------------------------------------------------------
+
+class SFLImageCache:
+    """Hashes of the last images uploaded per port/address (JSON file)."""
+    def __init__(self, filename=None):
+        if filename is None:
+            cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "litex")
+            filename  = os.path.join(cache_dir, "litex_term_images.json")
+        self.filename = filename
+        self.lock     = threading.Lock()
+        try:
+            with open(filename, "r") as f:
+                self.hashes = json.load(f)
+        except (OSError, ValueError):
+            self.hashes = {}
+
+    def get(self, port, address):
+        with self.lock:
+            return self.hashes.get(port, {}).get(f"0x{address:08x}", None)
+
+    def set(self, port, address, digest):
+        with self.lock:
+            self.hashes.setdefault(port, {})[f"0x{address:08x}"] = digest
+            try:
+                os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+                with open(self.filename, "w") as f:
+                    json.dump(self.hashes, f, indent=4)
+            except OSError:
+                pass
+
+class SFLUploader:
+    """SFL serial boot uploader (on an opened serial port with the device in serial boot mode)."""
+    def __init__(self, port, safe=False, max_window=128, compress=False, delta=False):
+        self.port        = port
+        self.safe        = safe
+        self.max_window  = max_window
+        self.compress    = compress
+        self.delta       = delta
+        self.extensions  = None # SFL extensions support (unknown until probed).
+
+    def wait_magic(self, timeout=10.0):
+        """Wait for the device's serial boot request and answer it."""
+        port_timeout = self.port.timeout
+        self.port.timeout = 0.1
+        buf      = b""
+        deadline = time.time() + timeout
+        try:
+            while time.time() < deadline:
+                buf = (buf + self.port.read(max(self.port.in_waiting, 1)))[-len(sfl_magic_req):]
+                if buf == sfl_magic_req:
+                    self.port.write(sfl_magic_ack)
+                    return True
+        finally:
+            self.port.timeout = port_timeout
+        return False
+
+    def send_frame(self, frame):
+        retry = 1
+        while retry:
+            self.port.write(frame.encode())
+            # Get the reply from the device
+            reply = self.port.read()
+            if reply == sfl_ack_success:
+                retry = 0
+            elif reply in [sfl_ack_crcerror, sfl_ack_error]:
+                self.resync()
+                retry = 1
+            else:
+                print("[LITEX-TERM] Got unknown reply '{}' from the device, aborting.".format(reply))
+                return 0
+        return 1
+
+    def receive_upload_response(self):
+        reply = self.port.read()
+        if reply == sfl_ack_success:
+            return True
+        elif reply == sfl_ack_crcerror:
+            print("[LITEX-TERM] Upload to device failed due to data corruption (CRC error)")
+        else:
+            print(f"[LITEX-TERM] Got unexpected response from device '{reply}'")
+        sys.exit(1)
 
+    def query_crc32(self, address, block_size, count):
+        """Query the CRC32 of count blocks of block_size bytes of the device's memory.
 
-def crc16(l):
-    crc = 0
-    for d in l:
-        crc = crc16_table[((crc >> 8) ^ d) & 0xff] ^ (crc << 8)
-    return crc & 0xffff
+        Return the CRC32s or None when the device does not support the command.
+        """
+        frame         = SFLFrame()
+        frame.cmd     = sfl_cmd_crc32
+        frame.payload = address.to_bytes(4, "big") + block_size.to_bytes(4, "big") + count.to_bytes(2, "big")
+        port_timeout  = self.port.timeout
+        self.port.timeout = 2.0 + block_size*count/1e6
+        try:
+            for retry in range(16):
+                self.port.write(frame.encode())
+                reply = self.port.read(1)
+                if reply == sfl_ack_success:
+                    datas = self.port.read(4*count)
+                    if len(datas) == 4*count:
+                        return [int.from_bytes(datas[4*i:4*(i+1)], "big") for i in range(count)]
+                self.resync()
+                if reply == sfl_ack_unknown:
+                    return None
+        finally:
+            self.port.timeout = port_timeout
+        print("[LITEX-TERM] CRC32 query failed, aborting.")
+        sys.exit(1)
+
+    def probe_extensions(self):
+        if self.extensions is None:
+            self.extensions = (self.query_crc32(0, 0, 0) is not None)
+            if not self.extensions:
+                print("[LITEX-TERM] Device does not support SFL extensions, compression/delta disabled.")
+        return self.extensions
+
+    def get_delta_ranges(self, data, address):
+        """Compare the CRC32 of the blocks of data with the device's memory and return the ranges
+        (start, end) of data that differ (merged)."""
+        block_size = sfl_delta_block_size
+        nblocks    = len(data)//block_size
+        crcs       = []
+        for n in range(0, nblocks, sfl_crc32_max_blocks):
+            count = min(sfl_crc32_max_blocks, nblocks - n)
+            crcs += self.query_crc32(address + n*block_size, block_size, count)
+        if len(data) % block_size:
+            crcs.append(None) # Last partial block is always uploaded.
+        ranges = []
+        for i, crc in enumerate(crcs):
+            start = i*block_size
+            end   = min(start + block_size, len(data))
+            if crc != zlib.crc32(data[start:end]):
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], end)
+                else:
+                    ranges.append((start, end))
+        return ranges
+
+    def upload(self, filename, address):
+        return self.upload_images([(filename, address)])
+
+    def upload_images(self, images, cache=None):
+        """Pipelined upload of images (list of (filename, address)).
+
+        Frames of all the images are streamed back-to-back in a single sliding window (so window
+        adaptation is only done once). With a cache (SFLImageCache), images identical to the last
+        ones uploaded to the same port/address are skipped when the device's memory CRC32 confirms
+        it (images are always uploaded to devices without SFL extensions).
+        """
+        # Parameters.
+        frame_length = 64 if self.safe else (sfl_payload_length - 4)
+        max_window   = 1  if self.safe else self.max_window
+        compress     = self.compress and not self.safe and self.probe_extensions()
+        delta        = self.delta    and not self.safe and self.probe_extensions()
+
+        # Prepare images.
+        uploads = []
+        upload_length = 0
+        for filename, address in images:
+            with open(filename, "rb") as f:
+                length = os.fstat(f.fileno()).st_size
+                data   = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if length else b""
+            digest = hashlib.sha256(data).hexdigest()
+
+            # Skip unchanged images (only when confirmed by the device's memory CRC32).
+            if (cache is not None) and (cache.get(self.port.port, address) == digest):
+                if self.probe_extensions() and (self.query_crc32(address, length, 1) == [zlib.crc32(data)]):
+                    print(f"[LITEX-TERM] Skipping {filename} (unchanged at 0x{address:08x}).")
+                    if length:
+                        data.close()
+                    continue
+
+            # Only upload the blocks that differ from the device's memory in delta mode.
+            ranges = self.get_delta_ranges(data, address) if delta else [(0, length)]
+            msg = f"[LITEX-TERM] Uploading {filename} to 0x{address:08x} ({length} bytes"
+            if delta:
+                msg += ", {} bytes differ".format(sum(end - start for start, end in ranges))
+            print(msg + ")...")
+            uploads.append((data, address, ranges, digest))
+            upload_length += sum(end - start for start, end in ranges)
+
+        def get_frames():
+            for data, address, ranges, digest in uploads:
+                yield from sfl_load_frames(data, address, ranges, frame_length, compress, max_window + 1)
+
+        # Upload.
+        frames = get_frames()
+        start  = time.time()
+        sent   = self.upload_frames(frames, upload_length, max_window)
+        frames.close()
+        for data, address, ranges, digest in uploads:
+            if cache is not None:
+                cache.set(self.port.port, address, digest)
+            if len(data):
+                data.close()
+
+        # Compute speed (and link efficiency: 10 bits per byte on the UART).
+        end     = time.time()
+        elapsed = max(end - start, 1e-6)
+        print("[LITEX-TERM] Upload complete ({0:.1f}KB/s, {1:.0f}% of link bandwidth, {2} bytes sent).".format(
+            upload_length/(elapsed*1024),
+            100*upload_length*10/(elapsed*self.port.baudrate),
+            sent))
+        return upload_length
+
+    def upload_frames(self, frames, length, max_window):
+        """Adaptive sliding-window upload.
+
+        SFL frames are sent with up to window frames in flight. Window is adapted from the acks
+        (TCP-like congestion control): grows exponentially up to ssthresh, then linearly, and is
+        halved on errors (CRC errors/timeouts, generally due to the device's UART RX FIFO overflowing
+        while it is processing the previous frames). Since acks are sent in order and LOAD frames
+        are idempotent, errors are recovered by waiting for the device to resynchronize (line idle)
+        and re-sending all the frames that were not acknowledged (Go-Back-N).
+
+        Return the number of bytes sent on the link.
+        """
+        ack_timeout = max(0.5, 8*(sfl_payload_length + 4)*10/self.port.baudrate)
+
+        # Congestion control state.
+        window    = min(4, max_window)
+        ssthresh  = max_window
+        errors    = 0
+
+        # Upload.
+        inflight   = deque() # Frames in flight.
+        retransmit = deque() # Frames to re-send.
+        pending    = True    # Frames to send.
+        acked      = 0       # Acknowledged bytes.
+        sent       = 0       # Sent bytes.
+        last_progress = 0
+        port_timeout  = self.port.timeout
+        self.port.timeout = ack_timeout
+        while pending or inflight or retransmit:
+            # Send frames while window is not full.
+            datas = []
+            while len(inflight) < int(window):
+                if retransmit:
+                    frame = retransmit.popleft()
+                else:
+                    frame = next(frames, None) if pending else None
+                    if frame is None:
+                        pending = False
+                        break
+                inflight.append(frame)
+                datas.append(frame[0])
+            if datas:
+                datas = b"".join(datas)
+                sent += len(datas)
+                self.port.write(datas)
+            if not inflight:
+                break
+
+            # Receive acks (all available ones, or wait for at least one).
+            acks = self.port.read(max(self.port.in_waiting, 1))
+            error = (len(acks) == 0) # Timeout.
+            for ack in acks:
+                if bytes([ack]) == sfl_ack_success:
+                    acked += inflight.popleft()[1]
+                    # Slow start / Congestion avoidance.
+                    window += 1 if window < ssthresh else 1/window
+                    window  = min(window, max_window)
+                    errors  = 0
+                else:
+                    error = True
+                    break
+
+            # Error: Reduce window, resynchronize and re-send frames in flight.
+            if error:
+                errors += 1
+                if errors > 16:
+                    print("\n[LITEX-TERM] Too many consecutive upload errors, aborting.")
+                    sys.exit(1)
+                ssthresh = max(window/2, 1)
+                window   = ssthresh
+                self.resync()
+                inflight.extend(retransmit)
+                retransmit = inflight
+                inflight   = deque()
+
+            # Show progress (rate-limited).
+            now = time.time()
+            if (now - last_progress) > 0.1:
+                last_progress = now
+                progress = 20*acked//length if length else 20
+                sys.stdout.write("|{}>{}| {}%\r".format(
+                    "=" * progress,
+                    " " * (20 - progress),
+                    5*progress))
+                sys.stdout.flush()
+        self.port.timeout = port_timeout
+        return sent
+
+    def resync(self):
+        # Wait for the line to be idle (longer than the device's frame timeout) and flush it.
+        timeout = self.port.timeout
+        self.port.timeout = sfl_resync_time
+        while len(self.port.read(4096)):
+            pass
+        self.port.timeout = timeout
+
+    def boot(self, address):
+        frame = SFLFrame()
+        frame.cmd = sfl_cmd_jump
+        frame.payload = address.to_bytes(4, "big")
+        return self.send_frame(frame)
+
+def sfl_upload_concurrent(uploaders, images, cache=None, boot_address=None):
+    """Upload images concurrently to several devices (one uploader/port per device).
+
+    Each device receives all the images (pipelined) in its own thread and is then booted at
+    boot_address (when provided).
+    """
+    errors = []
+    def upload(uploader):
+        try:
+            uploader.upload_images(images, cache)
+            if boot_address is not None:
+                uploader.boot(boot_address)
+        except BaseException as e:
+            errors.append(e)
+    threads = [threading.Thread(target=upload, args=(uploader,)) for uploader in uploaders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
 
 # LiteXTerm ----------------------------------------------------------------------------------------
 
 class LiteXTerm:
-    def __init__(self, serial_boot, kernel_image, kernel_address, json_images, safe):
+    def __init__(self, serial_boot, kernel_image, kernel_address, json_images, safe, compress=False, delta=False,
+        cache=False, extra_ports=[], log=None):
         self.serial_boot = serial_boot
         assert not (kernel_image is not None and json_images is not None)
         self.mem_regions = {}
@@ -298,11 +807,17 @@ class LiteXTerm:
             self.boot_address = self.mem_regions[list(self.mem_regions.keys())[-1]]
             f.close()
 
-        self.reader_alive = False
-        self.writer_alive = False
+        self.loop_alive    = False
+        self.reader_alive  = False
+        self.writer_alive  = False
+        self.loop_thread   = None
+        self.reader_thread = None
+        self.writer_thread = None
+
+        self.log = None if log is None else open(log, "ab", buffering=1024*1024)
 
-        self.prompt_detect_buffer = bytes(len(sfl_prompt_req))
-        self.magic_detect_buffer  = bytes(len(sfl_magic_req))
+        self.prompt_detect_buffer = b""
+        self.magic_detect_buffer  = b""
 
         self.console = Console()
 
@@ -310,16 +825,26 @@ class LiteXTerm:
         self.sigint_time_last = 0
 
         self.safe        = safe
-        self.delay       = 0
-        self.length      = 64
-        self.outstanding = 0 if safe else 128
+        self.compress    = compress
+        self.delta       = delta
+        self.cache       = SFLImageCache() if cache else None
+        self.extra_ports = extra_ports
+
+        self.extra_uploaders = []
+
+    def get_uploader(self, port):
+        return SFLUploader(port, safe=self.safe, compress=self.compress, delta=self.delta)
 
     def open(self, port, baudrate):
         if hasattr(self, "port"):
             return
         self.port = serial.serial_for_url(port, baudrate)
+        self.sfl  = self.get_uploader(self.port)
 
     def close(self):
+        if self.log is not None:
+            self.log.flush()
+        self.close_extra_ports()
         if not hasattr(self, "port"):
             return
         self.port.close()
@@ -338,210 +863,137 @@ class LiteXTerm:
             self.sigint_time_last = sigint_time_current
 
     def send_frame(self, frame):
-        retry = 1
-        while retry:
-            self.port.write(frame.encode())
-            # Get the reply from the device
-            reply = self.port.read()
-            if reply == sfl_ack_success:
-                retry = 0
-            elif reply == sfl_ack_crcerror:
-                retry = 1
-            else:
-                print("[LITEX-TERM] Got unknown reply '{}' from the device, aborting.".format(reply))
-                return 0
-        return 1
+        return self.sfl.send_frame(frame)
 
     def receive_upload_response(self):
-        reply = self.port.read()
-        if reply == sfl_ack_success:
-            return True
-        elif reply == sfl_ack_crcerror:
-            print("[LITEX-TERM] Upload to device failed due to data corruption (CRC error)")
-        else:
-            print(f"[LITEX-TERM] Got unexpected response from device '{reply}'")
-        sys.exit(1)
-
-    def upload_calibration(self, address):
-
-        print("[LITEX-TERM] Upload calibration... ", end="")
-        sys.stdout.flush()
-
-        # Calibration parameters.
-        min_delay    = 1e-5
-        max_delay    = 1e-3
-        nframes      = 16
-        length_range = [64]
-
-        # Run calibration with increasing delay and decreasing length.
-        delay = min_delay
-        working_delay  = None
-        working_length = None
-        while delay <= max_delay:
-            for length in length_range:
-                #p0rint(f"delay {delay}, length {length}")
-                # Prepare frame.
-                frame         = SFLFrame()
-                frame.cmd     = sfl_cmd_load
-                frame_data    = bytearray(min(length, sfl_payload_length-4))
-                frame.payload = address.to_bytes(4, "big")
-                frame.payload += frame_data
-                frame = frame.encode()
-
-                # Send N consecutive frames.
-                for i in range(nframes):
-                    self.port.write(frame)
-                    time.sleep(delay)
-
-                # Wait and get acks.
-                working = True
-                time.sleep(0.2)
-                while self.port.in_waiting:
-                    ack = self.port.read()
-                    #print(ack)
-                    if ack in [sfl_ack_error, sfl_ack_crcerror]:
-                        working = False
-
-                if working:
-                    # Save working delay/length and exit.
-                    working_delay  = delay
-                    working_length = min(length, sfl_payload_length - 4)
-                    break
-
-            # Exit if working delay found.
-            if (working_delay is not None):
-                break
-
-            # Else increase delay.
-            delay = delay*2
-
-        # Set parameters.
-        if (working_delay is not None):
-            print(f"(inter-frame: {working_delay*1e6:5.2f}us, length: {working_length})")
-            self.delay  = working_delay
-            self.length = working_length
-        else:
-            print("failed, switching to --safe mode.")
-            self.delay       = 0
-            self.length      = 64
-            self.outstanding = 0
+        return self.sfl.receive_upload_response()
 
     def upload(self, filename, address):
-        f = open(filename, "rb")
-        f.seek(0, 2)
-        length = f.tell()
-        f.seek(0, 0)
-
-        print(f"[LITEX-TERM] Uploading {filename} to 0x{address:08x} ({length} bytes)...")
-
-        # Upload calibration
-        if not self.safe:
-            self.upload_calibration(address)
-            # Force safe mode settings when calibration fails.
-            if self.delay is None:
-                self.delay       = 0
-                self.length      = 64
-                self.outstanding = 0
-
-        # Prepare parameters
-        current_address = address
-        position        = 0
-        start           = time.time()
-        remaining       = length
-        outstanding     = 0
-        while remaining:
-            # Show progress
-            sys.stdout.write("|{}>{}| {}%\r".format(
-                "=" * (20*position//length),
-                " " * (20-20*position//length),
-                100*position//length))
-            sys.stdout.flush()
-
-            # Send frame if max outstanding not reached.
-            if outstanding <= self.outstanding:
-                # Prepare frame.
-                frame      = SFLFrame()
-                frame.cmd  = sfl_cmd_load
-                frame_data = f.read(min(remaining, self.length-4))
-                frame.payload = current_address.to_bytes(4, "big")
-                frame.payload += frame_data
-
-                # Encode frame and send it.
-                self.port.write(frame.encode())
-
-                # Update parameters
-                current_address += len(frame_data)
-                position        += len(frame_data)
-                remaining       -= len(frame_data)
-                outstanding     += 1
-
-                # Inter-frame delay.
-                time.sleep(self.delay)
-
-            # Read response if available.
-            while self.port.in_waiting:
-                ack = self.receive_upload_response()
-                if ack:
-                    outstanding -= 1
-                    break
-
-        # Get remaining responses.
-        for _ in range(outstanding):
-            self.receive_upload_response()
+        return self.sfl.upload(filename, address)
+
+    def upload_images(self):
+        images = [(filename, int(base, 16)) for filename, base in self.mem_regions.items()]
+        if not self.extra_ports:
+            return self.sfl.upload_images(images, self.cache)
+        # Also upload the images to the devices of the extra ports (waiting in serial boot), each
+        # device receiving all the images concurrently; they are then booted with the main device.
+        for name in self.extra_ports:
+            port     = serial.serial_for_url(name, self.port.baudrate)
+            uploader = self.get_uploader(port)
+            if uploader.wait_magic():
+                print(f"[LITEX-TERM] Also uploading to the device on {name}.")
+                self.extra_uploaders.append(uploader)
+            else:
+                print(f"[LITEX-TERM] No serial boot request on {name}, ignoring it.")
+                port.close()
+        try:
+            sfl_upload_concurrent([self.sfl] + self.extra_uploaders, images, self.cache)
+        except BaseException:
+            self.close_extra_ports()
+            raise
 
-        # Compute speed.
-        end     = time.time()
-        elapsed = end - start
-        print("[LITEX-TERM] Upload complete ({0:.1f}KB/s).".format(length/(elapsed*1024)))
-        f.close()
-        return length
+    def close_extra_ports(self):
+        for uploader in self.extra_uploaders:
+            uploader.port.close()
+        self.extra_uploaders = []
 
     def boot(self):
         print("[LITEX-TERM] Booting the device.")
-        frame = SFLFrame()
-        frame.cmd = sfl_cmd_jump
-        frame.payload = int(self.boot_address, 16).to_bytes(4, "big")
-        self.send_frame(frame)
+        self.sfl.boot(int(self.boot_address, 16))
+        for uploader in self.extra_uploaders:
+            print(f"[LITEX-TERM] Booting the device on {uploader.port.port}.")
+            uploader.boot(int(self.boot_address, 16))
+        self.close_extra_ports()
 
     def detect_prompt(self, data):
-        if len(data):
-            self.prompt_detect_buffer = self.prompt_detect_buffer[1:] + data
-            return self.prompt_detect_buffer == sfl_prompt_req
-        else:
-            return False
+        self.prompt_detect_buffer, found = _detect(self.prompt_detect_buffer, data, sfl_prompt_req)
+        return found
 
     def answer_prompt(self):
         print("[LITEX-TERM] Received serial boot prompt from the device.")
         self.port.write(sfl_prompt_ack)
 
     def detect_magic(self, data):
-        if len(data):
-            self.magic_detect_buffer = self.magic_detect_buffer[1:] + data
-            return self.magic_detect_buffer == sfl_magic_req
-        else:
-            return False
+        self.magic_detect_buffer, found = _detect(self.magic_detect_buffer, data, sfl_magic_req)
+        return found
 
     def answer_magic(self):
         print("[LITEX-TERM] Received firmware download request from the device.")
         if(len(self.mem_regions)):
             self.port.write(sfl_magic_ack)
-        for filename, base in self.mem_regions.items():
-            self.upload(filename, int(base, 16))
+        self.upload_images()
         self.boot()
         print("[LITEX-TERM] Done.")
 
+    def receive(self, data):
+        # Batched terminal/log writes.
+        sys.stdout.buffer.write(data)
+        sys.stdout.flush()
+        if self.log is not None:
+            self.log.write(data)
+        if len(self.mem_regions):
+            if self.serial_boot and self.detect_prompt(data):
+                self.answer_prompt()
+            if self.detect_magic(data):
+                self.answer_magic()
+
+    def send(self, keys):
+        if b"\x03" in keys:
+            keys = keys[:keys.index(b"\x03")]
+            self.stop()
+        if keys:
+            self.port.write(keys)
+
+    # Selector loop (POSIX).
+
+    def loop(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self.port.fileno(), selectors.EVENT_READ, "port")
+        if self.console.default_settings is not None:
+            sel.register(self.console.fd, selectors.EVENT_READ, "console")
+        try:
+            while self.loop_alive:
+                events = sel.select(timeout=0.1)
+                if not events and self.log is not None:
+                    self.log.flush()
+                for key, mask in events:
+                    if key.data == "port":
+                        self.receive(self.port.read(max(self.port.in_waiting, 1)))
+                    else:
+                        keys = os.read(key.fd, 4096)
+                        if not keys:
+                            sel.unregister(key.fd)
+                        self.send(keys)
+        except serial.SerialException:
+            self.loop_alive = False
+            self.console.unconfigure()
+            raise
+        finally:
+            sel.close()
+
+    def start_loop(self):
+        self.loop_alive = True
+        self.loop_thread = threading.Thread(target=self.loop)
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+
+    def loop_supported(self):
+        # Selector loop requires a selectable port (not the case of pyserial's URL handlers: socket://,
+        # rfc2217://, loop://, etc...).
+        if sys.platform == "win32":
+            return False
+        try:
+            self.port.fileno()
+        except (io.UnsupportedOperation, AttributeError):
+            return False
+        return True
+
+    # Reader/Writer threads (Windows or non-selectable ports).
+
     def reader(self):
         try:
             while self.reader_alive:
-                c = self.port.read()
-                sys.stdout.buffer.write(c)
-                sys.stdout.flush()
-                if len(self.mem_regions):
-                    if self.serial_boot and self.detect_prompt(c):
-                        self.answer_prompt()
-                    if self.detect_magic(c):
-                        self.answer_magic()
-
+                self.receive(self.port.read(max(self.port.in_waiting, 1)))
         except serial.SerialException:
             self.reader_alive = False
             self.console.unconfigure()
@@ -550,7 +1002,7 @@ class LiteXTerm:
     def start_reader(self):
         self.reader_alive = True
         self.reader_thread = threading.Thread(target=self.reader)
-        self.reader_thread.setDaemon(True)
+        self.reader_thread.daemon = True
         self.reader_thread.start()
 
     def stop_reader(self):
@@ -579,7 +1031,7 @@ class LiteXTerm:
     def start_writer(self):
         self.writer_alive = True
         self.writer_thread = threading.Thread(target=self.writer)
-        self.writer_thread.setDaemon(True)
+        self.writer_thread.daemon = True
         self.writer_thread.start()
 
     def stop_writer(self):
@@ -587,29 +1039,53 @@ class LiteXTerm:
         self.writer_thread.join()
 
     def start(self):
-        self.start_reader()
-        self.start_writer()
+        if self.loop_supported():
+            self.start_loop()
+        else:
+            self.start_reader()
+            if (sys.platform == "win32") or (self.console.default_settings is not None):
+                self.start_writer()
 
     def stop(self):
+        self.loop_alive   = False
         self.reader_alive = False
         self.writer_alive = False
 
     def join(self, writer_only=False):
-        self.writer_thread.join()
-        if not writer_only:
-            self.reader_thread.join()
+        if self.loop_thread is not None:
+            self.loop_thread.join()
+            return
+        if self.writer_thread is not None:
+            self.writer_thread.join()
+            if writer_only:
+                return
+        self.reader_thread.join()
+
+def _detect(buffer, data, pattern):
+    # Search pattern in data, with the end of the previous data (rolling window) to detect patterns
+    # split between chunks. Return the new rolling window and if pattern has been found.
+    buffer += data
+    if buffer.find(pattern) >= 0:
+        return b"", True
+    return buffer[-(len(pattern) - 1):], False
 
 # Run ----------------------------------------------------------------------------------------------
 
 def _get_args():
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument("port",                                               help="Serial port (eg /dev/tty*, crossover, jtag).")
+    parser.add_argument("port",           nargs="?",                          help="Serial port (eg /dev/tty*, crossover, jtag).")
     parser.add_argument("--speed",        default=115200,                     help="Serial baudrate.")
     parser.add_argument("--serial-boot",  default=False, action='store_true', help="Automatically initiate serial boot.")
     parser.add_argument("--kernel",       default=None,                       help="Kernel image.")
     parser.add_argument("--kernel-adr",   default="0x40000000",               help="Kernel address.")
     parser.add_argument("--images",       default=None,                       help="JSON description of the images to load to memory.")
     parser.add_argument("--safe",         action="store_true",                help="Safe serial boot mode, disable upload speed optimizations.")
+    parser.add_argument("--compress",     action="store_true",                help="Compress serial boot uploads (LZ4, requires BIOS support).")
+    parser.add_argument("--log",          default=None,                       help="Capture received data to a log file.")
+    parser.add_argument("--cache",        action="store_true",                help="Skip images unchanged since last upload (hash cache per port/address).")
+    parser.add_argument("--extra-ports",  default=None,                       help="Extra serial ports (comma separated) of devices to also serial boot with the images.")
+    parser.add_argument("--bench-frames", action="store_true",                help="Benchmark serial boot frames generation and exit.")
+    parser.add_argument("--delta",        action="store_true",                help="Only upload blocks that differ from device's memory (requires BIOS support).")
 
     parser.add_argument("--csr-csv",        default=None,                       help="SoC CSV file.")
     parser.add_argument("--base-address",   default=None,                       help="CSR base address.")
@@ -622,7 +1098,21 @@ def _get_args():
 
 def main():
     args = _get_args()
-    term = LiteXTerm(args.serial_boot, args.kernel, args.kernel_adr, args.images, args.safe)
+    if args.bench_frames:
+        for compress in [False, True]:
+            r = sfl_bench_frames(compress=compress)
+            print("[LITEX-TERM] {:10s}: {:8.0f} frames/s, {:6.2f}MB/s (sustains {:5.1f}Mbaud).".format(
+                "Compressed" if compress else "Raw", r["frames/s"], r["MB/s"], r["baudrate"]/1e6))
+        return
+    if args.port is None:
+        print("[LITEX-TERM] A serial port is required.")
+        sys.exit(1)
+    term = LiteXTerm(args.serial_boot, args.kernel, args.kernel_adr, args.images, args.safe,
+        compress    = args.compress,
+        delta       = args.delta,
+        cache       = args.cache,
+        extra_ports = [] if args.extra_ports is None else args.extra_ports.split(","),
+        log         = args.log)
 
     if sys.platform == "win32":
         if args.port in ["crossover", "jtag"]:
@@ -0,0 +1,337 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import time
+import json
+import socket
+import select
+import struct
+import tempfile
+import threading
+
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord, EtherboneWrites, EtherboneReads
+from litex.tools.remote.comm_sim import CommSim
+
+# Remote Access Benchmarks -------------------------------------------------------------------------
+#
+# Benchmarks measuring the performance of the remote stack (RemoteClient <-> litex_server <-> Comm):
+# - Single access latency.
+# - Burst reads/writes throughput.
+# - CSR sweep rate (per register and merged with read_many).
+# - Concurrency scaling (several RemoteClients sharing the same server).
+# - Etherbone encode/decode throughput (host CPU cost of the protocol).
+#
+# They can run against a real litex_server or against local stand-ins of the transports (pty pair
+# UARTBone model for CommUART, loopback Etherbone UDP responder for CommUDP, file-backed BAR for
+# CommPCIe), all backed by a CommSim memory model.
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values)*p/100), len(values) - 1)]
+
+def bench_latency(bus, addr, duration=1.0):
+    latencies = []
+    start     = time.perf_counter()
+    while (time.perf_counter() - start) < duration:
+        t = time.perf_counter()
+        bus.read(addr)
+        latencies.append(time.perf_counter() - t)
+    n = len(latencies)
+    return {
+        "n"       : n,
+        "mean_us" : 1e6*sum(latencies)/n,
+        "p50_us"  : 1e6*_percentile(latencies, 50),
+        "p99_us"  : 1e6*_percentile(latencies, 99),
+    }
+
+def _bench_throughput(fn, nbytes, duration, sync=None):
+    n     = 0
+    start = time.perf_counter()
+    while (time.perf_counter() - start) < duration:
+        fn()
+        n += 1
+    # Wait for posted accesses (ex writes) to be completed before stopping the measurement.
+    if sync is not None:
+        sync()
+    elapsed = time.perf_counter() - start
+    return {
+        "accesses" : n,
+        "MBps"     : n*nbytes/elapsed/1e6,
+    }
+
+def bench_burst_read(bus, addr, length=255, duration=1.0):
+    return _bench_throughput(lambda: bus.read(addr, length), 4*length, duration)
+
+def bench_burst_write(bus, addr, length=255, duration=1.0):
+    datas = list(range(length))
+    # Writes are posted: End with a read roundtrip to only measure completed writes.
+    return _bench_throughput(lambda: bus.write(addr, datas), 4*length, duration, sync=lambda: bus.read(addr))
+
+def bench_csr_sweep(bus, duration=1.0):
+    regs = [reg for reg in bus.regs.d.values() if reg.mode in ["rw", "ro"]]
+    r    = {"registers": len(regs)}
+    for name, fn in [
+        ("single", lambda: [reg.read() for reg in regs]),
+        ("merged", lambda: bus.read_many(regs)),
+        ]:
+        n     = 0
+        start = time.perf_counter()
+        while (time.perf_counter() - start) < duration:
+            fn()
+            n += 1
+        r[f"{name}_regs_per_s"] = n*len(regs)/(time.perf_counter() - start)
+    return r
+
+def bench_concurrency(bus_factory, addr, nclients=[1, 2, 4], duration=1.0):
+    r = {}
+    for n in nclients:
+        buses = [bus_factory() for i in range(n)]
+        for bus in buses:
+            bus.open()
+        counts = [0]*n
+        stop   = threading.Event()
+        def worker(i):
+            while not stop.is_set():
+                buses[i].read(addr)
+                counts[i] += 1
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        r[str(n)] = {"accesses_per_s": sum(counts)/(time.perf_counter() - start)}
+        for bus in buses:
+            bus.close()
+    return r
+
+def bench_etherbone_codec(length=255, duration=1.0):
+    """Etherbone encode/decode throughput of records with length writes and length reads."""
+    def encode():
+        record = EtherboneRecord()
+        record.writes = EtherboneWrites(base_addr=0x1000, datas=range(length))
+        record.reads  = EtherboneReads(base_ret_addr=0x2000, addrs=range(0, 4*length, 4))
+        packet = EtherbonePacket()
+        packet.records = [record]
+        packet.encode()
+        return packet.bytes
+    data = bytes(encode())
+    def decode():
+        packet = EtherbonePacket(data)
+        packet.decode()
+        record = packet.records[0]
+        return record.writes.get_datas(), record.reads.get_addrs()
+    return {
+        "packet_bytes" : len(data),
+        "encode"       : _bench_throughput(encode, len(data), duration),
+        "decode"       : _bench_throughput(decode, len(data), duration),
+    }
+
+def run_benchmarks(bus_factory, addr, duration=1.0, nclients=[1, 2, 4]):
+    bus = bus_factory()
+    bus.open()
+    r = {
+        "latency"     : bench_latency(bus, addr, duration=duration),
+        "burst_read"  : bench_burst_read(bus,  addr, duration=duration),
+        "burst_write" : bench_burst_write(bus, addr, duration=duration),
+    }
+    if hasattr(bus, "regs"):
+        r["csr_sweep"] = bench_csr_sweep(bus, duration=duration)
+    bus.close()
+    r["concurrency"] = bench_concurrency(bus_factory, addr, nclients=nclients, duration=duration)
+    return r
+
+def print_results(results):
+    for backend, r in results.items():
+        print(f"[{backend}]")
+        if backend == "EtherboneCodec":
+            print("  encode        : {:8.3f}MB/s".format(r["encode"]["MBps"]))
+            print("  decode        : {:8.3f}MB/s".format(r["decode"]["MBps"]))
+            continue
+        print("  latency       : mean {mean_us:8.1f}us / p50 {p50_us:8.1f}us / p99 {p99_us:8.1f}us".format(**r["latency"]))
+        print("  burst read    : {:8.3f}MB/s".format(r["burst_read"]["MBps"]))
+        print("  burst write   : {:8.3f}MB/s".format(r["burst_write"]["MBps"]))
+        if "csr_sweep" in r:
+            print("  csr sweep     : {:8.0f}regs/s (single) / {:8.0f}regs/s (merged)".format(
+                r["csr_sweep"]["single_regs_per_s"], r["csr_sweep"]["merged_regs_per_s"]))
+        for n, c in r["concurrency"].items():
+            print("  {:2s} client(s)  : {:8.0f}accesses/s".format(n, c["accesses_per_s"]))
+
+# Local Stand-ins ----------------------------------------------------------------------------------
+
+bench_csr_csv = """\
+csr_base,bench,0x00000000,,
+{registers}constant,config_csr_data_width,32,,
+memory_region,csr,0x00000000,65536,io
+memory_region,sram,0x00010000,65536,cached
+"""
+
+bench_mem_base = 0x00010000
+bench_mem_size = 0x00010000
+
+def write_bench_csr_csv(filename, nregisters=128):
+    registers = ""
+    for i in range(nregisters):
+        registers += "csr_register,bench_reg{},0x{:08x},1,rw\n".format(i, 4*i)
+    with open(filename, "w") as f:
+        f.write(bench_csr_csv.format(registers=registers))
+
+class UARTBoneModel:
+    """UARTBone model served on the master side of a pty pair (slave side is used by CommUART)."""
+    def __init__(self, sim):
+        self.sim = sim
+        self.master, self.slave = os.openpty()
+        self.name = os.ttyname(self.slave)
+        self.done = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def _serve(self):
+        buf = bytearray()
+        while not self.done.is_set():
+            if not select.select([self.master], [], [], 0.1)[0]:
+                continue
+            try:
+                buf += os.read(self.master, 65536)
+            except OSError:
+                return
+            resp = bytearray()
+            while len(buf) >= 6:
+                cmd, length, addr = struct.unpack(">BBI", buf[:6])
+                burst = "incr" if cmd in [0x01, 0x02] else "fixed"
+                if cmd in [0x01, 0x03]:
+                    if len(buf) < 6 + 4*length:
+                        break
+                    self.sim.write(4*addr, list(struct.unpack(f">{length}I", buf[6:6 + 4*length])), burst)
+                    del buf[:6 + 4*length]
+                else:
+                    resp += struct.pack(f">{length}I", *self.sim.read(4*addr, length, burst))
+                    del buf[:6]
+            if resp:
+                os.write(self.master, resp)
+
+class EtherboneUDPModel:
+    """Etherbone UDP responder on loopback."""
+    def __init__(self, sim):
+        self.sim    = sim
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.settimeout(0.1)
+        self.port   = self.socket.getsockname()[1]
+        self.done   = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+        self.socket.close()
+
+    def _serve(self):
+        while not self.done.is_set():
+            try:
+                datas, addr = self.socket.recvfrom(8192)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            packet = EtherbonePacket(datas)
+            packet.decode()
+            if packet.pf:
+                reply    = EtherbonePacket()
+                reply.pr = 1
+                reply.encode()
+                self.socket.sendto(reply.bytes, addr)
+                continue
+            for record in packet.records:
+                if record.writes is not None:
+                    self.sim.write(record.writes.base_addr, record.writes.get_datas())
+                if record.reads is not None:
+                    r = EtherboneRecord()
+                    r.writes = EtherboneWrites(
+                        base_addr = record.reads.base_ret_addr,
+                        datas     = [self.sim.read(a) for a in record.reads.get_addrs()])
+                    r.wcount = len(r.writes.datas)
+                    reply = EtherbonePacket()
+                    reply.records = [r]
+                    reply.encode()
+                    self.socket.sendto(reply.bytes, addr)
+
+def create_pcie_bar_file(directory, size):
+    """File-backed PCIe BAR (using a sysfs-like layout so that CommPCIe accepts it)."""
+    device = os.path.join(directory, "sys", "bus", "pci", "devices", "0000:00:00.0")
+    os.makedirs(device, exist_ok=True)
+    with open(os.path.join(device, "enable"), "w") as f:
+        f.write("1")
+    with open(os.path.join(device, "resource0"), "wb") as f:
+        f.truncate(size)
+    return os.path.join(device, "resource0")
+
+def run_local_benchmarks(backends=["uart", "udp", "pcie"], duration=1.0, nclients=[1, 2, 4]):
+    from litex.tools.litex_server import RemoteServer
+    from litex.tools.litex_client import RemoteClient
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csr_csv = os.path.join(tmpdir, "csr.csv")
+        write_bench_csr_csv(csr_csv)
+        for backend in backends:
+            sim   = CommSim(csr_csv=csr_csv)
+            model = None
+            if backend == "uart":
+                from litex.tools.remote.comm_uart import CommUART
+                model = UARTBoneModel(sim)
+                model.start()
+                comm = CommUART(model.name, 115200)
+            elif backend == "udp":
+                from litex.tools.remote.comm_udp import CommUDP
+                model = EtherboneUDPModel(sim)
+                model.start()
+                comm = CommUDP("127.0.0.1", model.port, local_port=0)
+            elif backend == "pcie":
+                from litex.tools.remote.comm_pcie import CommPCIe
+                comm = CommPCIe(create_pcie_bar_file(tmpdir, 2*bench_mem_size))
+            elif backend == "sim":
+                comm = sim
+            else:
+                raise ValueError(f"Unsupported local benchmark backend: {backend}.")
+            server = RemoteServer(comm, "localhost", 0)
+            server.open()
+            try:
+                server.start(max(nclients))
+                port = server.socket.getsockname()[1]
+                results[comm.__class__.__name__] = run_benchmarks(
+                    bus_factory = lambda: RemoteClient(port=port, csr_csv=csr_csv),
+                    addr        = bench_mem_base,
+                    duration    = duration,
+                    nclients    = nclients,
+                )
+            finally:
+                # Tear down server (and Comm), then transport model.
+                server.close()
+                server.join()
+                if model is not None:
+                    model.stop()
+    return results
+
+def dump_results(results, filename=None):
+    if filename is None:
+        print_results(results)
+    else:
+        with open(filename, "w") as f:
+            json.dump(results, f, indent=4)
@@ -39,9 +39,9 @@ class CommPCIe(CSRBuilder):
     def close(self):
         if not hasattr(self, "file"):
             return
-        self.file.close()
-        del self.file
         self.mmap.close()
+        os.close(self.file)
+        del self.file
 
     def read(self, addr, length=None, burst="incr"):
         assert burst == "incr"
@@ -0,0 +1,112 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import time
+import threading
+
+from litex.tools.remote.csr_builder import CSRBuilder
+
+# CommSim ------------------------------------------------------------------------------------------
+
+class CommSim(CSRBuilder):
+    """Simulated SoC Comm.
+
+    Serve reads/writes from an in-process sparse memory model (32-bit words), optionally described
+    by a csr.csv/csr.json (CSR registers/memory regions, scratch and identifier initialization).
+    Each transaction is delayed by latency + transferred bytes / bandwidth to model a link, which
+    allows benchmarking and regression-testing the remote stack without hardware.
+    """
+    def __init__(self, csr_csv=None, latency=0.0, bandwidth=None, max_burst=255,
+        identifier="LiteX Sim SoC", strict=False, debug=False):
+        CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
+        self.latency   = latency
+        self.bandwidth = bandwidth
+        self.max_burst = max_burst
+        self.strict    = strict
+        self.debug     = debug
+        self.mem       = {}
+        self.lock      = threading.Lock()
+        self.counters  = {"transactions": 0, "reads": 0, "writes": 0}
+        if csr_csv is not None:
+            self._init_mem(identifier)
+
+    def _init_mem(self, identifier):
+        # Scratch register reset value.
+        if hasattr(self.regs, "ctrl_scratch"):
+            for addr, data in zip(self.regs.ctrl_scratch.addrs, self.regs.ctrl_scratch.to_words(0x12345678)):
+                self.mem[addr] = data
+        # Identifier.
+        if hasattr(self.bases, "identifier_mem"):
+            for i, c in enumerate(identifier + "\0"):
+                self.mem[self.bases.identifier_mem + 4*i] = ord(c)
+
+    def _valid(self, addr):
+        csr_map = getattr(self, "csr_map", None)
+        if csr_map is None:
+            return True
+        for base, size, type in csr_map.memories.values():
+            if base <= addr < base + size:
+                return True
+        return False
+
+    def _delay(self, nwords):
+        delay = self.latency
+        if self.bandwidth:
+            delay += 4*nwords/self.bandwidth
+        if delay > 0:
+            time.sleep(delay)
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _access(self, addr, burst):
+        if burst not in ["incr", "fixed"]:
+            raise ValueError(f"Unsupported burst: {burst}.")
+        if self.strict and not self._valid(addr):
+            raise ValueError(f"Access to unmapped address 0x{addr:08x}.")
+        return 4 if burst == "incr" else 0
+
+    def read_bursts(self, bursts):
+        r = []
+        with self.lock:
+            nwords = 0
+            for addr, length, burst in bursts:
+                step  = self._access(addr, burst)
+                datas = [self.mem.get(addr + step*i, 0) for i in range(length)]
+                if self.debug:
+                    for i, value in enumerate(datas):
+                        print("read 0x{:08x} @ 0x{:08x}".format(value, addr + step*i))
+                r.append(datas)
+                nwords += length
+            self.counters["transactions"] += 1
+            self.counters["reads"]        += nwords
+            self._delay(nwords)
+        return r
+
+    def write_bursts(self, bursts):
+        with self.lock:
+            nwords = 0
+            for addr, datas, burst in bursts:
+                step = self._access(addr, burst)
+                for i, value in enumerate(datas):
+                    self.mem[addr + step*i] = value & 0xffffffff
+                    if self.debug:
+                        print("write 0x{:08x} @ 0x{:08x}".format(value, addr + step*i))
+                nwords += len(datas)
+            self.counters["transactions"] += 1
+            self.counters["writes"]       += nwords
+            self._delay(nwords)
+
+    def read(self, addr, length=None, burst="incr"):
+        length_int = 1 if length is None else length
+        datas = self.read_bursts([(addr, length_int, burst)])[0]
+        return datas[0] if length is None else datas
+
+    def write(self, addr, data, burst="incr"):
+        data = data if isinstance(data, list) else [data]
+        self.write_bursts([(addr, data, burst)])
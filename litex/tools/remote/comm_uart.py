@@ -16,14 +16,25 @@ CMD_READ_BURST_INCR   = 0x02
 CMD_WRITE_BURST_FIXED = 0x03
 CMD_READ_BURST_FIXED  = 0x04
 
+UARTBONE_MAX_BURST    = 255 # Length is encoded on 8-bit.
+UARTBONE_WRITE_BURST  = 8   # Conservative default for writes (avoids overflowing UARTBone's RX FIFO).
+
+_cmd_header = struct.Struct(">BBI") # Command, Length, Address (in words).
+
 # CommUART -----------------------------------------------------------------------------------------
 
 class CommUART(CSRBuilder):
-    def __init__(self, port, baudrate=115200, csr_csv=None, debug=False):
+    def __init__(self, port, baudrate=115200, csr_csv=None, debug=False,
+        max_burst       = UARTBONE_MAX_BURST,
+        max_write_burst = UARTBONE_WRITE_BURST):
         CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
-        self.port     = serial.serial_for_url(port, baudrate)
-        self.baudrate = str(baudrate)
-        self.debug    = debug
+        assert 1 <= max_burst       <= UARTBONE_MAX_BURST
+        assert 1 <= max_write_burst <= UARTBONE_MAX_BURST
+        self.port            = serial.serial_for_url(port, baudrate)
+        self.baudrate        = str(baudrate)
+        self.debug           = debug
+        self.max_burst       = max_burst
+        self.max_write_burst = max_write_burst
 
     def open(self):
         if hasattr(self, "port"):
@@ -37,7 +48,7 @@ class CommUART(CSRBuilder):
         del self.port
 
     def _read(self, length):
-        r = bytes()
+        r = bytearray()
         while len(r) < length:
             r += self.port.read(length - len(r))
         return r
@@ -54,41 +65,93 @@ class CommUART(CSRBuilder):
         if self.port.inWaiting() > 0:
             self.port.read(self.port.inWaiting())
 
-    def read(self, addr, length=None, burst="incr"):
+    # Command Encoding -----------------------------------------------------------------------------
+
+    @staticmethod
+    def _burst_cmd(burst, write):
+        return {
+            ("incr",  False) : CMD_READ_BURST_INCR,
+            ("fixed", False) : CMD_READ_BURST_FIXED,
+            ("incr",  True)  : CMD_WRITE_BURST_INCR,
+            ("fixed", True)  : CMD_WRITE_BURST_FIXED,
+        }[(burst, write)]
+
+    def _encode_read(self, addr, length, burst="incr"):
+        # Encode a read access as UARTBone commands, split in max_burst chunks.
+        cmd = self._burst_cmd(burst, write=False)
+        ba  = bytearray()
+        offset = 0
+        while length:
+            size = min(length, self.max_burst)
+            ba += _cmd_header.pack(cmd, size, addr//4 + offset)
+            if burst == "incr":
+                offset += size
+            length -= size
+        return ba
+
+    def _encode_write(self, addr, data, burst="incr"):
+        # Encode a write access as UARTBone commands, split in max_write_burst chunks.
+        cmd = self._burst_cmd(burst, write=True)
+        ba  = bytearray()
+        offset = 0
+        while offset < len(data):
+            size = min(len(data) - offset, self.max_write_burst)
+            ba += _cmd_header.pack(cmd, size, addr//4 + (offset if burst == "incr" else 0))
+            ba += struct.pack(f">{size}I", *data[offset:offset+size])
+            offset += size
+        return ba
+
+    # Batched Accesses -----------------------------------------------------------------------------
+
+    def read_bursts(self, bursts):
+        """Pipelined reads.
+
+        Take a list of (addr, length, burst) tuples, send all the read commands to the UARTBone
+        in a single transfer and then collect all the responses, avoiding one command/response
+        roundtrip per access. Return a list of datas lists (one per burst).
+        """
         self._flush()
-        data       = []
-        length_int = 1 if length is None else length
-        cmd        = {
-            "incr" : CMD_READ_BURST_INCR,
-            "fixed": CMD_READ_BURST_FIXED,
-        }[burst]
-        self._write([cmd, length_int])
-        self._write(list((addr//4).to_bytes(4, byteorder="big")))
-        for i in range(length_int):
-            value = int.from_bytes(self._read(4), "big")
+        ba     = bytearray()
+        length = 0
+        for addr, burst_length, burst in bursts:
+            ba     += self._encode_read(addr, burst_length, burst)
+            length += burst_length
+        self._write(ba)
+        datas = struct.unpack(f">{length}I", self._read(4*length))
+        r      = []
+        offset = 0
+        for addr, burst_length, burst in bursts:
+            r.append(list(datas[offset:offset+burst_length]))
+            if self.debug:
+                for i, value in enumerate(r[-1]):
+                    print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i*(burst == "incr")))
+            offset += burst_length
+        return r
+
+    def write_bursts(self, bursts):
+        """Batched writes.
+
+        Take a list of (addr, datas, burst) tuples and send all the write commands to the UARTBone
+        in a single transfer.
+        """
+        self._flush()
+        ba = bytearray()
+        for addr, data, burst in bursts:
+            ba += self._encode_write(addr, data, burst)
             if self.debug:
-                print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
-            if length is None:
-                return value
-            data.append(value)
+                for i, value in enumerate(data):
+                    print("write 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i*(burst == "incr")))
+        self._write(ba)
+
+    # Read / Write ---------------------------------------------------------------------------------
+
+    def read(self, addr, length=None, burst="incr"):
+        length_int = 1 if length is None else length
+        data = self.read_bursts([(addr, length_int, burst)])[0]
+        if length is None:
+            return data[0]
         return data
 
     def write(self, addr, data, burst="incr"):
-        self._flush()
-        data   = data if isinstance(data, list) else [data]
-        length = len(data)
-        offset = 0
-        while length:
-            size = min(length, 8)
-            cmd = {
-                "incr" : CMD_WRITE_BURST_INCR,
-                "fixed": CMD_WRITE_BURST_FIXED,
-            }[burst]
-            self._write([cmd, size])
-            self._write(list(((addr//4 + offset).to_bytes(4, byteorder="big"))))
-            for i, value in enumerate(data[offset:offset+size]):
-                self._write(list(value.to_bytes(4, byteorder="big")))
-                if self.debug:
-                    print("write 0x{:08x} @ 0x{:08x}".format(value, addr + offset, 4*i))
-            offset += size
-            length -= size
+        data = data if isinstance(data, list) else [data]
+        self.write_bursts([(addr, data, burst)])
@@ -5,7 +5,11 @@
 # Copyright (c) 2016 Tim 'mithro' Ansell <mithro@mithis.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import os
 import csv
+import json
+import struct
+import hashlib
 
 # CSR Elements -------------------------------------------------------------------------------------
 
@@ -24,8 +28,40 @@ class CSRElements:
             pass
         raise AttributeError("No such element " + attr)
 
+class CSRField:
+    def __init__(self, register, name, offset, size):
+        self.register = register
+        self.name     = name
+        self.offset   = offset
+        self.size     = size
+        self.mask     = (1 << size) - 1
+
+    def decode(self, value):
+        return (value >> self.offset) & self.mask
+
+    def encode(self, value, current=0):
+        return (current & ~(self.mask << self.offset)) | ((value & self.mask) << self.offset)
+
+    def read(self):
+        return self.decode(self.register.read())
+
+    def write(self, value):
+        # Read-Modify-Write on readable registers, direct write otherwise.
+        current = self.register.read() if self.register.mode in ["rw", "ro"] else 0
+        self.register.write(self.encode(value, current))
+
+_word_structs = {}
+
+def _get_word_struct(length, data_width):
+    # Precompiled Struct packing/unpacking a CSR split in length words of data_width bits (MSW first).
+    key = (length, data_width)
+    if key not in _word_structs:
+        fmt = {8: "B", 16: "H", 32: "I"}.get(data_width, None)
+        _word_structs[key] = None if fmt is None else struct.Struct(f">{length}{fmt}")
+    return _word_structs[key]
+
 class CSRRegister:
-    def __init__(self, readfn, writefn, name, addr, length, data_width, mode):
+    def __init__(self, readfn, writefn, name, addr, length, data_width, mode, fields=None):
         self.readfn     = readfn
         self.writefn    = writefn
         self.name       = name
@@ -33,6 +69,33 @@ class CSRRegister:
         self.length     = length
         self.data_width = data_width
         self.mode       = mode
+        self.fields     = CSRElements({n: CSRField(self, n, o, s) for n, (o, s) in (fields or {}).items()})
+
+        # Precompute word splitting.
+        self._struct = _get_word_struct(length, data_width)
+        self._nbytes = length*data_width//8
+        self._mask   = (1 << data_width) - 1
+        self._shifts = tuple((length-1-i)*data_width for i in range(length))
+
+    @property
+    def addrs(self):
+        return [self.addr + 4*i for i in range(self.length)]
+
+    def from_words(self, datas):
+        if self._struct is not None:
+            return int.from_bytes(self._struct.pack(*datas), "big")
+        data = 0
+        for d in datas:
+            data = (data << self.data_width) | d
+        return data
+
+    def to_words(self, value):
+        if self._struct is not None:
+            return list(self._struct.unpack((value & ((1 << 8*self._nbytes) - 1)).to_bytes(self._nbytes, "big")))
+        return [(value >> shift) & self._mask for shift in self._shifts]
+
+    def decode(self, value):
+        return {name: field.decode(value) for name, field in self.fields.d.items()}
 
     def read(self):
         if self.mode not in ["rw", "ro"]:
@@ -40,20 +103,12 @@ class CSRRegister:
         datas = self.readfn(self.addr, length=self.length)
         if isinstance(datas, int):
             return datas
-        else:
-            data = 0
-            for i in range(self.length):
-                data = data << self.data_width
-                data |= datas[i]
-            return data
+        return self.from_words(datas)
 
     def write(self, value):
         if self.mode not in ["rw", "wo"]:
             raise KeyError(self.name + "register not writable")
-        datas = []
-        for i in range(self.length):
-            datas.append((value >> ((self.length-1-i)*self.data_width)) & (2**self.data_width-1))
-        self.writefn(self.addr, datas)
+        self.writefn(self.addr, self.to_words(value))
 
 class CSRMemoryRegion:
     def __init__(self, base, size, type):
@@ -61,12 +116,140 @@ class CSRMemoryRegion:
         self.size = size
         self.type = type
 
+# CSR Map ------------------------------------------------------------------------------------------
+
+class CSRMap:
+    """CSR map loader.
+
+    Parse a csr.csv or csr.json file once into plain dicts (bases, registers, constants, memories),
+    with an address index of the registers. When caching is enabled (cache=True or CSRMap.cache),
+    parsed maps are stored as JSON in a cache directory (cache_dir, ~/.cache/litex/csr by default)
+    and reused as long as the file's mtime/size are unchanged; only the cache_max_entries most
+    recently used maps are kept.
+    """
+    cache             = False
+    cache_version     = 1
+    cache_dir         = None
+    cache_max_entries = 64
+
+    def __init__(self, bases=None, registers=None, constants=None, memories=None):
+        self.bases     = bases     or {}
+        self.registers = registers or {} # name: (addr, size, type, {field: (offset, size)}).
+        self.constants = constants or {}
+        self.memories  = memories  or {} # name: (base, size, type).
+        self.by_addr   = {addr: name for name, (addr, *_) in self.registers.items()}
+
+    @staticmethod
+    def _parse_int(value):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+
+    @classmethod
+    def from_csv(cls, filename):
+        bases, registers, constants, memories = {}, {}, {}, {}
+        with open(filename) as f:
+            for group, name, a, b, c in csv.reader(row for row in f if row[0] != "#"):
+                if group == "csr_base":
+                    bases[name] = int(a, 16)
+                elif group == "csr_register":
+                    registers[name] = (int(a, 16), int(b), c, {})
+                elif group == "constant":
+                    constants[name] = cls._parse_int(a)
+                elif group == "memory_region":
+                    memories[name] = (int(a, 16), int(b), c)
+        return cls(bases, registers, constants, memories)
+
+    @classmethod
+    def from_json(cls, filename):
+        with open(filename) as f:
+            d = json.load(f)
+        registers = {}
+        for name, reg in d["csr_registers"].items():
+            fields = {n: (f["offset"], f["size"]) for n, f in reg.get("fields", {}).items()}
+            registers[name] = (reg["addr"], reg["size"], reg["type"], fields)
+        memories = {name: (m["base"], m["size"], m["type"]) for name, m in d["memories"].items()}
+        return cls(dict(d["csr_bases"]), registers, dict(d["constants"]), memories)
+
+    def to_dict(self):
+        return {
+            "bases"     : self.bases,
+            "registers" : self.registers,
+            "constants" : self.constants,
+            "memories"  : self.memories,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        registers = {}
+        for name, (addr, size, type, fields) in d["registers"].items():
+            registers[name] = (addr, size, type, {n: tuple(f) for n, f in fields.items()})
+        memories = {name: tuple(m) for name, m in d["memories"].items()}
+        return cls(d["bases"], registers, d["constants"], memories)
+
+    @classmethod
+    def _get_cache_dir(cls, cache_dir=None):
+        cache_dir = cache_dir or cls.cache_dir
+        if cache_dir is None:
+            cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "litex", "csr")
+        return cache_dir
+
+    @classmethod
+    def _cache_filename(cls, filename, cache_dir=None):
+        key = hashlib.sha1(os.path.realpath(filename).encode("utf-8")).hexdigest()
+        return os.path.join(cls._get_cache_dir(cache_dir), key + ".json")
+
+    @classmethod
+    def _prune_cache(cls, cache_dir=None):
+        # Only keep the most recently used maps.
+        cache_dir = cls._get_cache_dir(cache_dir)
+        filenames = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith(".json")]
+        filenames.sort(key=os.path.getmtime, reverse=True)
+        for filename in filenames[cls.cache_max_entries:]:
+            os.remove(filename)
+
+    @classmethod
+    def load(cls, filename, cache=None, cache_dir=None):
+        stat  = os.stat(filename)
+        key   = [cls.cache_version, stat.st_mtime_ns, stat.st_size]
+        cache = cls.cache if cache is None else cache
+
+        # Try to reuse cached map.
+        cache_filename = cls._cache_filename(filename, cache_dir) if cache else None
+        if cache:
+            try:
+                with open(cache_filename) as f:
+                    d = json.load(f)
+                if d["key"] == key:
+                    os.utime(cache_filename)
+                    return cls.from_dict(d)
+            except Exception:
+                pass
+
+        # Parse file.
+        if os.path.splitext(filename)[1] == ".json":
+            csr_map = cls.from_json(filename)
+        else:
+            csr_map = cls.from_csv(filename)
+
+        # Update cache.
+        if cache:
+            try:
+                os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+                with open(cache_filename, "w") as f:
+                    json.dump({"key": key, **csr_map.to_dict()}, f)
+                cls._prune_cache(cache_dir)
+            except OSError:
+                pass
+        return csr_map
+
 # CSR Builder --------------------------------------------------------------------------------------
 
 class CSRBuilder:
     def __init__(self, comm, csr_csv, csr_data_width=None):
         if csr_csv is not None:
-            self.items     = self.get_csr_items(csr_csv)
+            self.csr_map   = CSRMap.load(csr_csv)
             self.constants = self.build_constants()
 
             # Load csr_data_width from the constants, otherwise it must be provided
@@ -83,44 +266,64 @@ class CSRBuilder:
             self.bases = self.build_bases()
             self.regs  = self.build_registers(comm.read, comm.write)
             self.mems  = self.build_memories()
-
-    @staticmethod
-    def get_csr_items(csr_csv):
-        return list(csv.reader(filter(lambda row: row[0] != "#", open(csr_csv))))
+            self._csr_comm = comm
 
     def build_bases(self):
-        d = {}
-        for item in self.items:
-            group, name, addr, dummy0, dummy1 = item
-            if group == "csr_base":
-                d[name] = int(addr.replace("0x", ""), 16)
-        return CSRElements(d)
+        return CSRElements(dict(self.csr_map.bases))
 
     def build_registers(self, readfn, writefn):
         d = {}
-        for item in self.items:
-            group, name, addr, length, mode = item
-            if group == "csr_register":
-                addr = int(addr.replace("0x", ""), 16)
-                length = int(length)
-                d[name] = CSRRegister(readfn, writefn, name, addr, length, self.csr_data_width, mode)
+        for name, (addr, length, mode, fields) in self.csr_map.registers.items():
+            d[name] = CSRRegister(readfn, writefn, name, addr, length, self.csr_data_width, mode, fields)
         return CSRElements(d)
 
     def build_constants(self):
-        d = {}
-        for item in self.items:
-            group, name, value, dummy0, dummy1 = item
-            if group == "constant":
-                try:
-                    d[name] = int(value)
-                except:
-                    d[name] = value
-        return CSRElements(d)
+        return CSRElements(dict(self.csr_map.constants))
 
     def build_memories(self):
         d = {}
-        for item in self.items:
-            group, name, base, size, type = item
-            if group == "memory_region":
-                d[name] = CSRMemoryRegion(int(base, 16), int(size), type)
+        for name, (base, size, type) in self.csr_map.memories.items():
+            d[name] = CSRMemoryRegion(base, size, type)
         return CSRElements(d)
+
+    def read_many(self, regs):
+        """Read several CSRs at once.
+
+        Take a list of registers (CSRRegister or names) and return their values, reading all the
+        underlying words in a single access when the Comm supports it (read_addrs), otherwise with
+        one burst per contiguous group of words.
+        """
+        regs  = [getattr(self.regs, reg) if isinstance(reg, str) else reg for reg in regs]
+        addrs = []
+        for reg in regs:
+            if reg.mode not in ["rw", "ro"]:
+                raise KeyError(reg.name + "register not readable")
+            addrs += reg.addrs
+        if not addrs:
+            return []
+
+        comm = self._csr_comm
+        if hasattr(comm, "read_addrs"):
+            datas = comm.read_addrs(addrs)
+        else:
+            # Group contiguous words in bursts.
+            bursts = []
+            for addr in addrs:
+                if bursts and (addr == bursts[-1][0] + 4*bursts[-1][1]):
+                    bursts[-1][1] += 1
+                else:
+                    bursts.append([addr, 1])
+            datas = []
+            if hasattr(comm, "read_bursts"):
+                for burst_datas in comm.read_bursts([(addr, length, "incr") for addr, length in bursts]):
+                    datas += burst_datas
+            else:
+                for addr, length in bursts:
+                    datas += comm.read(addr, length)
+
+        values = []
+        offset = 0
+        for reg in regs:
+            values.append(reg.from_words(datas[offset:offset + reg.length]))
+            offset += reg.length
+        return values
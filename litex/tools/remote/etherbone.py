@@ -5,8 +5,10 @@
 # Copyright (c) 2017 Tim Ansell <mithro@mithis.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
-import math
+import sys
 import struct
+import weakref
+from array import array
 
 from litex.soc.interconnect.packet import HeaderField, Header
 
@@ -52,13 +54,91 @@ etherbone_record_header = Header(
     length           = etherbone_record_header_length,
     swap_field_bytes = True)
 
-
-def get_field_data(field, datas):
-    v = int.from_bytes(datas[field.byte:field.byte+math.ceil(field.width/8)], "big")
-    return (v >> field.offset) & (2**field.width-1)
-
-pack_to_uint32 = struct.Struct('>I').pack
-unpack_uint32_from = struct.Struct('>I').unpack
+# Etherbone Codec ----------------------------------------------------------------------------------
+#
+# Headers are packed/unpacked with precompiled Structs and writes/reads payloads are handled as
+# array("I") of 32-bit words (byteswapped from/to big-endian in a single pass), avoiding per-word
+# Python objects/operations.
+
+_packet_header_struct = struct.Struct(">HBB4x") # Magic, Version/NR/PR/PF, Addr/Port Size.
+_record_header_struct = struct.Struct(">BBBB")  # Flags, Byte Enable, WCount, RCount.
+_uint32_struct        = struct.Struct(">I")
+
+assert array("I").itemsize == 4
+_byteswap = (sys.byteorder == "little")
+
+def words_to_bytes(words):
+    """Convert a sequence of 32-bit words to big-endian bytes."""
+    if not isinstance(words, array):
+        words = array("I", words)
+    if _byteswap:
+        words = array("I", words)
+        words.byteswap()
+    return words.tobytes()
+
+def bytes_to_words(data):
+    """Convert big-endian bytes (bytes/bytearray/memoryview) to an array("I") of 32-bit words."""
+    words = array("I")
+    words.frombytes(data)
+    if _byteswap:
+        words.byteswap()
+    return words
+
+def encode_packet_header(pf=0, pr=0, nr=0, addr_size=4, port_size=4):
+    return _packet_header_struct.pack(etherbone_magic,
+        (etherbone_version << 4) | (nr << 2) | (pr << 1) | pf,
+        (addr_size << 4) | port_size)
+
+def decode_packet_header(data, offset=0):
+    magic, flags, sizes = _packet_header_struct.unpack_from(data, offset)
+    return {
+        "magic"     : magic,
+        "version"   : (flags >> 4) & 0xf,
+        "nr"        : (flags >> 2) & 0x1,
+        "pr"        : (flags >> 1) & 0x1,
+        "pf"        : (flags >> 0) & 0x1,
+        "addr_size" : (sizes >> 4) & 0xf,
+        "port_size" : (sizes >> 0) & 0xf,
+    }
+
+def encode_record(base_addr=0, writes=None, base_ret_addr=0, reads=None, flags=0, byte_enable=0xf):
+    """Encode a record (header + writes + reads) from base addresses and words sequences."""
+    wcount = 0 if writes is None else len(writes)
+    rcount = 0 if reads  is None else len(reads)
+    ba = bytearray(_record_header_struct.pack(flags, byte_enable, wcount, rcount))
+    if wcount:
+        ba += _uint32_struct.pack(base_addr)
+        ba += words_to_bytes(writes)
+    if rcount:
+        ba += _uint32_struct.pack(base_ret_addr)
+        ba += words_to_bytes(reads)
+    return ba
+
+def encode_packet(records, pf=0, pr=0, nr=0):
+    """Encode a packet from already encoded records."""
+    return encode_packet_header(pf=pf, pr=pr, nr=nr) + b"".join(records)
+
+def decode_record_header(data, offset=0):
+    flags, byte_enable, wcount, rcount = _record_header_struct.unpack_from(data, offset)
+    return flags, byte_enable, wcount, rcount
+
+def record_length(wcount, rcount):
+    return etherbone_record_header_length + 4*((wcount + 1) if wcount else 0) + 4*((rcount + 1) if rcount else 0)
+
+def decode_record(data, offset=0):
+    """Decode a record, return (flags, byte_enable, base_addr, writes, base_ret_addr, reads, length)."""
+    flags, byte_enable, wcount, rcount = decode_record_header(data, offset)
+    data   = memoryview(data)
+    offset += etherbone_record_header_length
+    base_addr, writes, base_ret_addr, reads = 0, None, 0, None
+    if wcount:
+        base_addr = _uint32_struct.unpack_from(data, offset)[0]
+        writes    = bytes_to_words(data[offset + 4:offset + 4*(wcount + 1)])
+        offset   += 4*(wcount + 1)
+    if rcount:
+        base_ret_addr = _uint32_struct.unpack_from(data, offset)[0]
+        reads         = bytes_to_words(data[offset + 4:offset + 4*(rcount + 1)])
+    return flags, byte_enable, base_addr, writes, base_ret_addr, reads, record_length(wcount, rcount)
 
 # Packet -------------------------------------------------------------------------------------------
 
@@ -89,47 +169,36 @@ class EtherboneRead:
 
 class EtherboneWrites(Packet):
     def __init__(self, init=[], base_addr=0, datas=[]):
-        if isinstance(datas, list) and len(datas) > 255:
-            raise ValueError(f"Burst size of {len(datas)} exceeds maximum of 255 allowed by Etherbone.")
         Packet.__init__(self, init)
         self.base_addr = base_addr
-        self.writes    = []
+        self.datas     = array("I", datas)
         self.encoded   = init != []
-        for data in datas:
-            self.add(EtherboneWrite(data))
+        if len(self.datas) > 255:
+            raise ValueError(f"Burst size of {len(self.datas)} exceeds maximum of 255 allowed by Etherbone.")
+
+    @property
+    def writes(self):
+        return [EtherboneWrite(data) for data in self.datas]
 
     def add(self, write):
-        self.writes.append(write)
+        self.datas.append(write.data)
 
     def get_datas(self):
-        datas = []
-        for write in self.writes:
-            datas.append(write.data)
-        return datas
+        return self.datas.tolist()
 
     def encode(self):
         if self.encoded:
             raise ValueError
-        ba = bytearray()
-        ba += pack_to_uint32(self.base_addr)
-        for write in self.writes:
-            ba += pack_to_uint32(write.data)
-        self.bytes   = ba
+        self.bytes   = _uint32_struct.pack(self.base_addr) + words_to_bytes(self.datas)
         self.encoded = True
 
     def decode(self):
         if not self.encoded:
             raise ValueError
-        ba = self.bytes
-        self.base_addr = unpack_uint32_from(ba[:4])[0]
-        writes = []
-        offset = 4
-        length = len(ba)
-        while length > offset:
-            writes.append(EtherboneWrite(unpack_uint32_from(ba[offset:offset+4])[0]))
-            offset += 4
-        self.writes  = writes
-        self.encoded = False
+        ba = memoryview(self.bytes)
+        self.base_addr = _uint32_struct.unpack_from(ba, 0)[0]
+        self.datas     = bytes_to_words(ba[4:len(ba) & ~0x3])
+        self.encoded   = False
 
     def __repr__(self):
         r = "Writes\n"
@@ -143,47 +212,36 @@ class EtherboneWrites(Packet):
 
 class EtherboneReads(Packet):
     def __init__(self, init=[], base_ret_addr=0, addrs=[]):
-        if isinstance(addrs, list) and len(addrs) > 255:
-            raise ValueError(f"Burst size of {len(addrs)} exceeds maximum of 255 allowed by Etherbone.")
         Packet.__init__(self, init)
         self.base_ret_addr = base_ret_addr
-        self.reads   = []
+        self.addrs   = array("I", addrs)
         self.encoded = init != []
-        for addr in addrs:
-            self.add(EtherboneRead(addr))
+        if len(self.addrs) > 255:
+            raise ValueError(f"Burst size of {len(self.addrs)} exceeds maximum of 255 allowed by Etherbone.")
+
+    @property
+    def reads(self):
+        return [EtherboneRead(addr) for addr in self.addrs]
 
     def add(self, read):
-        self.reads.append(read)
+        self.addrs.append(read.addr)
 
     def get_addrs(self):
-        addrs = []
-        for read in self.reads:
-            addrs.append(read.addr)
-        return addrs
+        return self.addrs.tolist()
 
     def encode(self):
         if self.encoded:
             raise ValueError
-        ba = bytearray()
-        ba += pack_to_uint32(self.base_ret_addr)
-        for read in self.reads:
-            ba += pack_to_uint32(read.addr)
-        self.bytes   = ba
+        self.bytes   = _uint32_struct.pack(self.base_ret_addr) + words_to_bytes(self.addrs)
         self.encoded = True
 
     def decode(self):
         if not self.encoded:
             raise ValueError
-        ba = self.bytes
-        base_ret_addr = unpack_uint32_from(ba[:4])[0]
-        reads  = []
-        offset = 4
-        length = len(ba)
-        while length > offset:
-            reads.append(EtherboneRead(unpack_uint32_from(ba[offset:offset+4])[0]))
-            offset += 4
-        self.reads   = reads
-        self.encoded = False
+        ba = memoryview(self.bytes)
+        self.base_ret_addr = _uint32_struct.unpack_from(ba, 0)[0]
+        self.addrs         = bytes_to_words(ba[4:len(ba) & ~0x3])
+        self.encoded       = False
 
     def __repr__(self):
         r = "Reads\n"
@@ -195,6 +253,8 @@ class EtherboneReads(Packet):
 
 # Etherbone Record ---------------------------------------------------------------------------------
 
+_record_flags = {"bca": 0, "rca": 1, "rff": 2, "cyc": 4, "wca": 5, "wff": 6}
+
 class EtherboneRecord(Packet):
     def __init__(self, init=[]):
         Packet.__init__(self, init)
@@ -211,27 +271,31 @@ class EtherboneRecord(Packet):
         self.rcount      = 0
         self.encoded     = init != []
 
+    @property
+    def length(self):
+        return record_length(self.wcount, self.rcount)
+
     def decode(self):
         if not self.encoded:
             raise ValueError
 
+        flags, self.byte_enable, base_addr, writes, base_ret_addr, reads, length = decode_record(self.bytes)
+
         # Decode header
-        header = list(self.bytes[:etherbone_record_header.length])
-        for k, v in sorted(etherbone_record_header.fields.items()):
-            setattr(self, k, get_field_data(v, header))
-        offset = etherbone_record_header.length
+        for k, offset in _record_flags.items():
+            setattr(self, k, (flags >> offset) & 0x1)
+        self.wcount = 0 if writes is None else len(writes)
+        self.rcount = 0 if reads  is None else len(reads)
 
         # Decode writes
         if self.wcount:
-            self.writes = EtherboneWrites(self.bytes[offset:offset + 4*(self.wcount+1)])
-            offset += 4*(self.wcount+1)
-            self.writes.decode()
+            self.writes = EtherboneWrites(base_addr=base_addr)
+            self.writes.datas = writes
 
         # Decode reads
         if self.rcount:
-            self.reads = EtherboneReads(self.bytes[offset:offset + 4*(self.rcount+1)])
-            offset += 4*(self.rcount+1)
-            self.reads.decode()
+            self.reads = EtherboneReads(base_ret_addr=base_ret_addr)
+            self.reads.addrs = reads
 
         self.encoded = False
 
@@ -240,29 +304,20 @@ class EtherboneRecord(Packet):
             raise ValueError
 
         # Set writes/reads count
-        self.wcount = 0 if self.writes is None else len(self.writes.writes)
-        self.rcount = 0 if self.reads  is None else len(self.reads.reads)
-
-        ba = bytearray()
-
-        # Encode header
-        header = 0
-        for k, v in sorted(etherbone_record_header.fields.items()):
-            value = int.from_bytes(getattr(self, k).to_bytes(math.ceil(v.width/8), "big"), "little")
-            header += (value << v.offset+(v.byte*8))
-        ba += header.to_bytes(etherbone_record_header.length, "little")
-
-        # Encode writes
-        if self.wcount:
-            self.writes.encode()
-            ba += self.writes.bytes
-
-        # Encode reads
-        if self.rcount:
-            self.reads.encode()
-            ba += self.reads.bytes
-
-        self.bytes   = ba
+        self.wcount = 0 if self.writes is None else len(self.writes.datas)
+        self.rcount = 0 if self.reads  is None else len(self.reads.addrs)
+
+        flags = 0
+        for k, offset in _record_flags.items():
+            flags |= (getattr(self, k) & 0x1) << offset
+
+        self.bytes = encode_record(
+            base_addr     = 0    if self.writes is None else self.writes.base_addr,
+            writes        = None if self.writes is None else self.writes.datas,
+            base_ret_addr = 0    if self.reads  is None else self.reads.base_ret_addr,
+            reads         = None if self.reads  is None else self.reads.addrs,
+            flags         = flags,
+            byte_enable   = self.byte_enable)
         self.encoded = True
 
     def __repr__(self, n=0):
@@ -300,12 +355,11 @@ class EtherbonePacket(Packet):
         if not self.encoded:
             raise ValueError
 
-        ba = self.bytes
+        ba = memoryview(self.bytes)
 
         # Decode header
-        header = list(ba[:etherbone_packet_header.length])
-        for k, v in sorted(etherbone_packet_header.fields.items()):
-            setattr(self, k, get_field_data(v, header))
+        for k, v in decode_packet_header(ba).items():
+            setattr(self, k, v)
         offset = etherbone_packet_header.length
 
         # Decode records
@@ -314,11 +368,7 @@ class EtherbonePacket(Packet):
             record = EtherboneRecord(ba[offset:])
             record.decode()
             self.records.append(record)
-            offset += etherbone_record_header.length
-            if record.wcount:
-                offset += 4*(record.wcount + 1)
-            if record.rcount:
-                offset += 4*(record.rcount + 1)
+            offset += record.length
 
         self.encoded = False
 
@@ -326,21 +376,21 @@ class EtherbonePacket(Packet):
         if self.encoded:
             raise ValueError
 
-        ba = bytearray()
-
-        # Encode header
-        header = 0
-        for k, v in sorted(etherbone_packet_header.fields.items()):
-            value = int.from_bytes(getattr(self, k).to_bytes(math.ceil(v.width/8), "big"), "little")
-            header += (value << v.offset+(v.byte*8))
-        ba += header.to_bytes(etherbone_packet_header.length, "little")
-
         # Encode records
+        records = []
         for record in self.records:
             record.encode()
-            ba += record.bytes
-
-        self.bytes   = ba
+            records.append(record.bytes)
+
+        # Encode header + records
+        self.bytes = bytearray(encode_packet_header(
+            pf        = self.pf,
+            pr        = self.pr,
+            nr        = self.nr,
+            addr_size = self.addr_size,
+            port_size = self.port_size))
+        for record in records:
+            self.bytes += record
         self.encoded = True
 
     def __repr__(self):
@@ -356,28 +406,77 @@ class EtherbonePacket(Packet):
                 r += record.__repr__(i)
         return r
 
+# Etherbone Reader ---------------------------------------------------------------------------------
+
+class EtherboneReader:
+    """Buffered Etherbone packets reader.
+
+    Receive into a preallocated buffer with recv_into (several back-to-back packets can be received
+    in a single call) and return packets as memoryviews on this buffer. A returned packet is only
+    valid until the next call and must be decoded (or copied) before.
+    """
+    header_length = etherbone_packet_header_length + etherbone_record_header_length
+
+    def __init__(self, socket, size=65536):
+        self.socket = socket
+        self.buf    = bytearray(size)
+        self.view   = memoryview(self.buf)
+        self.start  = 0
+        self.end    = 0
+
+    def _packet_size(self):
+        # Return buffered packet size (or None if header is not fully buffered).
+        if (self.end - self.start) < self.header_length:
+            return None
+        flags, byte_enable, wcount, rcount = decode_record_header(self.buf, self.start + etherbone_packet_header_length)
+        return etherbone_packet_header_length + record_length(wcount, rcount)
+
+    def pending(self):
+        # Check if a complete packet is already buffered.
+        size = self._packet_size()
+        return (size is not None) and ((self.end - self.start) >= size)
+
+    def _fill(self):
+        # Move remaining data to the start of the buffer when running out of space.
+        if self.end == len(self.buf):
+            n = self.end - self.start
+            self.view[:n] = self.view[self.start:self.end]
+            self.start = 0
+            self.end   = n
+        n = self.socket.recv_into(self.view[self.end:])
+        self.end += n
+        return n
+
+    def receive_packet(self):
+        while True:
+            size = self._packet_size()
+            if (size is not None) and ((self.end - self.start) >= size):
+                packet = self.view[self.start:self.start + size]
+                self.start += size
+                if self.start == self.end:
+                    self.start = self.end = 0
+                return packet
+            if self._fill() == 0:
+                return 0
+
 # Etherbone IPC ------------------------------------------------------------------------------------
 
 class EtherboneIPC:
+    def __init__(self):
+        # Per-socket packet readers (created once: sockets can be served from several threads).
+        self._readers = weakref.WeakKeyDictionary()
+
     def send_packet(self, socket, packet):
         socket.sendall(packet.bytes)
 
+    def _get_reader(self, socket):
+        reader = self._readers.get(socket, None)
+        if reader is None:
+            reader = self._readers[socket] = EtherboneReader(socket)
+        return reader
+
+    def packet_pending(self, socket):
+        return self._get_reader(socket).pending()
+
     def receive_packet(self, socket):
-        header_length = etherbone_packet_header_length + etherbone_record_header_length
-        packet        = bytes()
-        while len(packet) < header_length:
-            chunk = socket.recv(header_length - len(packet))
-            if len(chunk) == 0:
-                return 0
-            else:
-                packet += chunk
-        wcount, rcount = struct.unpack(">BB", packet[header_length-2:])
-        counts = wcount + rcount
-        packet_size = header_length + 4*(counts + 1)
-        while len(packet) < packet_size:
-            chunk = socket.recv(packet_size - len(packet))
-            if len(chunk) == 0:
-                return 0
-            else:
-                packet += chunk
-        return packet
+        return self._get_reader(socket).receive_packet()
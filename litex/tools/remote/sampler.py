@@ -0,0 +1,103 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import time
+import threading
+
+# CSR Sampler --------------------------------------------------------------------------------------
+
+class CSRSampler:
+    """CSR sampling engine.
+
+    Periodically read a set of CSRs (merged in a single access with read_many) at a given rate and
+    store the timestamped samples in a fixed-size ring buffer (NumPy arrays), bounding CPU/memory
+    usage whatever the sampling duration. Samples can be exported to CSV or to a NumPy .npz file
+    (values of registers wider than 64-bit are stored as objects: load with allow_pickle=True).
+    """
+    def __init__(self, bus, regs, rate=1e3, depth=65536):
+        import numpy as np
+        self.np    = np
+        self.bus   = bus
+        self.regs  = [getattr(bus.regs, reg) if isinstance(reg, str) else reg for reg in regs]
+        self.names = [reg.name for reg in self.regs]
+        self.rate  = rate
+        self.depth = depth
+
+        # Ring buffer (values stored as Python ints for registers wider than 64-bit).
+        wide = any(reg.length*reg.data_width > 64 for reg in self.regs)
+        self.timestamps = np.zeros(depth, dtype=np.float64)
+        self.values     = np.zeros((depth, len(self.regs)), dtype=object if wide else np.uint64)
+        self.count      = 0 # Total number of samples.
+        self.overruns   = 0 # Number of missed sampling periods.
+
+        self._lock   = threading.Lock()
+        self._stop   = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        values    = self.bus.read_many(self.regs)
+        timestamp = time.perf_counter()
+        with self._lock:
+            n = self.count % self.depth
+            self.timestamps[n] = timestamp
+            self.values[n]     = values
+            self.count += 1
+
+    def _run(self, duration):
+        period   = 1/self.rate
+        start    = time.perf_counter()
+        deadline = start
+        while not self._stop.is_set():
+            self.sample()
+            deadline += period
+            now = time.perf_counter()
+            if (duration is not None) and (now - start) >= duration:
+                break
+            if now > deadline:
+                # Late: skip missed periods instead of bursting to catch up.
+                missed    = int((now - deadline)/period) + 1
+                deadline += missed*period
+                self.overruns += missed
+            self._stop.wait(deadline - now)
+
+    def start(self, duration=None):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(duration,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.join()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self):
+        """Return (timestamps, values) of the buffered samples, from oldest to newest."""
+        with self._lock:
+            if self.count <= self.depth:
+                return self.timestamps[:self.count].copy(), self.values[:self.count].copy()
+            n = self.count % self.depth
+            return (
+                self.np.concatenate((self.timestamps[n:], self.timestamps[:n])),
+                self.np.concatenate((self.values[n:],     self.values[:n])))
+
+    def export(self, filename):
+        timestamps, values = self.get()
+        if len(timestamps):
+            timestamps = timestamps - timestamps[0]
+        if filename.endswith(".csv"):
+            with open(filename, "w") as f:
+                f.write(",".join(["time"] + self.names) + "\n")
+                for t, v in zip(timestamps, values):
+                    f.write(f"{t:.9f}," + ",".join(str(int(x)) for x in v) + "\n")
+        else:
+            self.np.savez(filename, time=timestamps, values=values, names=self.np.array(self.names))
+
+    def __repr__(self):
+        return "CSRSampler: {} registers @ {}Hz, {} samples ({} buffered, {} overruns)".format(
+            len(self.regs), self.rate, self.count, min(self.count, self.depth), self.overruns)
@@ -0,0 +1,223 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import sys
+import time
+import struct
+from array import array
+
+from litex.tools.remote.etherbone import encode_packet, encode_record
+
+# Remote Accesses Trace ----------------------------------------------------------------------------
+#
+# Compact binary trace of the accesses done through a RemoteClient:
+# - Header: b"LXTRACE" + version (1 byte).
+# - Events: kind (u8), burst (u8), timestamp (f64, seconds from trace start), addr (u32), count
+#   (u16), followed by count 32-bit words (little-endian): written datas for writes,
+#   read datas for reads. For TRACE_READ_ADDRS events, count addresses then count datas follow.
+
+TRACE_MAGIC       = b"LXTRACE"
+TRACE_VERSION     = 1
+
+TRACE_READ        = 0
+TRACE_WRITE       = 1
+TRACE_READ_ADDRS  = 2
+
+TRACE_BURST_INCR  = 0
+TRACE_BURST_FIXED = 1
+
+_bursts      = {"incr": TRACE_BURST_INCR, "fixed": TRACE_BURST_FIXED}
+_burst_names = {v: k for k, v in _bursts.items()}
+
+_event_struct = struct.Struct("<BBdIH")
+
+def _to_words(values):
+    # Convert values to little-endian 32-bit words.
+    words = array("I", values)
+    if sys.byteorder == "big":
+        words.byteswap()
+    return words
+
+def _from_bytes(data):
+    words = array("I")
+    words.frombytes(data)
+    if sys.byteorder == "big":
+        words.byteswap()
+    return words.tolist()
+
+# Trace Recorder -----------------------------------------------------------------------------------
+
+class TraceRecorder:
+    def __init__(self, filename):
+        self.file  = open(filename, "wb")
+        self.start = time.perf_counter()
+        self.file.write(TRACE_MAGIC + bytes([TRACE_VERSION]))
+
+    def log(self, kind, addr, datas, addrs=None, burst="incr"):
+        t = time.perf_counter() - self.start
+        self.file.write(_event_struct.pack(kind, _bursts[burst], t, addr & 0xffffffff, len(datas)))
+        if addrs is not None:
+            self.file.write(_to_words(addrs).tobytes())
+        self.file.write(_to_words(datas).tobytes())
+
+    def close(self):
+        self.file.close()
+
+# Trace Reader -------------------------------------------------------------------------------------
+
+class TraceEvent:
+    def __init__(self, kind, time, addr, datas, addrs=None, burst="incr"):
+        self.kind  = kind
+        self.time  = time
+        self.addr  = addr
+        self.datas = datas
+        self.addrs = addrs
+        self.burst = burst
+
+    def get_addrs(self):
+        if self.addrs is not None:
+            return self.addrs
+        if self.burst == "fixed":
+            return [self.addr]*len(self.datas)
+        return [self.addr + 4*i for i in range(len(self.datas))]
+
+    def __repr__(self):
+        kind = {TRACE_READ: "RD", TRACE_WRITE: "WR", TRACE_READ_ADDRS: "RD"}[self.kind]
+        if self.burst == "fixed":
+            kind += " (fixed)"
+        return "{:12.6f} {} @ 0x{:08x}: {}".format(self.time, kind, self.addr,
+            " ".join(f"0x{d:08x}" for d in self.datas))
+
+def read_trace(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    if data[:len(TRACE_MAGIC)] != TRACE_MAGIC:
+        raise ValueError(f"{filename} is not a LiteX trace.")
+    version = data[len(TRACE_MAGIC)]
+    if version != TRACE_VERSION:
+        raise ValueError(f"Unsupported trace version {version}.")
+    offset = len(TRACE_MAGIC) + 1
+    while offset < len(data):
+        kind, burst, t, addr, count = _event_struct.unpack_from(data, offset)
+        offset += _event_struct.size
+        addrs   = None
+        if kind == TRACE_READ_ADDRS:
+            addrs   = _from_bytes(data[offset:offset + 4*count])
+            offset += 4*count
+        datas   = _from_bytes(data[offset:offset + 4*count])
+        offset += 4*count
+        yield TraceEvent(kind, t, addr, datas, addrs, _burst_names[burst])
+
+# Trace Replay -------------------------------------------------------------------------------------
+
+def _get_sync_addr(bus):
+    # Address of a register without read side effects (scratch or identifier), if known.
+    regs  = getattr(bus, "regs",  None)
+    bases = getattr(bus, "bases", None)
+    if regs is not None and hasattr(regs, "ctrl_scratch"):
+        return regs.ctrl_scratch.addr
+    if bases is not None and hasattr(bases, "identifier_mem"):
+        return bases.identifier_mem
+    return None
+
+def replay_trace(bus, filename, reads=False, delays=False, min_delay=1e-3, burst_length=255, sync_addr=None):
+    """Replay a trace.
+
+    Incrementing writes are coalesced in maximal bursts, fixed (FIFO) writes are kept as fixed
+    bursts, and sent in batches; reads are skipped unless reads is set (ex when reads are needed by
+    the hardware, polling, FIFOs). With delays, gaps of more than min_delay between recorded events
+    are preserved (ex for PLL lock or SDRAM init timings).
+    Replay ends with a read of sync_addr (scratch/identifier by default, skipped if unknown) to
+    wait for the writes to be done; this address must be free of read side effects.
+    Return the number of (recorded writes, sent bursts).
+    """
+    bursts     = []
+    nwrites    = 0
+    nbursts    = 0
+    last_time  = None
+    last_write = None
+    sync_addr  = _get_sync_addr(bus) if sync_addr is None else sync_addr
+
+    def flush():
+        if bursts:
+            bus.socket.sendall(b"".join(encode_packet([encode_record(
+                base_addr = bus.base_address + addr,
+                writes    = datas,
+                flags     = (1 << 6) if fixed else 0)]) # WriteFIFO (wff).
+                for addr, datas, fixed in bursts))
+            bursts.clear()
+
+    for event in read_trace(filename):
+        if delays and (last_time is not None) and (event.time - last_time) > min_delay:
+            flush()
+            time.sleep(event.time - last_time)
+        last_time = event.time
+        if event.kind == TRACE_WRITE:
+            nwrites   += 1
+            last_write = event.addr
+            if event.burst == "fixed":
+                for n in range(0, len(event.datas), burst_length):
+                    bursts.append((event.addr, event.datas[n:n + burst_length], True))
+                    nbursts += 1
+                continue
+            for i, data in enumerate(event.datas):
+                addr = event.addr + 4*i
+                if (bursts and (not bursts[-1][2]) and
+                    (addr == bursts[-1][0] + 4*len(bursts[-1][1])) and
+                    (len(bursts[-1][1]) < burst_length)):
+                    bursts[-1][1].append(data)
+                else:
+                    bursts.append((addr, [data], False))
+                    nbursts += 1
+        elif reads:
+            flush()
+            if event.kind == TRACE_READ_ADDRS:
+                bus.read_addrs(event.addrs)
+            else:
+                bus.read(event.addr, len(event.datas), burst=event.burst)
+    flush()
+
+    # Synchronize with the server (ensures all the writes have been done).
+    if (last_write is not None) and (sync_addr is not None):
+        bus.read(sync_addr)
+    return nwrites, nbursts
+
+# Trace Viewer -------------------------------------------------------------------------------------
+
+def summarize_trace(filename, csr_map=None, top=32):
+    """Summarize a trace: accesses hot spots by CSR/memory region name."""
+    names = {}
+    if csr_map is not None:
+        for name, (addr, size, type, fields) in csr_map.registers.items():
+            for i in range(size):
+                names[addr + 4*i] = name
+
+    def get_name(addr):
+        if addr in names:
+            return names[addr]
+        if csr_map is not None:
+            for name, (base, size, type) in csr_map.memories.items():
+                if base <= addr < base + size:
+                    return name
+        return f"0x{addr:08x}"
+
+    stats    = {}
+    nevents  = 0
+    duration = 0
+    for event in read_trace(filename):
+        nevents += 1
+        duration = event.time
+        kind = "writes" if event.kind == TRACE_WRITE else "reads"
+        for addr in event.get_addrs():
+            name = get_name(addr)
+            s = stats.setdefault(name, {"reads": 0, "writes": 0, "first": event.time, "last": event.time})
+            s[kind]   += 1
+            s["last"]  = event.time
+
+    r  = f"{nevents} events over {duration:.3f}s\n"
+    r += "{:40s} {:>10s} {:>10s} {:>12s}\n".format("Name", "Reads", "Writes", "Span (s)")
+    for name, s in sorted(stats.items(), key=lambda kv: -(kv[1]["reads"] + kv[1]["writes"]))[:top]:
+        r += "{:40s} {:>10d} {:>10d} {:>12.6f}\n".format(name, s["reads"], s["writes"], s["last"] - s["first"])
+    return r
@@ -49,6 +49,9 @@ setup(
             # Simulation.
             "litex_sim=litex.tools.litex_sim:main",
 
+            # Build.
+            "litex_build_variants=litex.tools.litex_build_variants:main",
+
             # Demos.
             "litex_bare_metal_demo=litex.soc.software.demo.demo:main",
 
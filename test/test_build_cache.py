@@ -0,0 +1,147 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import time
+import tempfile
+import unittest
+
+from litex.build.tools import write_to_file, WriteRecorder
+from litex.build.cache import BuildCache, snapshot, get_generated, get_platform_sources, get_platform_extras
+
+# Test Build Cache ---------------------------------------------------------------------------------
+
+class TestBuildCache(unittest.TestCase):
+    def write(self, filename, contents):
+        with open(filename, "w") as f:
+            f.write(contents)
+
+    def read(self, filename):
+        with open(filename) as f:
+            return f.read()
+
+    def test_build_cache(self):
+        runs = []
+        def run():
+            # Toolchain model: generate bitstream/report from Verilog.
+            runs.append(1)
+            self.write(os.path.join(build_dir, "top.bit"), "bit:" + self.read(os.path.join(build_dir, "top.v")))
+            self.write(os.path.join(build_dir, "top.rpt"), "report")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = BuildCache(os.path.join(tmpdir, "cache"))
+            for i, verilog in enumerate(["v0", "v0", "v1", "v0"]):
+                build_dir = os.path.join(tmpdir, f"build{i}")
+                os.makedirs(build_dir)
+                self.write(os.path.join(build_dir, "top.v"),   verilog)
+                self.write(os.path.join(build_dir, "top.xdc"), "xdc")
+                hit = cache.build(build_dir, run, extras=["Toolchain", "1.0"])
+                self.assertEqual(hit, i in [1, 3])
+                self.assertEqual(self.read(os.path.join(build_dir, "top.bit")), "bit:" + verilog)
+                # Rebuilding in the same directory hits (outputs of the last build are not inputs).
+                self.assertTrue(cache.build(build_dir, run, extras=["Toolchain", "1.0"]))
+            self.assertEqual(len(runs), 2)
+            # Toolchain extras are part of the key.
+            self.assertFalse(cache.build(build_dir, run, extras=["Toolchain", "2.0"]))
+
+    def test_build_cache_eviction(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache     = BuildCache(os.path.join(tmpdir, "cache"), max_size=2500)
+            build_dir = os.path.join(tmpdir, "build")
+            os.makedirs(build_dir)
+            def build(verilog):
+                def run():
+                    self.write(os.path.join(build_dir, "top.bit"), "x"*1000)
+                self.write(os.path.join(build_dir, "top.v"), verilog)
+                return cache.build(build_dir, run)
+            build("v0")
+            build("v1")
+            self.assertTrue(build("v0")) # v0 becomes most recently used.
+            build("v2")                  # v1 is evicted.
+            self.assertEqual(len(cache.get_entries()), 2)
+            self.assertTrue(build("v0"))
+            self.assertTrue(build("v2"))
+            self.assertFalse(build("v1"))
+
+    def test_build_cache_inputs(self):
+        class Platform:
+            pass
+        runs = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache     = BuildCache(os.path.join(tmpdir, "cache"))
+            build_dir = os.path.join(tmpdir, "build")
+            include   = os.path.join(tmpdir, "include")
+            os.makedirs(os.path.join(build_dir, "ip"))
+            os.makedirs(os.path.join(include, "sub"))
+            platform = Platform()
+            platform.sources               = [(os.path.join(tmpdir, "core.v"), "verilog", "work")]
+            platform.verilog_include_paths = [include]
+            platform.ips                   = {os.path.join(tmpdir, "pll.xci"): False}
+            platform.edifs                 = {os.path.join(tmpdir, "core.edif")}
+            for filename in [f for f, *_ in platform.sources] + list(platform.ips) + list(platform.edifs):
+                self.write(filename, "0")
+            self.write(os.path.join(include, "sub", "defines.vh"), "0")
+            def build(tcl="tcl"):
+                def run():
+                    runs.append(1)
+                    self.write(os.path.join(build_dir, "top.bit"), "bit")
+                    self.write(os.path.join(build_dir, "ip", "ip.log"), "log")
+                before = snapshot(build_dir)
+                with WriteRecorder() as recorder:
+                    write_to_file(os.path.join(build_dir, "top.v"),         "top")
+                    write_to_file(os.path.join(build_dir, "ip", "ip.tcl"), tcl)
+                return cache.build(build_dir, run,
+                    sources   = get_platform_sources(platform),
+                    extras    = get_platform_extras(platform),
+                    generated = get_generated(build_dir, before, snapshot(build_dir), recorder.stop()))
+            # Leftover of a previous (uncached) build is not part of the key.
+            self.write(os.path.join(build_dir, "leftover.bit"), "old")
+            self.assertFalse(build())
+            self.write(os.path.join(build_dir, "leftover.bit"), "new")
+            self.assertTrue(build())
+            # Outputs in subdirectories are restored.
+            os.remove(os.path.join(build_dir, "ip", "ip.log"))
+            self.assertTrue(build())
+            self.assertEqual(self.read(os.path.join(build_dir, "ip", "ip.log")), "log")
+            # Any change of the sources, includes, IPs (or IP options), EDIFs or generated files in
+            # subdirectories invalidates the cache.
+            for filename in [
+                os.path.join(tmpdir, "core.v"),
+                os.path.join(include, "sub", "defines.vh"),
+                os.path.join(tmpdir, "pll.xci"),
+                os.path.join(tmpdir, "core.edif")]:
+                self.write(filename, "1")
+                self.assertFalse(build())
+                self.assertTrue(build())
+            self.assertFalse(build(tcl="tcl1"))
+            platform.ips[os.path.join(tmpdir, "pll.xci")] = True
+            self.assertFalse(build(tcl="tcl1"))
+            self.assertEqual(len(runs), 7)
+
+    def test_build_cache_unchanged_inputs(self):
+        # Generated files left untouched (unchanged contents) are part of the key.
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache     = BuildCache(os.path.join(tmpdir, "cache"))
+            build_dir = os.path.join(tmpdir, "build")
+            os.makedirs(build_dir)
+            def run():
+                self.write(os.path.join(build_dir, "top.bit"), "bit:" + self.read(os.path.join(build_dir, "top.xdc")))
+            for xdc in ["X", "Y", "X", "X", "Y", "Y"]:
+                before = snapshot(build_dir)
+                with WriteRecorder() as recorder:
+                    write_to_file(os.path.join(build_dir, "top.v"),   "top")
+                    write_to_file(os.path.join(build_dir, "top.xdc"), xdc)
+                cache.build(build_dir, run, generated=get_generated(build_dir, before, snapshot(build_dir), recorder.stop()))
+                self.assertEqual(self.read(os.path.join(build_dir, "top.bit")), "bit:" + xdc)
+            self.assertEqual(len(cache.get_entries()), 2)
+
+    def test_build_cache_clean(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = BuildCache(os.path.join(tmpdir, "cache"))
+            for name, age in [("old.tmp1", 2*3600), ("new.tmp2", 0)]:
+                path = os.path.join(cache.directory, name)
+                os.makedirs(path)
+                os.utime(path, (time.time() - age, time.time() - age))
+            cache.clean()
+            self.assertEqual(os.listdir(cache.directory), ["new.tmp2"])
@@ -0,0 +1,288 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import tempfile
+import unittest
+
+from litex.build.cache import BuildCache
+from litex.build.report import *
+from litex.build.nextpnr_wrapper import NextPNRWrapper
+
+from litex.soc.integration.builder import Builder
+
+from test.test_build_variants import ModelToolchain, model_target
+
+# Report Fixtures ----------------------------------------------------------------------------------
+
+vivado_timing_rpt = """\
+------------------------------------------------------------------------------------------------
+| Design Timing Summary
+| ---------------------
+------------------------------------------------------------------------------------------------
+
+    WNS(ns)      TNS(ns)  TNS Failing Endpoints  TNS Total Endpoints      WHS(ns)      THS(ns)
+    -------      -------  ---------------------  -------------------      -------      -------
+     -0.250       -1.500                     12                 5678        0.045        0.000
+
+
+Timing constraints are not met.
+
+
+------------------------------------------------------------------------------------------------
+| Clock Summary
+| -------------
+------------------------------------------------------------------------------------------------
+
+Clock             Waveform(ns)       Period(ns)      Frequency(MHz)
+-----             ------------       ----------      --------------
+clk100            {0.000 5.000}      10.000          100.000
+  mmcm_fb         {0.000 5.000}      10.000          100.000
+  sys_clk         {0.000 4.000}      8.000           125.000
+
+
+------------------------------------------------------------------------------------------------
+| Intra Clock Table
+| -----------------
+------------------------------------------------------------------------------------------------
+
+Clock                 WNS(ns)      TNS(ns)  TNS Failing Endpoints  TNS Total Endpoints      WHS(ns)
+-----                 -------      -------  ---------------------  -------------------      -------
+clk100
+  mmcm_fb
+  sys_clk              -0.250       -1.500                     12                 5678        0.045
+
+
+------------------------------------------------------------------------------------------------
+| Inter Clock Table
+| -----------------
+------------------------------------------------------------------------------------------------
+"""
+
+vivado_utilization_rpt = """\
+1. Slice Logic
+--------------
+
++----------------------------+-------+-------+------------+-----------+-------+
+|          Site Type         |  Used | Fixed | Prohibited | Available | Util% |
++----------------------------+-------+-------+------------+-----------+-------+
+| Slice LUTs                 |  4123 |     0 |          0 |     63400 |  6.50 |
+|   LUT as Logic             |  3900 |     0 |          0 |     63400 |  6.15 |
+| Slice Registers            |  5012 |     0 |          0 |    126800 |  3.95 |
++----------------------------+-------+-------+------------+-----------+-------+
+
+3. Memory
+---------
+
++-------------------+------+-------+------------+-----------+-------+
+|     Site Type     | Used | Fixed | Prohibited | Available | Util% |
++-------------------+------+-------+------------+-----------+-------+
+| Block RAM Tile    | 10.5 |     0 |          0 |       135 |  7.78 |
++-------------------+------+-------+------------+-----------+-------+
+
+4. DSP
+------
+
++-----------+------+-------+------------+-----------+-------+
+| Site Type | Used | Fixed | Prohibited | Available | Util% |
++-----------+------+-------+------------+-----------+-------+
+| DSPs      |    4 |     0 |          0 |       240 |  1.67 |
++-----------+------+-------+------------+-----------+-------+
+"""
+
+vivado_log = """\
+synth_design: Time (s): cpu = 00:01:02 ; elapsed = 00:00:55 . Memory (MB): peak = 2345.6 ; gain = 1234.5
+Phase 1.1 Placer Initialization | Checksum: 1234abcd Time (s): cpu = 00:00:01 ; elapsed = 00:00:01 .
+place_design: Time (s): cpu = 00:00:40 ; elapsed = 00:00:20 . Memory (MB): peak = 2500.0 ; gain = 100.0
+route_design: Time (s): cpu = 00:02:00 ; elapsed = 00:01:10 . Memory (MB): peak = 2600.0 ; gain = 100.0
+"""
+
+nextpnr_report = {
+    "utilization": {
+        "TRELLIS_COMB" : {"used": 3456, "available": 24288},
+        "TRELLIS_FF"   : {"used": 2345, "available": 24288},
+        "DP16KD"       : {"used":   10, "available":    56},
+        "MULT18X18D"   : {"used":    0, "available":    28},
+    },
+    "fmax": {
+        "$glbnet$sys_clk" : {"achieved": 62.5,  "constraint": 50.0},
+        "$glbnet$clk48"   : {"achieved": 150.0, "constraint": 48.0},
+    },
+}
+
+diamond_mrp = """\
+Design Summary
+--------------
+
+   Number of registers:   2345 out of 24879 (9%)
+      PFU registers:         2340 out of 24288 (10%)
+   Number of SLICEs:      1903 out of 12144 (16%)
+   Number of LUT4s:        3456 out of 24288 (14%)
+   Number of block RAMs:  10 out of 56 (18%)
+"""
+
+diamond_twr = """\
+Report Summary
+--------------
+----------------------------------------------------------------------------
+Preference                              |   Constraint|       Actual|Levels
+----------------------------------------------------------------------------
+                                        |             |             |
+FREQUENCY NET "sys_clk" 75.000000 MHz ; |   75.000 MHz|   82.345 MHz|   5
+                                        |             |             |
+----------------------------------------------------------------------------
+"""
+
+radiant_twr = """\
+3.1  Clock Summary
+------------------
+
+From sys_clk                           |             Target |          83.333 MHz
+                                       | Actual (all paths) |          96.246 MHz
+"""
+
+efinity_timing_rpt = """\
+Maximum possible analyzed clocks frequency
+Clock Name      Period (ns)   Frequency (MHz)   Edge
+sys_clk             8.123        123.107     (R-R)
+
+Geomean max period: 8.123
+
+Setup (Max) Clock Relationship
+Launch Clock    Capture Clock   Constraint (ns)     Slack (ns)    Edge
+sys_clk            sys_clk          10.000            1.877     (R-R)
+"""
+
+efinity_place_rpt = """\
+---------- Resource Summary (begin) ----------
+Inputs:     	12 / 1478 (0.81%)
+Logic Elements:	4123 / 19728 (20.90%)
+	LE: LUTs/Adders:	3567 / 19728 (18.08%)
+	LE: Registers:	2345 / 15192 (15.44%)
+Memory Blocks:	10 / 204 (4.90%)
+Multipliers:	0 / 36 (0.00%)
+---------- Resource Summary (end) ----------
+"""
+
+# Test Build Report --------------------------------------------------------------------------------
+
+class TestBuildReport(unittest.TestCase):
+    def parse(self, parsers):
+        report = new_report(toolchain="test", build_name="top")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for parser, contents in parsers:
+                filename = os.path.join(tmpdir, "report")
+                with open(filename, "w") as f:
+                    f.write(contents if isinstance(contents, str) else json.dumps(contents))
+                parser(report, filename)
+            # Missing reports are ignored.
+            parser(report, os.path.join(tmpdir, "missing"))
+        # Report is serializable to JSON.
+        return json.loads(json.dumps(report))
+
+    def test_vivado(self):
+        report = self.parse([
+            (parse_vivado_timing,      vivado_timing_rpt),
+            (parse_vivado_utilization, vivado_utilization_rpt),
+            (parse_vivado_log,         vivado_log),
+        ])
+        self.assertEqual(report["timing"]["wns"], -0.25)
+        self.assertEqual(report["timing"]["tns"], -1.5)
+        self.assertEqual(report["timing"]["clocks"], {"sys_clk": {"constraint": 125.0, "fmax": 121.212}})
+        self.assertEqual(report["utilization"], {
+            "lut"  : {"used": 4123, "available": 63400},
+            "ff"   : {"used": 5012, "available": 126800},
+            "bram" : {"used": 10.5, "available": 135},
+            "dsp"  : {"used": 4,    "available": 240},
+        })
+        self.assertEqual(report["runtime"], {"synth_design": 55, "place_design": 20, "route_design": 70})
+
+    def test_nextpnr(self):
+        report = self.parse([(parse_nextpnr_report, nextpnr_report)])
+        self.assertEqual(report["timing"]["clocks"]["sys_clk"], {"constraint": 50.0, "fmax": 62.5})
+        self.assertEqual(report["timing"]["wns"], 4.0)
+        self.assertEqual(report["utilization"]["lut"],  {"used": 3456, "available": 24288})
+        self.assertEqual(report["utilization"]["bram"], {"used": 10,   "available": 56})
+        self.assertEqual(report["utilization"]["dsp"],  {"used": 0,    "available": 28})
+
+    def test_diamond(self):
+        report = self.parse([(parse_lattice_mrp, diamond_mrp), (parse_diamond_twr, diamond_twr)])
+        self.assertEqual(report["timing"]["clocks"], {"sys_clk": {"constraint": 75.0, "fmax": 82.345}})
+        self.assertEqual(report["utilization"]["lut"],  {"used": 3456, "available": 24288})
+        self.assertEqual(report["utilization"]["ff"],   {"used": 2345, "available": 24879})
+        self.assertEqual(report["utilization"]["bram"], {"used": 10,   "available": 56})
+
+    def test_radiant(self):
+        report = self.parse([(parse_radiant_twr, radiant_twr)])
+        self.assertEqual(report["timing"]["clocks"], {"sys_clk": {"constraint": 83.333, "fmax": 96.246}})
+        self.assertGreater(report["timing"]["wns"], 0)
+
+    def test_efinity(self):
+        report = self.parse([(parse_efinity_timing, efinity_timing_rpt), (parse_efinity_place, efinity_place_rpt)])
+        self.assertEqual(report["timing"]["clocks"], {"sys_clk": {"constraint": 100.0, "fmax": 123.107}})
+        self.assertEqual(report["timing"]["wns"], 1.877)
+        self.assertEqual(report["utilization"], {
+            "lut"  : {"used": 3567, "available": 19728},
+            "ff"   : {"used": 2345, "available": 15192},
+            "bram" : {"used": 10,   "available": 204},
+            "dsp"  : {"used": 0,    "available": 36},
+        })
+
+    def test_builder_report(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache   = BuildCache(os.path.join(tmpdir, "cache"))
+            builder = Builder(model_target(),
+                output_dir       = os.path.join(tmpdir, "build"),
+                compile_software = False,
+                build_cache      = cache.directory,
+            )
+            builder.build()
+            self.assertEqual(builder.report["toolchain"], "ModelToolchain")
+            self.assertEqual(builder.report["cached"], False)
+            self.assertGreater(builder.report["runtime"]["total"], 0)
+            filename = os.path.join(builder.gateware_dir, "model" + report_suffix)
+            with open(filename) as f:
+                self.assertEqual(json.load(f), builder.report)
+            # Report is not part of the Build Cache's inputs.
+            inputs = [path for name, path in cache.get_inputs(builder.gateware_dir)]
+            self.assertNotIn(filename, inputs)
+            self.assertIn(os.path.join(builder.gateware_dir, "model.v"), inputs)
+
+    def test_builder_report_error(self):
+        class FailingToolchain(ModelToolchain):
+            def get_report(self):
+                raise ValueError("Invalid report")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            soc = model_target()
+            soc.platform.toolchain = FailingToolchain()
+            builder = Builder(soc, output_dir=tmpdir, compile_software=False)
+            with self.assertLogs("GenericToolchain", level="WARNING"):
+                builder.build()
+            # Build still succeeds, with an empty report.
+            self.assertEqual(builder.report["toolchain"], "FailingToolchain")
+            self.assertEqual(builder.report["utilization"], {})
+
+    def test_nextpnr_report_option(self):
+        def get_call(family, report):
+            return NextPNRWrapper(family=family, build_name="top", in_format="json", out_format="config",
+                constr_format="lpf", report=report).get_call()
+        self.assertIn("--report top_nextpnr.json", get_call("ecp5", report=True))
+        self.assertNotIn("--report", get_call("ecp5", report=False))
+        # Support is probed from nextpnr-xxx --help when not specified.
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, help in [("nextpnr-litexnew", "--report arg"), ("nextpnr-litexold", "--seed arg")]:
+                filename = os.path.join(tmpdir, name)
+                with open(filename, "w") as f:
+                    f.write(f"#!/bin/sh\necho \"{help}\"\n")
+                os.chmod(filename, 0o755)
+            path = os.environ["PATH"]
+            os.environ["PATH"] = tmpdir + os.pathsep + path
+            try:
+                self.assertIn("--report",    get_call("litexnew", report=None))
+                self.assertNotIn("--report", get_call("litexold", report=None))
+            finally:
+                os.environ["PATH"] = path
+        self.assertNotIn("--report", get_call("litexmissing", report=None))
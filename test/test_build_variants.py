@@ -0,0 +1,95 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import time
+import tempfile
+import unittest
+
+from migen import *
+
+from litex.build.generic_platform import GenericPlatform, Pins
+from litex.build.generic_toolchain import GenericToolchain
+from litex.build.orchestrator import get_variants, build_variants, get_summary
+
+from litex.soc.integration.soc_core import SoCMini
+
+# Toolchain/Platform/Target Models -----------------------------------------------------------------
+
+class ModelToolchain(GenericToolchain):
+    def build_io_constraints(self):
+        return ("", "")
+
+    def build_script(self):
+        return ""
+
+    def run_script(self, script):
+        # Record run (start/end times) and generate bitstream.
+        start = time.time()
+        time.sleep(0.2)
+        with open(self._build_name + ".bit", "w") as f:
+            f.write(f"{start} {time.time()}")
+
+class ModelPlatform(GenericPlatform):
+    def __init__(self):
+        GenericPlatform.__init__(self, "model", [("clk", 0, Pins(1))], name="model")
+        self.toolchain = ModelToolchain()
+
+    def build(self, *args, **kwargs):
+        return self.toolchain.build(self, *args, **kwargs)
+
+def model_target(sys_clk_freq=100e6, with_timer=False):
+    if sys_clk_freq > 200e6:
+        raise ValueError("sys_clk_freq too high.")
+    soc = SoCMini(ModelPlatform(), clk_freq=sys_clk_freq, with_timer=with_timer)
+    soc.cd_sys = ClockDomain()
+    soc.comb += soc.cd_sys.clk.eq(soc.platform.request("clk"))
+    return soc
+
+# Test Build Variants ------------------------------------------------------------------------------
+
+class TestBuildVariants(unittest.TestCase):
+    def test_get_variants(self):
+        variants = get_variants({
+            "target"  : "test.test_build_variants:model_target",
+            "builder" : {"compile_software": False},
+            "matrix"  : {"sys_clk_freq": [50e6, 100e6], "toolchain.seed": [1, 2]},
+            "variants": [{"name": "timer", "with_timer": True, "threads": 2}],
+        })
+        self.assertEqual([v.name for v in variants], [
+            "sys_clk_freq-50000000.0_seed-1",
+            "sys_clk_freq-50000000.0_seed-2",
+            "sys_clk_freq-100000000.0_seed-1",
+            "sys_clk_freq-100000000.0_seed-2",
+            "timer",
+        ])
+        self.assertEqual(variants[1].toolchain_kwargs, {"seed": 2})
+        self.assertEqual(variants[4].soc_kwargs, {"with_timer": True})
+        self.assertEqual(variants[4].threads, 2)
+
+    def test_build_variants(self):
+        variants = get_variants({
+            "target"  : "test.test_build_variants:model_target",
+            "builder" : {"compile_software": False},
+            "threads" : 2,
+            "matrix"  : {"sys_clk_freq": [50e6, 100e6, 150e6, 250e6], "with_timer": [False, True]},
+        })
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results = build_variants(variants, output_dir=tmpdir, jobs=4, cpus=4)
+            self.assertEqual([r["name"] for r in results], [v.name for v in variants])
+            runs = []
+            for r in results:
+                if "250000000" in r["name"]:
+                    self.assertEqual(r["status"], "failed")
+                    self.assertIn("sys_clk_freq too high", r["error"])
+                    continue
+                self.assertEqual(r["status"], "ok")
+                with open(os.path.join(r["output_dir"], "gateware", "model.bit")) as f:
+                    runs.append([float(t) for t in f.read().split()])
+            self.assertEqual(len(runs), 6)
+            # Budget of 4 CPUs with 2 threads per run: at most 2 concurrent toolchain runs.
+            for start, end in runs:
+                self.assertLessEqual(sum(s <= start < e for s, e in runs), 2)
+            self.assertIn("sys_clk_freq too high", get_summary(results))
@@ -0,0 +1,117 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import glob
+import time
+import tempfile
+import threading
+import unittest
+import subprocess
+
+from migen import *
+
+from litex.build.generic_platform import GenericPlatform, Pins
+from litex.build.generic_toolchain import GenericToolchain
+
+from litex.soc.integration.soc_core import SoCMini
+from litex.soc.integration.builder import Builder, soc_software_packages
+
+# Toolchain/Platform Models ------------------------------------------------------------------------
+
+class ModelToolchain(GenericToolchain):
+    def build_io_constraints(self):
+        return ("", "")
+
+    def build_script(self):
+        return ""
+
+class ModelPlatform(GenericPlatform):
+    def __init__(self):
+        GenericPlatform.__init__(self, "model", [("clk", 0, Pins(1))], name="model")
+        self.toolchain = ModelToolchain()
+
+    def build(self, *args, **kwargs):
+        return self.toolchain.build(self, *args, **kwargs)
+
+# Test Builder -------------------------------------------------------------------------------------
+
+class TestBuilder(unittest.TestCase):
+    def get_builder(self, output_dir):
+        soc = SoCMini(ModelPlatform(), clk_freq=100e6)
+        builder = Builder(soc, output_dir=output_dir)
+        builder.add_software_package("bios")
+        builder.add_software_package("user")
+        return builder
+
+    def test_software_packages_dependencies(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dependencies = self.get_builder(tmpdir)._get_software_packages_dependencies()
+        self.assertEqual(list(dependencies), soc_software_packages + ["bios", "user"])
+        self.assertEqual(dependencies["libc"],           [])
+        self.assertEqual(dependencies["libcompiler_rt"], ["libc"])
+        self.assertEqual(dependencies["libbase"],        ["libc"])
+        self.assertEqual(dependencies["liblitedram"],    ["libc", "libbase"])
+        self.assertEqual(dependencies["bios"],           soc_software_packages)
+        self.assertEqual(dependencies["user"],           soc_software_packages + ["bios"])
+
+    def compile_software(self, compile_bios):
+        # Record make start/end of each package.
+        events = []
+        lock   = threading.Lock()
+        def check_call(cmd):
+            name = os.path.basename(cmd[2])
+            with lock:
+                events.append(("start", name))
+            time.sleep(0.01)
+            with lock:
+                events.append(("end", name))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            builder = self.get_builder(tmpdir)
+            dependencies = builder._get_software_packages_dependencies()
+            _check_call = subprocess.check_call
+            subprocess.check_call = check_call
+            try:
+                builder._generate_rom_software(compile_bios=compile_bios)
+            finally:
+                subprocess.check_call = _check_call
+        # Packages are only compiled once their dependencies are compiled.
+        for name in dependencies:
+            if ("start", name) not in events:
+                continue
+            start = events.index(("start", name))
+            for dependency in dependencies[name]:
+                if ("start", dependency) in events:
+                    self.assertLess(events.index(("end", dependency)), start)
+        return [name for event, name in events if event == "start"]
+
+    def test_compile_software(self):
+        self.assertEqual(sorted(self.compile_software(compile_bios=True)),
+            sorted(soc_software_packages + ["bios", "user"]))
+
+    def test_compile_software_no_bios(self):
+        self.assertEqual(sorted(self.compile_software(compile_bios=False)),
+            sorted(soc_software_packages + ["user"]))
+
+    def test_rom_deferred_init(self):
+        soc = SoCMini(ModelPlatform(), clk_freq=100e6)
+        soc.cd_sys = ClockDomain()
+        soc.comb += soc.cd_sys.clk.eq(soc.platform.request("clk"))
+        soc.add_rom("rom", 0x10000000, 0x1000)
+        contents = [0x12345678, 0x9abcdef0, 0x0badcafe]
+        # ROM contents/depth are only resolved at the emission of the Memory in the Verilog.
+        soc.rom.mem.deferred_init = lambda: soc.init_rom("rom", contents=contents)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            soc.build(build_dir=tmpdir, build_name="top", run=False)
+            with open(os.path.join(tmpdir, "top.v")) as f:
+                verilog = f.read()
+            init_files = glob.glob(os.path.join(tmpdir, "*rom*.init"))
+            self.assertEqual(len(init_files), 1)
+            with open(init_files[0]) as f:
+                init = [int(line, 16) for line in f.read().split()]
+        self.assertIsNone(soc.rom.mem.deferred_init)
+        self.assertEqual(soc.rom.mem.depth, len(contents))
+        self.assertIn(f"{len(contents)}-words x 32-bit", verilog)
+        self.assertEqual(init, contents)
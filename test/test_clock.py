@@ -4,11 +4,43 @@
 # Copyright (c) 2020 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import os
+import time
+import random
 import unittest
 
 from migen import *
 
 from litex.soc.cores.clock import *
+from litex.soc.cores.clock.common import clkdiv_range, clkdiv_search, clkdiv_search_nearest
+
+# Xilinx Reference Solver (exhaustive search) ------------------------------------------------------
+
+def xilinx_compute_config_reference(pll):
+    for divclk_divide in range(*pll.divclk_divide_range):
+        for clkfbout_mult in reversed(range(*pll.clkfbout_mult_frange)):
+            vco_freq = pll.clkin_freq*clkfbout_mult/divclk_divide
+            (vco_freq_min, vco_freq_max) = pll.vco_freq_range
+            if not (vco_freq >= vco_freq_min*(1 + pll.vco_margin) and
+                    vco_freq <= vco_freq_max*(1 - pll.vco_margin)):
+                continue
+            config = {"divclk_divide": divclk_divide}
+            for n, (clk, f, p, m) in sorted(pll.clkouts.items()):
+                d_ranges = [pll.clkout_divide_range]
+                if getattr(pll, "clkout{}_divide_range".format(n), None) is not None:
+                    d_ranges += [getattr(pll, "clkout{}_divide_range".format(n))]
+                # First valid divider of the first range with a valid divider.
+                valid = [d for d_range in d_ranges for d in clkdiv_range(*d_range) if abs(vco_freq/d - f) <= f*m]
+                if not valid:
+                    break
+                config["clkout{}_freq".format(n)]   = vco_freq/valid[0]
+                config["clkout{}_divide".format(n)] = valid[0]
+                config["clkout{}_phase".format(n)]  = p
+            else:
+                config["vco"]           = vco_freq
+                config["clkfbout_mult"] = clkfbout_mult
+                return config
+    raise ValueError("No PLL config found")
 
 
 class TestClock(unittest.TestCase):
@@ -42,6 +74,33 @@ class TestClock(unittest.TestCase):
             mmcm.create_clkout(ClockDomain("clkout{}".format(i)), 200e6)
         mmcm.compute_config()
 
+    def test_s7_mmcm_fractional_divide(self):
+        # Fractional Divide of CLKOUT0 is only used when no Integer Divide is valid.
+        mmcm = S7MMCM()
+        mmcm.register_clkin(Signal(), 27e6)
+        mmcm.create_clkout(ClockDomain("sys"), 50e6)
+        config = mmcm.compute_config()
+        self.assertEqual(config["clkout0_divide"], 24)
+        self.assertEqual(config["clkout0_freq"],   49.5e6)
+
+    def test_xilinx_compute_config(self):
+        # Solver is equivalent to the exhaustive search.
+        random.seed(0)
+        for i in range(50):
+            pll = random.choice([S6PLL, S7PLL, S7MMCM, USMMCM, USPMMCM])()
+            pll.register_clkin(Signal(), random.choice([12e6, 25e6, 27e6, 50e6, 100e6, random.uniform(10e6, 200e6)]))
+            for n in range(random.randint(1, 3)):
+                freq   = random.choice([24e6, 48e6, 50e6, 74.25e6, 100e6, 125e6, 148.5e6, 200e6, random.uniform(10e6, 400e6)])
+                margin = random.choice([1e-2, 1e-3, 5e-2])
+                pll.create_clkout(ClockDomain(f"clkout{n}"), freq, margin=margin)
+            try:
+                reference = xilinx_compute_config_reference(pll)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    pll.compute_config()
+                continue
+            self.assertEqual(pll.compute_config(), reference)
+
     # Xilinx / Ultrascale
     def test_us_pll(self):
         pll = USPLL()
@@ -141,3 +200,48 @@ class TestClock(unittest.TestCase):
         for i in range(pll.nclkouts_max):
             pll.create_clkout(ClockDomain("clkout{}".format(i)), 200e6)
         pll.compute_config()
+
+    # Common / Dividers search
+    def test_clkdiv_search(self):
+        random.seed(0)
+        for i in range(2000):
+            start, stop, step = random.choice([(1, 128+1, 1), (2, 128+1, 1), (2, 128, 1/8), (1, 512+1, 1), (1, 3, 1)])
+            dividers = list(clkdiv_range(start, stop, step))
+            vco_freq = random.uniform(400e6, 1600e6)
+            freq     = random.choice([random.uniform(1e6, 800e6), vco_freq/random.choice(dividers)])
+            margin   = random.choice([0, 1e-4, 1e-3, 1e-2, 1e-1])
+            # Reference: Exhaustive search.
+            valid   = [d for d in dividers if abs(vco_freq/d - freq) <= freq*margin]
+            first   = valid[0] if valid else None
+            nearest = min(valid, key=lambda d: abs(vco_freq/d - freq)) if valid else None
+            self.assertEqual(clkdiv_search(vco_freq, freq, margin, start, stop, step), first)
+            self.assertEqual(clkdiv_search_nearest(vco_freq, freq, margin, start, stop, step), nearest)
+
+    # Benchmark (run with LITEX_BENCH=1 python -m unittest test.test_clock -k benchmark)
+    @unittest.skipUnless(os.environ.get("LITEX_BENCH", "") == "1", "Benchmark (set LITEX_BENCH=1 to run).")
+    def test_compute_config_benchmark(self):
+        # Solver vs exhaustive search (same configs, same results).
+        random.seed(0)
+        plls = []
+        for i in range(100):
+            pll = random.choice([S6PLL, S7PLL, S7MMCM, USMMCM, USPMMCM])()
+            pll.register_clkin(Signal(), random.choice([12e6, 25e6, 27e6, 50e6, 100e6, random.uniform(10e6, 200e6)]))
+            for n in range(random.randint(1, 3)):
+                freq   = random.choice([24e6, 48e6, 50e6, 74.25e6, 100e6, 125e6, 148.5e6, 200e6, random.uniform(10e6, 400e6)])
+                margin = random.choice([1e-2, 1e-3, 5e-2])
+                pll.create_clkout(ClockDomain(f"clkout{n}"), freq, margin=margin)
+            plls.append(pll)
+        def run(compute_config):
+            results = []
+            start   = time.perf_counter()
+            for pll in plls:
+                try:
+                    results.append(compute_config(pll))
+                except ValueError:
+                    results.append(None)
+            return results, time.perf_counter() - start
+        reference, reference_time = run(xilinx_compute_config_reference)
+        results,   solver_time    = run(lambda pll: pll.compute_config())
+        self.assertEqual(results, reference)
+        print(f"\ncompute_config ({len(plls)} configs): exhaustive {1e3*reference_time:.1f}ms, "
+              f"solver {1e3*solver_time:.1f}ms ({reference_time/solver_time:.1f}x).")
@@ -0,0 +1,138 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from litex.tools.remote.etherbone import *
+
+# Test Etherbone Codec -----------------------------------------------------------------------------
+
+class TestEtherbone(unittest.TestCase):
+    def get_packet(self, writes=None, reads=None, wff=0, rff=0):
+        record = EtherboneRecord()
+        if writes is not None:
+            record.writes = EtherboneWrites(base_addr=0x1000, datas=writes)
+        if reads is not None:
+            record.reads = EtherboneReads(base_ret_addr=0x2000, addrs=reads)
+        record.wff = wff
+        record.rff = rff
+        packet = EtherbonePacket()
+        packet.records = [record]
+        packet.encode()
+        return packet
+
+    def decode(self, data):
+        packet = EtherbonePacket(data)
+        packet.decode()
+        return packet
+
+    def test_encoding(self):
+        packet = self.get_packet(writes=[0x01234567, 0x89abcdef], reads=[0x10], wff=1)
+        self.assertEqual(bytes(packet.bytes), bytes.fromhex(
+            "4e6f1044" "00000000" # Packet Header.
+            "400f0201"            # Record Header: WFF, Byte Enable, WCount, RCount.
+            "00001000"            # Base Addr.
+            "01234567" "89abcdef" # Writes.
+            "00002000"            # Base Ret Addr.
+            "00000010"            # Reads.
+        ))
+
+    def test_round_trip(self):
+        for writes, reads, wff, rff in [
+            (list(range(255)), None,                    0, 0),
+            (None,             list(range(0, 1020, 4)), 0, 1),
+            ([0xffffffff, 0],  [0x0, 0xfffffffc],       1, 0),
+            ]:
+            packet = self.decode(self.get_packet(writes, reads, wff, rff).bytes)
+            self.assertEqual(packet.magic,   etherbone_magic)
+            self.assertEqual(packet.version, etherbone_version)
+            record = packet.records[0]
+            self.assertEqual((record.wff, record.rff), (wff, rff))
+            if writes is None:
+                self.assertIsNone(record.writes)
+            else:
+                self.assertEqual(record.writes.base_addr, 0x1000)
+                self.assertEqual(record.writes.get_datas(), writes)
+            if reads is None:
+                self.assertIsNone(record.reads)
+            else:
+                self.assertEqual(record.reads.base_ret_addr, 0x2000)
+                self.assertEqual(record.reads.get_addrs(), reads)
+
+    def test_records(self):
+        records = [encode_record(base_addr=4*i, writes=[i]*(i + 1)) for i in range(4)]
+        packet  = self.decode(encode_packet(records))
+        self.assertEqual(len(packet.records), 4)
+        for i, record in enumerate(packet.records):
+            self.assertEqual(record.writes.base_addr, 4*i)
+            self.assertEqual(record.writes.get_datas(), [i]*(i + 1))
+
+    def test_probe(self):
+        packet = EtherbonePacket()
+        packet.pf = 1
+        packet.encode()
+        packet = self.decode(packet.bytes)
+        self.assertEqual((packet.pf, packet.pr, packet.records), (1, 0, []))
+
+    def test_words(self):
+        words = [0x01234567, 0x89abcdef, 0]
+        self.assertEqual(words_to_bytes(words), bytes.fromhex("0123456789abcdef00000000"))
+        self.assertEqual(bytes_to_words(words_to_bytes(words)).tolist(), words)
+
+    def test_max_burst(self):
+        with self.assertRaises(ValueError):
+            EtherboneWrites(datas=range(256))
+        with self.assertRaises(ValueError):
+            EtherboneReads(addrs=range(256))
+
+# Test Etherbone Reader ----------------------------------------------------------------------------
+
+class ChunkedSocket:
+    # Socket returning the data in chunks of the given sizes (partial TCP reads).
+    def __init__(self, data, chunks):
+        self.data   = bytes(data)
+        self.chunks = list(chunks)
+
+    def recv_into(self, view):
+        size = min(self.chunks.pop(0) if self.chunks else len(self.data), len(view), len(self.data))
+        view[:size] = self.data[:size]
+        self.data   = self.data[size:]
+        return size
+
+class TestEtherboneReader(unittest.TestCase):
+    def get_packets(self, n):
+        packets = []
+        for i in range(n):
+            packets.append(bytes(encode_packet([encode_record(base_addr=4*i, writes=list(range(i + 1)), reads=[i])])))
+        return packets
+
+    def check_reader(self, packets, chunks, size=65536):
+        reader = EtherboneReader(ChunkedSocket(b"".join(packets), chunks), size=size)
+        for packet in packets:
+            self.assertEqual(bytes(reader.receive_packet()), packet)
+        # Connection closed.
+        self.assertEqual(reader.receive_packet(), 0)
+
+    def test_split_packets(self):
+        packets = self.get_packets(8)
+        # Packets split in small chunks (headers/payloads across recv boundaries).
+        for chunk in [1, 3, 7, 13]:
+            self.check_reader(packets, [chunk]*1000)
+        # Several packets received in a single recv.
+        self.check_reader(packets, [len(b"".join(packets))])
+
+    def test_buffer_wrap(self):
+        # Buffer smaller than the stream: Remaining data is moved to the start of the buffer.
+        packets = self.get_packets(8)
+        self.check_reader(packets, [5, 11]*1000, size=64)
+
+    def test_pending(self):
+        packets = self.get_packets(2)
+        reader  = EtherboneReader(ChunkedSocket(b"".join(packets), [len(packets[0]) + 4]))
+        self.assertFalse(reader.pending())
+        self.assertEqual(bytes(reader.receive_packet()), packets[0])
+        # Only the start of the second packet is buffered.
+        self.assertFalse(reader.pending())
+        self.assertEqual(bytes(reader.receive_packet()), packets[1])
@@ -0,0 +1,74 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import tempfile
+import unittest
+
+from litex.build.tools import write_to_file
+from litex.soc.integration import export
+from litex.soc.integration.builder import Builder
+
+from test.test_build_variants import model_target
+
+# Test Export --------------------------------------------------------------------------------------
+
+class TestExport(unittest.TestCase):
+    def get_soc(self):
+        soc = model_target(with_timer=True)
+        soc.finalize()
+        return soc
+
+    def test_csr_map(self):
+        soc     = self.get_soc()
+        csr_map = export.get_csr_map(soc.csr_regions, soc.constants, soc.mem_regions)
+        d       = json.loads(export.get_csr_json(csr_map=csr_map))
+        self.assertEqual(d["csr_bases"]["timer0"], soc.csr_regions["timer0"].origin)
+        self.assertEqual(d["csr_registers"]["timer0_load"]["addr"], soc.csr_regions["timer0"].origin)
+        self.assertEqual(d["csr_registers"]["timer0_load"]["type"], "rw")
+        self.assertIn("timer0_value", d["csr_registers"])
+        # Exports from the shared CSR Map and from the SoC are identical.
+        self.assertEqual(
+            export.get_csr_json(soc.csr_regions, soc.constants, soc.mem_regions),
+            export.get_csr_json(csr_map=csr_map))
+        csv = export.get_csr_csv(csr_map=csr_map)
+        self.assertIn("csr_register,timer0_load,0x{:08x},1,rw".format(soc.csr_regions["timer0"].origin), csv)
+        header = export.get_csr_header(soc.csr_regions, soc.constants, csr_map=csr_map)
+        self.assertIn("#define CSR_TIMER0_LOAD_ADDR", header)
+        self.assertIn("static inline void timer0_load_write(uint32_t v)", header)
+
+    def test_write_to_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "csr.h")
+            write_to_file(filename, "// Generated on 2022-01-01 00:00:00\n#define A 0\n")
+            os.utime(filename, (0, 0))
+            # Only generation date changed: File is not rewritten.
+            write_to_file(filename, "// Generated on 2022-01-02 00:00:00\n#define A 0\n")
+            self.assertEqual(os.path.getmtime(filename), 0)
+            # Contents changed: File is rewritten.
+            write_to_file(filename, "// Generated on 2022-01-02 00:00:00\n#define A 1\n")
+            self.assertNotEqual(os.path.getmtime(filename), 0)
+            with open(filename) as f:
+                self.assertIn("#define A 1", f.read())
+
+    def test_builder_unchanged_exports(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mtimes = []
+            for i in range(2):
+                builder = Builder(model_target(with_timer=True),
+                    output_dir       = tmpdir,
+                    compile_software = False,
+                    compile_gateware = False,
+                    csr_json         = os.path.join(tmpdir, "csr.json"),
+                    csr_csv          = os.path.join(tmpdir, "csr.csv"),
+                )
+                builder.build()
+                files = [os.path.join(builder.generated_dir, "csr.h"), builder.csr_json, builder.csr_csv]
+                if i == 0:
+                    for f in files:
+                        os.utime(f, (0, 0))
+            for f in files:
+                self.assertEqual(os.path.getmtime(f), 0)
@@ -0,0 +1,358 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import tty
+import zlib
+import time
+import random
+import select
+import socket
+import tempfile
+import threading
+import unittest
+
+import serial
+
+from litex.tools.litex_term import LiteXTerm, JTAGUART, SFLUploader, SFLImageCache, sfl_upload_concurrent, crc16
+
+# BIOS SFL Loader Model ----------------------------------------------------------------------------
+
+def lz4_decompress(src, length):
+    dst = bytearray()
+    i   = 0
+    def read_length(n):
+        nonlocal i
+        if n == 15:
+            while True:
+                b  = src[i]
+                i += 1
+                n += b
+                if b != 255:
+                    break
+        return n
+    while i < len(src):
+        token = src[i]
+        i    += 1
+        n     = read_length(token >> 4)
+        dst  += src[i:i+n]
+        i    += n
+        if i >= len(src):
+            break
+        offset = int.from_bytes(src[i:i+2], "little")
+        i     += 2
+        assert 0 < offset <= len(dst)
+        for _ in range(read_length(token & 0xf) + 4):
+            dst.append(dst[-offset])
+    assert len(dst) == length
+    return bytes(dst)
+
+class SFLModel:
+    """Model of the BIOS SFL loader (boot.c serialboot) served on the master side of a pty pair."""
+    def __init__(self, extensions=True, error_rate=0.0, mem=None, banner=None):
+        self.extensions = extensions
+        self.banner     = banner
+        self.connected  = threading.Event()
+        self.error_rate = error_rate
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.name   = os.ttyname(slave)
+        self.mem    = bytearray(0x100000) if mem is None else mem
+        self.frames = {}
+        self.errors = 0
+        self.jump   = None
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        buf = bytearray()
+        if self.banner is not None:
+            # Send banner and serial boot request (in small chunks) and wait for the ack.
+            self.connected.wait()
+            request = self.banner + b"sL5DdSMmkekro\n"
+            for i in range(0, len(request), 5):
+                os.write(self.master, request[i:i+5])
+            while not buf.endswith(b"z6IHG7cYDID6o\n"):
+                buf += os.read(self.master, 1)
+            buf.clear()
+        while self.jump is None:
+            if select.select([self.master], [], [], 1/16)[0]:
+                datas = os.read(self.master, 65536)
+                if random.random() < self.error_rate:
+                    # Emulate RX FIFO overflow: drop a byte.
+                    n     = random.randrange(len(datas))
+                    datas = datas[:n] + datas[n+1:]
+                buf += datas
+            elif buf:
+                # Frame timeout.
+                buf.clear()
+                self.errors += 1
+                os.write(self.master, b"E")
+                continue
+            replies = bytearray()
+            while len(buf) >= 4 and len(buf) >= 4 + buf[0]:
+                crc     = int.from_bytes(buf[1:3], "big")
+                cmd     = buf[3]
+                payload = bytes(buf[4:4 + buf[0]])
+                del buf[:4 + len(payload)]
+                if crc16(bytes([cmd]) + payload) != crc:
+                    self.errors += 1
+                    replies += b"C"
+                    continue
+                replies += self.execute(cmd, payload)
+            if replies:
+                os.write(self.master, replies)
+
+    def execute(self, cmd, payload):
+        address = int.from_bytes(payload[0:4], "big")
+        if cmd == 0x01:
+            self.mem[address:address + len(payload) - 4] = payload[4:]
+        elif cmd == 0x02:
+            self.jump = address
+        elif cmd == 0x06 and self.extensions:
+            length = int.from_bytes(payload[4:6], "big")
+            self.mem[address:address + length] = lz4_decompress(payload[6:], length)
+        elif cmd == 0x07 and self.extensions:
+            block_size = int.from_bytes(payload[4:8], "big")
+            count      = int.from_bytes(payload[8:10], "big")
+            crcs = bytearray(b"K")
+            for i in range(count):
+                start = address + i*block_size
+                crcs += zlib.crc32(self.mem[start:start + block_size]).to_bytes(4, "big")
+            self.frames[cmd] = self.frames.get(cmd, 0) + 1
+            return crcs
+        else:
+            return b"U"
+        self.frames[cmd] = self.frames.get(cmd, 0) + 1
+        return b"K"
+
+# OpenOCD JTAG Stream Model ------------------------------------------------------------------------
+
+class JTAGUARTEcho(JTAGUART):
+    """JTAGUART with OpenOCD's stream server replaced by a (late) TCP echo server."""
+    def jtag2tcp(self):
+        time.sleep(0.2)
+        server = socket.create_server(("localhost", self.port))
+        conn, _ = server.accept()
+        while True:
+            datas = conn.recv(65536)
+            if not datas:
+                break
+            conn.sendall(datas)
+        conn.close()
+        server.close()
+
+# Test LiteXTerm -----------------------------------------------------------------------------------
+
+class TestLiteXTerm(unittest.TestCase):
+    def serial_boot(self, data, extensions=True, error_rate=0.0, mem=None, **kwargs):
+        model = SFLModel(extensions=extensions, error_rate=error_rate, mem=mem)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "image.bin")
+            with open(filename, "wb") as f:
+                f.write(data)
+            term = LiteXTerm(False, filename, "0x00010000", None, **kwargs)
+            term.open(model.name, 115200)
+            for filename, base in term.mem_regions.items():
+                term.upload(filename, int(base, 16))
+            term.boot()
+            term.close()
+        model.thread.join(timeout=10)
+        self.assertEqual(model.mem[0x10000:0x10000 + len(data)], data)
+        self.assertEqual(model.jump, 0x10000)
+        return model
+
+    def get_data(self, length=64*1024):
+        random.seed(0)
+        words = [b"LiteX", b"SoC", b"BIOS", b"\x00"*64, b"\xff"*8]
+        data  = b"".join(random.choice(words) for _ in range(length//8))
+        return (data + os.urandom(4096))[:length]
+
+    def test_upload(self):
+        model = self.serial_boot(self.get_data(), safe=False)
+        self.assertEqual(model.frames.get(0x06, 0), 0)
+
+    def test_upload_safe(self):
+        self.serial_boot(self.get_data(8192), safe=True)
+
+    def test_upload_errors(self):
+        model = self.serial_boot(self.get_data(), error_rate=0.05, safe=False)
+        self.assertGreater(model.errors, 0)
+
+    def test_upload_compressed(self):
+        data  = self.get_data()
+        model = self.serial_boot(data, safe=False, compress=True)
+        self.assertGreater(model.frames[0x06], 0)
+        self.assertLess(model.frames[0x06] + model.frames.get(0x01, 0), len(data)//251)
+
+    def test_upload_delta(self):
+        data = self.get_data(64*1024 + 100)
+        mem  = bytearray(0x100000)
+        mem[0x10000:0x10000 + len(data)] = data
+        mem[0x10000 + 5000] ^= 0xff
+        model = self.serial_boot(data, mem=mem, safe=False, delta=True)
+        # Only the modified block and the last partial block are uploaded.
+        self.assertEqual(model.frames[0x01], 4096//251 + 1 + 1)
+
+    def test_upload_no_extensions(self):
+        model = self.serial_boot(self.get_data(), extensions=False, safe=False, compress=True, delta=True)
+        self.assertEqual(model.frames.get(0x06, 0), 0)
+
+    def write_images(self, tmpdir, n=4, length=16*1024):
+        images = []
+        for i in range(n):
+            filename = os.path.join(tmpdir, f"image{i}.bin")
+            with open(filename, "wb") as f:
+                f.write(os.urandom(length + 1000*i))
+            images.append((filename, 0x10000 + 0x10000*i))
+        return images
+
+    def check_images(self, mem, images):
+        for filename, address in images:
+            with open(filename, "rb") as f:
+                data = f.read()
+            self.assertEqual(mem[address:address + len(data)], data)
+
+    def test_upload_images_cache(self):
+        model = SFLModel()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            images   = self.write_images(tmpdir)
+            cache    = SFLImageCache(os.path.join(tmpdir, "cache.json"))
+            port     = serial.serial_for_url(model.name, 115200)
+            uploader = SFLUploader(port)
+            uploader.upload_images(images, cache)
+            self.check_images(model.mem, images)
+            frames = model.frames[0x01]
+            # Unchanged images are skipped.
+            uploader.upload_images(images, cache)
+            self.assertEqual(model.frames[0x01], frames)
+            # Unless device's memory has been modified.
+            model.mem[0x10000] ^= 0xff
+            uploader.upload_images(images, cache)
+            self.assertGreater(model.frames[0x01], frames)
+            self.check_images(model.mem, images)
+            port.close()
+
+    def test_upload_images_cache_no_extensions(self):
+        model = SFLModel(extensions=False)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            images   = self.write_images(tmpdir, n=2)
+            cache    = SFLImageCache(os.path.join(tmpdir, "cache.json"))
+            port     = serial.serial_for_url(model.name, 115200)
+            uploader = SFLUploader(port)
+            uploader.upload_images(images, cache)
+            frames = model.frames[0x01]
+            # Images can't be checked on the device: always uploaded.
+            model.mem[0x10000] ^= 0xff
+            uploader.upload_images(images, cache)
+            self.assertEqual(model.frames[0x01], 2*frames)
+            self.check_images(model.mem, images)
+            port.close()
+
+    def test_upload_images_concurrent(self):
+        models = [SFLModel() for i in range(2)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            images    = self.write_images(tmpdir)
+            ports     = [serial.serial_for_url(model.name, 115200) for model in models]
+            uploaders = [SFLUploader(port) for port in ports]
+            sfl_upload_concurrent(uploaders, images, boot_address=0x10000)
+            # Each device receives all the images and is booted.
+            for model in models:
+                model.thread.join(timeout=5)
+                self.check_images(model.mem, images)
+                self.assertEqual(model.jump, 0x10000)
+            for port in ports:
+                port.close()
+
+    def test_extra_ports(self):
+        model       = SFLModel()
+        extra_model = SFLModel(banner=b"")
+        # Serial boot request of the extra device once its port is opened (input flushed on open).
+        threading.Timer(0.5, extra_model.connected.set).start()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename, address = self.write_images(tmpdir, n=1)[0]
+            term = LiteXTerm(False, filename, f"0x{address:08x}", None, False, extra_ports=[extra_model.name])
+            term.open(model.name, 115200)
+            term.upload_images()
+            term.boot()
+            # Devices of the extra ports are uploaded and booted like the main device.
+            for m in [model, extra_model]:
+                m.thread.join(timeout=5)
+                self.check_images(m.mem, [(filename, address)])
+                self.assertEqual(m.jump, address)
+            self.assertEqual(term.extra_uploaders, [])
+            term.close()
+
+    def test_compat(self):
+        term = LiteXTerm(False, None, "0x00000000", None, False)
+        term.open("loop://", 115200)
+        term.port.write(b"K")
+        self.assertTrue(term.receive_upload_response())
+        term.close()
+
+    def test_detect_magic(self):
+        term = LiteXTerm(False, None, "0x00000000", None, False)
+        self.assertFalse(term.detect_magic(b"Booting from serial...\nsL5DdS"))
+        self.assertTrue(term.detect_magic(b"Mmkekro\nPress Q"))
+        self.assertFalse(term.detect_magic(b"sL5DdSMmkekr"))
+
+    def test_console_loop(self):
+        data   = self.get_data(16*1024)
+        banner = os.urandom(64*1024).replace(b"sL5", b"") + b"\nBooting from serial...\n"
+        model  = SFLModel(banner=banner)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "image.bin")
+            log      = os.path.join(tmpdir, "log.txt")
+            with open(filename, "wb") as f:
+                f.write(data)
+            term = LiteXTerm(False, filename, "0x00010000", None, False, log=log)
+            term.open(model.name, 115200)
+            model.connected.set()
+            term.start()
+            model.thread.join(timeout=10)
+            term.stop()
+            term.join()
+            term.close()
+            with open(log, "rb") as f:
+                self.assertTrue(f.read().startswith(banner))
+        self.assertEqual(model.mem[0x10000:0x10000 + len(data)], data)
+        self.assertEqual(model.jump, 0x10000)
+
+    def test_console_threads(self):
+        # Non-selectable port (pyserial URL handler): Reader thread is used.
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log  = os.path.join(tmpdir, "log.txt")
+            term = LiteXTerm(False, None, "0x00000000", None, False, log=log)
+            term.open("loop://", 115200)
+            term.port.timeout = 0.1
+            self.assertFalse(term.loop_supported())
+            term.start()
+            self.assertIsNone(term.loop_thread)
+            term.port.write(b"LiteX")
+            for i in range(100):
+                term.log.flush()
+                with open(log, "rb") as f:
+                    if f.read() == b"LiteX":
+                        break
+                time.sleep(0.01)
+            term.stop()
+            term.join()
+            term.close()
+            with open(log, "rb") as f:
+                self.assertEqual(f.read(), b"LiteX")
+
+    def test_jtag_uart_bridge(self):
+        with socket.create_server(("localhost", 0)) as s:
+            port = s.getsockname()[1]
+        jtag_uart = JTAGUARTEcho(port=port)
+        jtag_uart.open()
+        port  = serial.serial_for_url(os.ttyname(jtag_uart.name), 115200, timeout=5)
+        datas = os.urandom(256*1024)
+        writer = threading.Thread(target=port.write, args=(datas,))
+        writer.start()
+        self.assertEqual(port.read(len(datas)), datas)
+        writer.join()
+        port.close()
+        jtag_uart.close()
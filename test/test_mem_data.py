@@ -0,0 +1,67 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import struct
+import tempfile
+import unittest
+
+from array import array
+
+from litex.build.generic_platform import GenericPlatform, Pins
+
+from litex.soc.integration.common import get_mem_data
+from litex.soc.integration.soc_core import SoCMini
+
+# Test Memory Data ---------------------------------------------------------------------------------
+
+class TestMemData(unittest.TestCase):
+    def get_reference(self, datas, data_width, endianness):
+        # Data words of data_width bits made of 32-bit words (with endianness), LSB first.
+        bytes_per_data = data_width//8
+        datas += bytes(-len(datas) % bytes_per_data)
+        words  = struct.unpack({"big": ">", "little": "<"}[endianness] + "I"*(len(datas)//4), datas)
+        n      = data_width//32
+        return [sum(w << 32*i for i, w in enumerate(words[j:j + n])) for j in range(0, len(words), n)]
+
+    def test_mem_data(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for length in [1, 5, 32, 33, 4097]:
+                datas    = os.urandom(length)
+                filename = os.path.join(tmpdir, f"data{length}.bin")
+                with open(filename, "wb") as f:
+                    f.write(datas)
+                for data_width in [32, 64, 128, 256]:
+                    for endianness in ["big", "little"]:
+                        self.assertEqual(
+                            list(get_mem_data(filename, data_width=data_width, endianness=endianness)),
+                            self.get_reference(datas, data_width, endianness))
+
+    def test_mem_data_regions(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            datas = [os.urandom(100), os.urandom(7)]
+            for i, d in enumerate(datas):
+                with open(os.path.join(tmpdir, f"region{i}.bin"), "wb") as f:
+                    f.write(d)
+            filename = os.path.join(tmpdir, "regions.json")
+            with open(filename, "w") as f:
+                json.dump({"region0.bin": "0x40000000", "region1.bin": "0x40000100"}, f)
+            image = datas[0] + bytes(0x100 - len(datas[0])) + datas[1]
+            for data_width in [32, 64, 128]:
+                self.assertEqual(
+                    list(get_mem_data(filename, data_width=data_width, endianness="little", offset=0x40000000)),
+                    self.get_reference(image, data_width, "little"))
+
+    def test_mem_data_contents(self):
+        # Memory data (arrays) are usable as RAM/ROM contents: only non-empty contents are initialized.
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "rom.bin")
+            with open(filename, "wb") as f:
+                f.write(os.urandom(8))
+            for name, contents in [("rom0", array("I")), ("rom1", get_mem_data(filename))]:
+                soc = SoCMini(GenericPlatform("model", [("clk", 0, Pins(1))]), clk_freq=100e6)
+                soc.add_rom(name, 0x10000000, 0x1000, contents=contents)
+                self.assertEqual(f"CONFIG_{name.upper()}_INIT" in soc.constants, len(contents) > 0)
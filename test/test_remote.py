@@ -0,0 +1,470 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import time
+import struct
+import tempfile
+import threading
+import unittest
+
+from litex.tools.remote.etherbone import encode_packet, encode_record
+from litex.tools.remote.csr_builder import CSRMap
+from litex.tools.remote.comm_sim import CommSim
+from litex.tools.remote.comm_uart import *
+from litex.tools.remote.benchmark import *
+from litex.tools.remote.sampler import CSRSampler
+from litex.tools.remote.trace import *
+from litex.tools.litex_server import RemoteServer, _read_optimizer, _write_merger
+from litex.tools.litex_client import RemoteClient, load_memory, dump_memory
+
+csr_csv = """\
+#--------------------------------------------------------------------------------
+# Auto-generated by LiteX
+#--------------------------------------------------------------------------------
+csr_base,ctrl,0x00000000,,
+csr_base,identifier_mem,0x00001000,,
+csr_register,ctrl_reset,0x00000000,1,rw
+csr_register,ctrl_scratch,0x00000004,1,rw
+csr_register,ctrl_bus_errors,0x00000008,1,ro
+csr_register,timer0_load,0x00000800,2,rw
+constant,config_csr_data_width,32,,
+memory_region,sram,0x10000000,8192,cached
+memory_region,csr,0x00000000,65536,io
+"""
+
+csr_csv_sampler = csr_csv + "csr_register,wide,0x00000810,3,rw\n"
+
+class TestRemote(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        CSRMap.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.csr_csv = os.path.join(self.tmpdir.name, "csr.csv")
+        with open(self.csr_csv, "w") as f:
+            f.write(csr_csv)
+        self.comm   = CommSim(csr_csv=self.csr_csv)
+        self.server = RemoteServer(self.comm, "localhost", 0)
+        self.server.open()
+        self.server.start(2)
+        self.client = RemoteClient(port=self.server.socket.getsockname()[1], csr_csv=self.csr_csv)
+        self.client.open()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        self.server.join()
+        CSRMap.cache_dir = None
+        self.tmpdir.cleanup()
+
+    def test_scratch(self):
+        self.assertEqual(self.client.regs.ctrl_scratch.read(), 0x12345678)
+        self.client.regs.ctrl_scratch.write(0xcafebabe)
+        self.assertEqual(self.client.regs.ctrl_scratch.read(), 0xcafebabe)
+
+    def test_identifier(self):
+        identifier = ""
+        for i in range(32):
+            c = chr(self.client.read(self.client.bases.identifier_mem + 4*i) & 0xff)
+            if c == "\0":
+                break
+            identifier += c
+        self.assertEqual(identifier, "LiteX Sim SoC")
+
+    def test_burst(self):
+        datas = [i*0x01010101 for i in range(200)]
+        self.client.write(0x10000000, datas)
+        self.assertEqual(self.client.read(0x10000000, len(datas)), datas)
+
+    def test_fixed_burst(self):
+        # Fixed (FIFO) writes are forwarded as a single burst to the same address.
+        transactions = self.comm.counters["transactions"]
+        self.client.write(0x10000000, [1, 2, 3], burst="fixed")
+        self.assertEqual(self.client.read(0x10000000, 3, burst="fixed"), [3, 3, 3])
+        self.assertEqual(self.comm.counters["transactions"], transactions + 2)
+
+    def test_read_many(self):
+        self.client.regs.timer0_load.write(0x0123456789abcdef)
+        self.assertEqual(
+            self.client.read_many(["timer0_load", "ctrl_scratch"]),
+            [0x0123456789abcdef, 0x12345678])
+
+    def test_load_dump_memory(self):
+        port = self.server.socket.getsockname()[1]
+        for length in [4, 10, 999]:
+            self.client.write(0x10000000, [0xffffffff]*(length//4 + 2))
+            datas     = os.urandom(length)
+            filename  = os.path.join(self.tmpdir.name, "data.bin")
+            dump_name = os.path.join(self.tmpdir.name, "dump.bin")
+            with open(filename, "wb") as f:
+                f.write(datas)
+            load_memory("localhost", self.csr_csv, port, filename, 0x10000000)
+            # Bytes following the data are preserved.
+            words = self.client.read(0x10000000, length//4 + 2)
+            image = b"".join(w.to_bytes(4, "little") for w in words)
+            self.assertEqual(image[:length], datas)
+            self.assertEqual(image[length:], b"\xff"*(len(image) - length))
+            dump_memory("localhost", self.csr_csv, port, 0x10000000, length, dump_name)
+            with open(dump_name, "rb") as f:
+                self.assertEqual(f.read(), datas)
+
+    def test_read_stream_error(self):
+        # Responses without the requested words raise a protocol error.
+        for record in [encode_record(), encode_record(writes=[0]*3)]:
+            self.client.receive_packet = lambda socket: encode_packet([record])
+            with self.assertRaises(IOError):
+                list(self.client.read_stream(0x10000000, 16))
+
+    def test_trace(self):
+        port     = self.server.socket.getsockname()[1]
+        filename = os.path.join(self.tmpdir.name, "trace.bin")
+        datas    = os.urandom(1024 + 2)
+        # Record.
+        client = RemoteClient(port=port, csr_csv=self.csr_csv, trace=filename)
+        client.open()
+        client.write(0x10000000, [1, 2, 3])
+        client.regs.ctrl_scratch.write(0xcafebabe)
+        client.read_many(["ctrl_scratch", "timer0_load"])
+        client.write_stream(0x10001000, datas)
+        list(client.read_stream(0x10001000, 16))
+        client.close()
+        events = list(read_trace(filename))
+        self.assertEqual([e.kind for e in events][:3], [TRACE_WRITE, TRACE_WRITE, TRACE_READ_ADDRS])
+        self.assertEqual((events[0].addr, events[0].datas), (0x10000000, [1, 2, 3]))
+        self.assertEqual(events[2].addrs, [0x4, 0x800, 0x804])
+        # Streamed accesses are traced (including the Read-Modify-Write of the partial last word).
+        self.assertEqual([e.kind for e in events[3:]], [TRACE_WRITE, TRACE_READ, TRACE_WRITE, TRACE_READ])
+        self.assertEqual(sum(len(e.datas) for e in events if e.kind == TRACE_WRITE), 3 + 1 + 257)
+
+        # Replay on a cleared memory.
+        self.client.write(0x10000000, [0]*3)
+        self.client.write_stream(0x10001000, bytes(len(datas)))
+        self.client.regs.ctrl_scratch.write(0)
+        reads = []
+        read_bursts = self.comm.read_bursts
+        def traced_read_bursts(bursts):
+            reads.extend(addr for addr, length, burst in bursts)
+            return read_bursts(bursts)
+        self.comm.read_bursts = traced_read_bursts
+        client = RemoteClient(port=port, csr_csv=self.csr_csv)
+        client.open()
+        nwrites, nbursts = replay_trace(client, filename)
+        client.close()
+        self.comm.read_bursts = read_bursts
+        self.assertEqual(nwrites, 4)
+        # Only synchronized with a read of the scratch register.
+        self.assertEqual(reads, [0x4])
+        self.assertEqual(self.client.read(0x10000000, 3), [1, 2, 3])
+        self.assertEqual(self.client.regs.ctrl_scratch.read(), 0xcafebabe)
+        words = list(self.client.read_stream(0x10001000, 257))
+        self.assertEqual(b"".join(w.tobytes() for w in words)[:len(datas)], datas)
+
+        # Summarize.
+        summary = summarize_trace(filename, self.client.csr_map)
+        self.assertIn(f"{len(events)} events", summary)
+        self.assertIn("ctrl_scratch", summary)
+        self.assertIn("sram", summary)
+
+    def test_trace_fixed(self):
+        port     = self.server.socket.getsockname()[1]
+        filename = os.path.join(self.tmpdir.name, "trace.bin")
+        # Record.
+        client = RemoteClient(port=port, csr_csv=self.csr_csv, trace=filename)
+        client.open()
+        client.write(0x10000000, [1, 2, 3], burst="fixed")
+        client.write(0x10000004, [4, 5])
+        client.read(0x10000000, 2, burst="fixed")
+        client.close()
+        events = list(read_trace(filename))
+        self.assertEqual([e.burst for e in events], ["fixed", "incr", "fixed"])
+        self.assertEqual(events[0].get_addrs(), [0x10000000]*3)
+        self.assertEqual(events[2].get_addrs(), [0x10000000]*2)
+        self.assertEqual(events[2].datas, [3, 3])
+
+        # Replay on a cleared memory (fixed writes are not coalesced with incrementing ones).
+        self.client.write(0x10000000, [0]*4)
+        client = RemoteClient(port=port, csr_csv=self.csr_csv)
+        client.open()
+        nwrites, nbursts = replay_trace(client, filename, reads=True)
+        client.close()
+        self.assertEqual((nwrites, nbursts), (2, 2))
+        self.assertEqual(self.client.read(0x10000000, 4), [3, 4, 5, 0])
+
+    def test_stats(self):
+        self.server.stats = {}
+        self.server.reset_stats()
+        self.client.write(0x10000000, [1, 2, 3])
+        self.assertEqual(self.client.read(0x10000000, 3), [1, 2, 3])
+        self.assertEqual(self.server.stats["writes"],             3)
+        self.assertEqual(self.server.stats["write_transactions"], 1)
+        self.assertEqual(self.server.stats["reads"],              3)
+        self.assertEqual(self.server.stats["read_transactions"],  1)
+        self.assertEqual(self.server.stats["packets"],            2)
+        self.server.reset_stats()
+        self.assertEqual(set(self.server.stats.values()), {0})
+
+    def test_latency(self):
+        self.comm.latency = 10e-3
+        start = time.time()
+        self.client.read(0x10000000)
+        self.assertGreaterEqual(time.time() - start, 10e-3)
+
+# Test CSR Sampler ---------------------------------------------------------------------------------
+
+class TestCSRSampler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        CSRMap.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        csr_csv     = os.path.join(self.tmpdir.name, "csr.csv")
+        with open(csr_csv, "w") as f:
+            f.write(csr_csv_sampler)
+        self.comm = CommSim(csr_csv=csr_csv)
+
+    def tearDown(self):
+        CSRMap.cache_dir = None
+        self.tmpdir.cleanup()
+
+    def test_ring_buffer(self):
+        sampler = CSRSampler(self.comm, ["ctrl_scratch", "timer0_load"], depth=4)
+        for i in range(6):
+            self.comm.regs.ctrl_scratch.write(i)
+            sampler.sample()
+        timestamps, values = sampler.get()
+        self.assertEqual(sampler.count, 6)
+        self.assertEqual(values[:, 0].tolist(), [2, 3, 4, 5])
+        self.assertEqual(sorted(timestamps.tolist()), timestamps.tolist())
+
+    def test_wide_registers(self):
+        sampler = CSRSampler(self.comm, ["wide"], depth=4)
+        self.comm.regs.wide.write(2**95 + 5)
+        sampler.sample()
+        timestamps, values = sampler.get()
+        self.assertEqual(values[0, 0], 2**95 + 5)
+
+    def test_export(self):
+        import numpy as np
+        sampler = CSRSampler(self.comm, ["ctrl_scratch", "wide"], depth=16)
+        self.comm.regs.wide.write(2**80)
+        for i in range(3):
+            self.comm.regs.ctrl_scratch.write(i)
+            sampler.sample()
+        filename = os.path.join(self.tmpdir.name, "samples.csv")
+        sampler.export(filename)
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "time,ctrl_scratch,wide")
+        self.assertEqual([l.split(",")[1:] for l in lines[1:]], [[str(i), str(2**80)] for i in range(3)])
+        filename = os.path.join(self.tmpdir.name, "samples.npz")
+        sampler.export(filename)
+        d = np.load(filename, allow_pickle=True)
+        self.assertEqual(d["names"].tolist(), ["ctrl_scratch", "wide"])
+        self.assertEqual(d["values"].tolist(), [[i, 2**80] for i in range(3)])
+        self.assertEqual(d["time"][0], 0)
+
+    def test_start(self):
+        sampler = CSRSampler(self.comm, ["ctrl_scratch"], rate=1e3)
+        sampler.start(duration=0.05)
+        sampler.join()
+        self.assertGreater(sampler.count, 1)
+
+# Test Server Optimizations -----------------------------------------------------------------------
+
+class TestServerOptimizations(unittest.TestCase):
+    def test_read_optimizer(self):
+        # Order is preserved by default.
+        self.assertEqual(_read_optimizer([0x8, 0x0, 0x4]),
+            ([(0x8, 1, "incr"), (0x0, 2, "incr")], [0, 1, 2]))
+        # FIFO reads are merged in fixed bursts.
+        self.assertEqual(_read_optimizer([0x20, 0x20, 0x20]),
+            ([(0x20, 3, "fixed")], [0, 1, 2]))
+        self.assertEqual(_read_optimizer([0x20, 0x20, 0x20], bursts=["incr"]),
+            ([(0x20, 1, "incr")]*3, [0, 1, 2]))
+        # Bursts are limited to max_length.
+        self.assertEqual(_read_optimizer([0x0, 0x4, 0x8], max_length=2),
+            ([(0x0, 2, "incr"), (0x8, 1, "incr")], [0, 1, 2]))
+
+    def test_read_optimizer_reorder(self):
+        # Distinct reads are sorted.
+        self.assertEqual(_read_optimizer([0x8, 0x0, 0x4], reorder=True),
+            ([(0x0, 3, "incr")], [2, 0, 1]))
+        # Holes are read when smaller than max_gap.
+        self.assertEqual(_read_optimizer([0x0, 0x8], reorder=True),
+            ([(0x0, 1, "incr"), (0x8, 1, "incr")], [0, 1]))
+        self.assertEqual(_read_optimizer([0x0, 0x8], reorder=True, max_gap=1),
+            ([(0x0, 3, "incr")], [0, 2]))
+        # Repeated reads (ex FIFO) are never reordered.
+        self.assertEqual(_read_optimizer([0x8, 0x0, 0x8], reorder=True),
+            ([(0x8, 1, "incr"), (0x0, 1, "incr"), (0x8, 1, "incr")], [0, 1, 2]))
+
+    def test_write_merger(self):
+        self.assertEqual(_write_merger([(0x0, [1]), (0x4, [2, 3]), (0x10, [4])]),
+            [(0x0, [1, 2, 3]), (0x10, [4])])
+        self.assertEqual(_write_merger([(0x0, [1]), (0x4, [2]), (0x8, [3])], max_length=2),
+            [(0x0, [1, 2]), (0x8, [3])])
+        # Inputs are not modified.
+        writes = [(0x0, [1]), (0x4, [2])]
+        _write_merger(writes)
+        self.assertEqual(writes, [(0x0, [1]), (0x4, [2])])
+
+# Test CSR Map -------------------------------------------------------------------------------------
+
+class TestCSRMap(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir    = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.csr_csv   = os.path.join(self.tmpdir.name, "csr.csv")
+        with open(self.csr_csv, "w") as f:
+            f.write(csr_csv)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load(self):
+        csr_map = CSRMap.load(self.csr_csv, cache_dir=self.cache_dir)
+        self.assertEqual(csr_map.bases["ctrl"], 0x00000000)
+        self.assertEqual(csr_map.registers["timer0_load"], (0x800, 2, "rw", {}))
+        self.assertEqual(csr_map.constants["config_csr_data_width"], 32)
+        self.assertEqual(csr_map.memories["sram"], (0x10000000, 8192, "cached"))
+        self.assertEqual(csr_map.by_addr[0x4], "ctrl_scratch")
+
+    def test_cache(self):
+        csr_map = CSRMap.load(self.csr_csv, cache=True, cache_dir=self.cache_dir)
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(CSRMap._cache_filename(self.csr_csv, self.cache_dir))])
+        # Cache hit: File is not parsed.
+        from_csv = CSRMap.from_csv
+        def from_csv_error(filename):
+            raise AssertionError("CSR file parsed on cache hit.")
+        CSRMap.from_csv = from_csv_error
+        try:
+            cached_csr_map = CSRMap.load(self.csr_csv, cache=True, cache_dir=self.cache_dir)
+        finally:
+            CSRMap.from_csv = from_csv
+        self.assertEqual(cached_csr_map.to_dict(), csr_map.to_dict())
+        self.assertEqual(cached_csr_map.by_addr, csr_map.by_addr)
+        # Cache invalidation: File is parsed again when updated.
+        with open(self.csr_csv, "a") as f:
+            f.write("csr_register,ctrl_new,0x0000000c,1,ro\n")
+        stat = os.stat(self.csr_csv)
+        os.utime(self.csr_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        csr_map = CSRMap.load(self.csr_csv, cache=True, cache_dir=self.cache_dir)
+        self.assertEqual(csr_map.registers["ctrl_new"], (0xc, 1, "ro", {}))
+
+    def test_cache_prune(self):
+        cache_max_entries = CSRMap.cache_max_entries
+        CSRMap.cache_max_entries = 2
+        try:
+            for i in range(4):
+                filename = os.path.join(self.tmpdir.name, f"csr{i}.csv")
+                with open(filename, "w") as f:
+                    f.write(csr_csv)
+                CSRMap.load(filename, cache=True, cache_dir=self.cache_dir)
+                cache_filename = CSRMap._cache_filename(filename, self.cache_dir)
+                os.utime(cache_filename, (i, i))
+        finally:
+            CSRMap.cache_max_entries = cache_max_entries
+        # Only the most recently used maps are kept.
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertTrue(os.path.exists(cache_filename))
+
+    def test_no_cache(self):
+        # Caching is opt-in.
+        CSRMap.load(self.csr_csv, cache_dir=self.cache_dir)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+# Test CommUART ------------------------------------------------------------------------------------
+
+def decode_uartbone(ba):
+    # Decode a UARTBone command stream to a list of (cmd, addr, length, datas).
+    r      = []
+    offset = 0
+    while offset < len(ba):
+        cmd, length, addr = struct.unpack_from(">BBI", ba, offset)
+        offset += 6
+        datas = []
+        if cmd in [CMD_WRITE_BURST_INCR, CMD_WRITE_BURST_FIXED]:
+            datas   = list(struct.unpack_from(f">{length}I", ba, offset))
+            offset += 4*length
+        r.append((cmd, 4*addr, length, datas))
+    return r
+
+class TestCommUART(unittest.TestCase):
+    def test_encode_read(self):
+        comm = CommUART("loop://")
+        self.assertEqual(decode_uartbone(comm._encode_read(0x1000, 1)), [
+            (CMD_READ_BURST_INCR, 0x1000, 1, [])])
+        # Long reads are split in max_burst commands.
+        self.assertEqual(decode_uartbone(comm._encode_read(0x1000, 300)), [
+            (CMD_READ_BURST_INCR, 0x1000,         255, []),
+            (CMD_READ_BURST_INCR, 0x1000 + 4*255,  45, [])])
+        self.assertEqual(decode_uartbone(comm._encode_read(0x2000, 300, burst="fixed")), [
+            (CMD_READ_BURST_FIXED, 0x2000, 255, []),
+            (CMD_READ_BURST_FIXED, 0x2000,  45, [])])
+
+    def test_encode_write(self):
+        comm  = CommUART("loop://")
+        datas = list(range(20))
+        # Writes are split in conservative bursts by default.
+        self.assertEqual(decode_uartbone(comm._encode_write(0x1000, datas)), [
+            (CMD_WRITE_BURST_INCR, 0x1000,      8, datas[0:8]),
+            (CMD_WRITE_BURST_INCR, 0x1000 + 32, 8, datas[8:16]),
+            (CMD_WRITE_BURST_INCR, 0x1000 + 64, 4, datas[16:20])])
+        self.assertEqual(decode_uartbone(comm._encode_write(0x2000, datas, burst="fixed")), [
+            (CMD_WRITE_BURST_FIXED, 0x2000, 8, datas[0:8]),
+            (CMD_WRITE_BURST_FIXED, 0x2000, 8, datas[8:16]),
+            (CMD_WRITE_BURST_FIXED, 0x2000, 4, datas[16:20])])
+        # Larger write bursts are opt-in.
+        comm  = CommUART("loop://", max_write_burst=UARTBONE_MAX_BURST)
+        datas = [0xdeadbeef]*300
+        self.assertEqual(decode_uartbone(comm._encode_write(0x1000, datas)), [
+            (CMD_WRITE_BURST_INCR, 0x1000,         255, datas[:255]),
+            (CMD_WRITE_BURST_INCR, 0x1000 + 4*255,  45, datas[255:])])
+
+# Test Benchmarks ----------------------------------------------------------------------------------
+
+class TestBenchmark(unittest.TestCase):
+    def test_latency_duration(self):
+        # Latency is measured for the bench duration (not for a fixed number of accesses).
+        class Bus:
+            def read(self, addr, length=None):
+                time.sleep(1e-3)
+        start = time.perf_counter()
+        r     = bench_latency(Bus(), 0x0, duration=0.05)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+        self.assertLess(r["n"], 100)
+        self.assertGreaterEqual(r["p50_us"], 1e3)
+
+    def test_burst_write_sync(self):
+        # Posted writes are only measured once completed (ended with a read roundtrip).
+        class Bus:
+            def __init__(self):
+                self.accesses = []
+            def read(self, addr, length=None):
+                self.accesses.append("r")
+            def write(self, addr, datas):
+                self.accesses.append("w")
+        bus = Bus()
+        r   = bench_burst_write(bus, 0x0, length=4, duration=0.01)
+        self.assertEqual(bus.accesses, ["w"]*r["accesses"] + ["r"])
+
+    def test_etherbone_codec(self):
+        r = bench_etherbone_codec(length=16, duration=0.01)
+        self.assertGreater(r["encode"]["accesses"], 0)
+        self.assertGreater(r["decode"]["accesses"], 0)
+
+    def test_local_benchmarks(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            CSRMap.cache_dir = tmpdir
+            try:
+                threads = threading.active_count()
+                results = run_local_benchmarks(["sim", "uart", "udp", "pcie"], duration=0.01, nclients=[1, 2])
+            finally:
+                CSRMap.cache_dir = None
+        self.assertEqual(set(results.keys()), {"CommSim", "CommUART", "CommUDP", "CommPCIe"})
+        for r in results.values():
+            self.assertGreater(r["burst_read"]["MBps"],  0)
+            self.assertGreater(r["burst_write"]["MBps"], 0)
+            self.assertEqual(r["csr_sweep"]["registers"], 128)
+            self.assertEqual(set(r["concurrency"].keys()), {"1", "2"})
+        # Servers, Comms and transport models are torn down.
+        self.assertEqual(threading.active_count(), threads)
@@ -0,0 +1,91 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import tempfile
+import unittest
+
+from litex.build.sim.verilator import _get_sim_hashes, _compile_sim
+
+# Test Verilator Incremental Builds ----------------------------------------------------------------
+
+class TestSimVerilator(unittest.TestCase):
+    def setUp(self):
+        self.cwd    = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def write(self, filename, contents):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(filename, "w") as f:
+            f.write(contents)
+
+    def test_sim_hashes(self):
+        sources = [("sim.v", "verilog", "work"), ("mem.init", None, None)]
+        for filename in ["variables.mak", "sim_init.cpp", "sim_header.h", "mem.init"]:
+            self.write(filename, "0")
+        self.write("sim.v", "// Auto-generated by LiteX on 2023-01-01 00:00:00\nmodule sim();\n")
+        self.write(os.path.join("mods", "mod", "mod.c"), "0")
+        self.write(os.path.join("mods", "variables.mak"), "0")
+        def get_hashes(script="make"):
+            return _get_sim_hashes(script, sources, extra_mods_path=os.path.abspath("mods"))
+        hashes = get_hashes()
+        # Memory init files, generation date and extra modules variables are not part of the hashes.
+        self.write("mem.init", "1")
+        self.write("sim.v", "// Auto-generated by LiteX on 2023-01-02 00:00:00\nmodule sim();\n")
+        self.write(os.path.join("mods", "variables.mak"), "1")
+        self.assertEqual(get_hashes(), hashes)
+        # Extra modules sources only change the modules hash.
+        self.write(os.path.join("mods", "mod", "mod.c"), "1")
+        new_hashes = get_hashes()
+        self.assertEqual(new_hashes["sources"], hashes["sources"])
+        self.assertNotEqual(new_hashes["modules"], hashes["modules"])
+        hashes = new_hashes
+        # Verilog sources only change the sources hash.
+        self.write("sim.v", "module sim(input clk);\n")
+        new_hashes = get_hashes()
+        self.assertNotEqual(new_hashes["sources"], hashes["sources"])
+        self.assertEqual(new_hashes["modules"], hashes["modules"])
+        # Build options change all the hashes.
+        self.assertNotEqual(get_hashes("make JOBS=4")["options"], hashes["options"])
+
+    def compile_sim(self, hashes):
+        # Build script model: log the make targets and create the Verilated model.
+        self.write("build_sim.json", json.dumps(hashes))
+        self.write("build_sim.sh", "echo \"[$@]\" >> build.log && mkdir -p obj_dir && touch obj_dir/Vsim\n")
+        if os.path.exists("build.log"):
+            os.remove("build.log")
+        _compile_sim("sim", verbose=False)
+        if not os.path.exists("build.log"):
+            return None
+        with open("build.log") as f:
+            return f.read().strip()
+
+    def test_compile_sim(self):
+        hashes = {"options": "0", "sources": "0", "modules": "0"}
+        # Initial build.
+        self.assertEqual(self.compile_sim(hashes), "[]")
+        self.write(os.path.join("obj_dir", "Vsim.o"), "")
+        # Up to date: skipped.
+        self.assertEqual(self.compile_sim(hashes), None)
+        # Modules changed: only modules are compiled.
+        hashes["modules"] = "1"
+        self.assertEqual(self.compile_sim(hashes), "[modules]")
+        self.assertEqual(self.compile_sim(hashes), None)
+        # Sources changed: incremental build (obj_dir kept).
+        hashes["sources"] = "1"
+        self.assertEqual(self.compile_sim(hashes), "[]")
+        self.assertTrue(os.path.exists(os.path.join("obj_dir", "Vsim.o")))
+        self.assertEqual(self.compile_sim(hashes), None)
+        # Options changed: full rebuild (obj_dir removed).
+        hashes["options"] = "1"
+        self.assertEqual(self.compile_sim(hashes), "[]")
+        self.assertFalse(os.path.exists(os.path.join("obj_dir", "Vsim.o")))
+        self.assertEqual(self.compile_sim(hashes), None)
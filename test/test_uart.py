@@ -0,0 +1,40 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from migen import *
+
+from litex.soc.cores.uart import UARTCrossover
+
+class TestUART(unittest.TestCase):
+    def test_crossover_fifo_levels(self):
+        def generator(dut):
+            # CPU --> Host.
+            for c in b"LiteX":
+                yield from dut._rxtx.write(c)
+            for i in range(8):
+                yield
+            self.assertEqual((yield dut._xover_rxlevel.status), 5)
+
+            # Host reads the available characters.
+            datas = []
+            for i in range(5):
+                datas.append((yield from dut.xover._rxtx.read()))
+                yield
+            self.assertEqual(bytes(datas), b"LiteX")
+            self.assertEqual((yield dut._xover_rxlevel.status), 0)
+
+            # Host --> CPU: Host fills the free entries.
+            free = (yield dut._xover_txfree.status)
+            self.assertEqual(free, 1 + 16)
+            for i in range(free):
+                yield from dut.xover._rxtx.write(i)
+            for i in range(8):
+                yield
+            self.assertEqual((yield dut._xover_txfree.status), 0)
+
+        dut = UARTCrossover()
+        run_simulation(dut, generator(dut))